@@ -1,26 +1,177 @@
-from flask import Flask, abort, request, jsonify
+import atexit
+import os
+import random
+import weakref
+from functools import partial
+
+import click
+from flask import Blueprint, Flask, abort, current_app, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import func
-from sqlalchemy.sql import false
-from flask_migrate import Migrate
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql import and_, false, true
 from pathlib import Path
+from werkzeug.local import LocalProxy
+
+from pagination import keyset_page, page_headers
+from streaming import wants_ndjson, ndjson_response, iter_request_rows
+from cache import cache_from_config
+from conditional import conditional, current_versions
+from search import quote_fts, author_fts, fts_query, search
+from ratings import RATING_MIN, RATING_MAX, IDENTITY, compose, vote_step, step_expression, VoteBuffer
+from leaderboard import Leaderboard
+from serialization import FastJSONProvider, Projection, iter_projected
+from profiling import PROMETHEUS_CONTENT_TYPE, SQLProfiler
+from group_commit import GroupCommit
+from sqlite_engine import READ_BIND, RoutingSession, configure_engines, is_sqlite_file, read_only_bind, replica_bind, replicate
 
 
 BASE_DIR = Path(__file__).parent
-app = Flask(__name__)
-app.config['JSON_AS_ASCII'] = False
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{BASE_DIR / 'main.db'}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.app_context().push()
+# Маршруты и команды CLI; на приложение их вешает create_app
+bp = Blueprint("quotes", __name__, cli_group=None)
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+# Все приложения процесса - для общих хуков fork и atexit ниже; ссылки слабые, живыми их не держат
+apps: "weakref.WeakSet[Flask]" = weakref.WeakSet()
+
+
+def create_app(config: dict | None = None) -> Flask:
+    """Build the quotes app: defaults below, then FLASK_* environment variables, then ``config``.
+
+    Nothing here connects to the database: engines open connections on first
+    use, and a forked worker drops whatever connections it inherited, so the
+    app can be built before ``fork`` (gunicorn --preload) or in each worker.
+    Flask-Migrate (and with it Alembic) is loaded only by ``flask db``.
+    """
+    app = Flask(__name__)
+    # orjson, если установлен; см. serialization.py. Только у этого приложения, не у всех Flask в процессе
+    app.json = FastJSONProvider(app)
+    app.config['JSON_AS_ASCII'] = False
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{BASE_DIR / 'main.db'}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['PAGE_LIMIT_DEFAULT'] = 100
+    app.config['PAGE_LIMIT_MAX'] = 1000
+    app.config['EXPORT_YIELD_PER'] = 1000
+    app.config['BULK_CHUNK_SIZE'] = 1000
+    # Буфер голосов: голоса копятся в памяти и пишутся одним UPDATE
+    # раз в RATING_BUFFER_INTERVAL_MS или при RATING_BUFFER_MAX_VOTES голосах
+    app.config['RATING_BUFFER_ENABLED'] = False
+    app.config['RATING_BUFFER_INTERVAL_MS'] = 50
+    app.config['RATING_BUFFER_MAX_VOTES'] = 500
+    # Кэш ответов: "local" - LRU в процессе, "shared" - еще и общий бэкенд, None - выключен.
+    # Любой из них безопасен и с несколькими воркерами (gunicorn, реплика): запись хранится вместе
+    # с версиями таблиц из ETag (table_version ведут триггеры БД) и отдается только при тех же версиях,
+    # так что запись в другом процессе ее сразу делает недействительной; CACHE_TTL - лишь срок хранения
+    app.config['CACHE_TYPE'] = "local"
+    app.config['CACHE_MAXSIZE'] = 10000
+    app.config['CACHE_TTL'] = 60
+    app.config['RANDOM_QUOTE_ATTEMPTS'] = 16
+    # Доска лидеров /quotes/top: сколько цитат можно запросить и как часто перечитывать топ из БД
+    # (изменения из других процессов она видит только после перечитывания)
+    app.config['LEADERBOARD_SIZE'] = 100
+    app.config['LEADERBOARD_TTL'] = 300
+    # Настройки SQLite (см. sqlite_engine.py): профиль PRAGMA ("production" или "default" -
+    # умолчания SQLite) и отдельный read-only пул соединений, из которого читают GET-запросы
+    app.config['SQLITE_PROFILE'] = "production"
+    app.config['SQLITE_READ_POOL'] = True
+    app.config['SQLITE_READ_POOL_SIZE'] = 10
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {"pool_size": 5, "max_overflow": 10, "pool_timeout": 10}
+    # Основная БД может быть и PostgreSQL (FLASK_SQLALCHEMY_DATABASE_URI=postgresql://..., нужен psycopg2).
+    # Реплика для чтения (сервер или второй файл SQLite, см. flask replicate): если задана,
+    # GET-запросы читают с нее вместо read-only пула. REPLICA_LAG_TOLERANCE - сколько секунд
+    # после записи этого процесса читать с основной БД, пока реплика ее не догонит
+    app.config['SQLALCHEMY_REPLICA_URI'] = None
+    app.config['REPLICA_POOL_SIZE'] = 10
+    app.config['REPLICA_LAG_TOLERANCE'] = 1.0
+    # Профилирование SQL (profiling.py): число запросов, время в БД, строки и время сериализации
+    # по маршрутам - в заголовке Server-Timing и на /metrics. Запрос, повторенный за один HTTP-запрос
+    # больше PROFILE_N_PLUS_ONE раз, и запросы дольше PROFILE_SLOW_QUERY_MS пишутся в лог (медленные - с планом)
+    app.config['PROFILE_ENABLED'] = False
+    app.config['PROFILE_N_PLUS_ONE'] = 10
+    app.config['PROFILE_SLOW_QUERY_MS'] = 100
+    # Групповой коммит: параллельные POST /authors и POST /authors/<id>/quotes пишутся одной
+    # транзакцией (один fsync) - группа собирается GROUP_COMMIT_WINDOW_MS от первой записи или
+    # до GROUP_COMMIT_MAX_SIZE записей; каждый запрос ждет коммита своей группы и получает свой id
+    app.config['GROUP_COMMIT_ENABLED'] = False
+    app.config['GROUP_COMMIT_WINDOW_MS'] = 2
+    app.config['GROUP_COMMIT_MAX_SIZE'] = 100
+    app.config.from_prefixed_env()  # FLASK_RATING_BUFFER_ENABLED=true и т.п.
+    app.config.update(config or {})
+    replica_uri = app.config['SQLALCHEMY_REPLICA_URI']
+    if replica_uri:
+        app.config['SQLALCHEMY_BINDS'] = {READ_BIND: replica_bind(replica_uri, app.config['REPLICA_POOL_SIZE'])}
+    elif app.config['SQLITE_READ_POOL']:
+        read_bind = read_only_bind(app.config['SQLALCHEMY_DATABASE_URI'], app.config['SQLITE_READ_POOL_SIZE'])
+        if read_bind is not None:
+            app.config['SQLALCHEMY_BINDS'] = {READ_BIND: read_bind}
+
+    db.init_app(app)
+    profiler = None
+    with app.app_context():
+        configure_engines(db, app.config['SQLITE_PROFILE'])
+        if app.config['PROFILE_ENABLED']:
+            profiler = SQLProfiler(app, db, app.config['PROFILE_N_PLUS_ONE'], app.config['PROFILE_SLOW_QUERY_MS'])
+    vote_buffer = None
+    if app.config['RATING_BUFFER_ENABLED']:
+        vote_buffer = VoteBuffer(
+            partial(flush_votes, app), app.config['RATING_BUFFER_INTERVAL_MS'], app.config['RATING_BUFFER_MAX_VOTES']
+        )
+    group_commit = None
+    if app.config['GROUP_COMMIT_ENABLED']:
+        group_commit = GroupCommit(
+            partial(insert_created, app), app.config['GROUP_COMMIT_WINDOW_MS'], app.config['GROUP_COMMIT_MAX_SIZE']
+        )
+    app.extensions["quotes"] = {
+        "cache": cache_from_config(app.config),
+        "leaderboard": Leaderboard(load_top_quotes, app.config['LEADERBOARD_SIZE'], app.config['LEADERBOARD_TTL']),
+        "vote_buffer": vote_buffer,
+        "profiler": profiler,
+        "group_commit": group_commit,
+    }
+    app.register_blueprint(bp)
+    apps.add(app)
+    return app
+
+
+def dispose_engines():
+    """Forget the pooled connections every app inherited from the parent process, without closing them."""
+    for app in list(apps):
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+
+def close_writers():
+    """Write out the votes and records still waiting in the apps' vote buffers and group commits."""
+    for app in list(apps):
+        for name in ("vote_buffer", "group_commit"):
+            writer = app.extensions["quotes"][name]
+            if writer is not None:
+                writer.close()
+
 
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+# Один хук на процесс, сколько бы приложений ни собрал create_app
+os.register_at_fork(after_in_child=dispose_engines)
+atexit.register(close_writers)
+
+
+def extension(name: str):
+    """Per-app object made by create_app: cache, leaderboard, vote_buffer, profiler or group_commit."""
+    return current_app.extensions["quotes"][name]
+
+
+def dialect() -> str:
+    return db.engine.dialect.name
+
+
+cache = LocalProxy(partial(extension, "cache"))
+leaderboard = LocalProxy(partial(extension, "leaderboard"))
 
 
 class AuthorModel(db.Model):
    id = db.Column(db.Integer, primary_key=True)
    name = db.Column(db.String(32), unique=True)
-   surname = db.Column(db.String(32), nullable=True)
+   surname = db.Column(db.String(32), nullable=True, index=True)
    __table_args__ = (db.UniqueConstraint('name', 'surname'),) #не работает из-за unique в name, compate_type в env.py не помог
    quotes = db.relationship('QuoteModel', backref='author', lazy='dynamic', cascade="all, delete-orphan")
    is_deleted = db.Column(db.Boolean, unique=False, default=False, server_default=false())
@@ -47,8 +198,14 @@ class QuoteModel(db.Model):
    id = db.Column(db.Integer, primary_key=True)
    author_id = db.Column(db.Integer, db.ForeignKey(AuthorModel.id))
    text = db.Column(db.String(255), unique=False)
-   created = db.Column(db.DateTime(timezone=True), server_default=func.now())
-   rating = db.Column(db.Integer, nullable=False, default='1', server_default='1')
+   created = db.Column(db.DateTime(timezone=True), server_default=func.now(), index=True)
+   rating = db.Column(db.Integer, nullable=False, default='1', server_default='1', index=True)
+   # индексы под /quotes/filters: автор + рейтинг, рейтинг + сортировка по дате;
+   # (author_id, rating, created) еще и отдает топ автора для /quotes/top без сортировки
+   __table_args__ = (
+       db.Index('ix_quote_model_author_id_rating_created', 'author_id', 'rating', 'created'),
+       db.Index('ix_quote_model_rating_created', 'rating', 'created'),
+   )
 
    def __init__(self, author, text, created=func.now(), rating=1):
        self.author_id = author.id
@@ -56,17 +213,176 @@ class QuoteModel(db.Model):
        self.created = created
        self.rating = rating
 
-   def to_dict(self):
+   def to_dict(self, author=None):
+       # author - уже готовый dict автора, чтобы не сериализовать его заново
        return {
            "id": self.id,
            "text": self.text,
-           "author": self.author.to_dict(), #связанный параметр
+           "author": author if author is not None else self.author.to_dict(), #связанный параметр
            "rating": self.rating,
            "created": self.created
        }
 
 
-@app.errorhandler(404)
+# Покрывающий индекс для общего топа /quotes/top: порядок совпадает с ORDER BY,
+# а author_id нужен доске лидеров, так что таблицу читать не приходится
+db.Index('ix_quote_model_top', QuoteModel.rating.desc(), QuoteModel.created.desc(), QuoteModel.id.desc(), QuoteModel.author_id)
+
+
+class TableVersion(db.Model):
+   # Счетчик изменений таблицы; увеличивается триггерами (миграция table_versions)
+   # при любом INSERT/UPDATE/DELETE и используется для ETag/Last-Modified.
+   # В PostgreSQL счетчик разбит на shard, чтобы пишущие транзакции не ждали одну строку
+   # (миграция table_version_shards): версия и число строк таблицы - суммы по ее shard
+   name = db.Column(db.String(64), primary_key=True)
+   shard = db.Column(db.Integer, primary_key=True, server_default='0')
+   version = db.Column(db.Integer, nullable=False, server_default='0')
+   row_count = db.Column(db.Integer, nullable=False, server_default='0')
+   modified = db.Column(db.DateTime, server_default=func.now())
+
+
+class AuthorStats(db.Model):
+   # Число цитат и сумма рейтингов автора; ведется триггерами (миграция quote_aggregates)
+   author_id = db.Column(db.Integer, primary_key=True)
+   quote_count = db.Column(db.Integer, nullable=False, server_default='0')
+   rating_sum = db.Column(db.Integer, nullable=False, server_default='0')
+
+   def to_dict(self):
+       return {
+           "author_id": self.author_id,
+           "count": self.quote_count,
+           "avg_rating": round(self.rating_sum / self.quote_count, 2) if self.quote_count else None
+       }
+
+
+# число цитат без COUNT(*): его ведут те же триггеры
+QUOTE_COUNT = select(func.sum(TableVersion.row_count)).where(TableVersion.name == "quote_model")
+
+
+def load_table_versions(tables) -> tuple[dict, object]:
+    rows = db.session.execute(
+        select(
+            TableVersion.name,
+            func.sum(TableVersion.version).label("version"),
+            func.max(TableVersion.modified).label("modified"),
+        )
+        .where(TableVersion.name.in_(tables))
+        .group_by(TableVersion.name)
+    ).all()
+    return {row.name: row.version for row in rows}, max((row.modified for row in rows if row.modified), default=None)
+
+
+def versioned(*tables):
+    """ETag/304 support for GET views built from ``tables`` (see conditional.py)."""
+    return conditional(
+        load_table_versions, *tables, variant=lambda: "ndjson" if wants_ndjson() else "json", vary="Accept"
+    )
+
+
+QUOTE_TABLES = ("quote_model", "author_model")  # цитата включает автора
+AUTHOR_TABLES = ("author_model",)
+
+
+def load_top_quotes(author_id: int | None, limit: int) -> list:
+    # идет по ix_quote_model_top / ix_quote_model_author_id_rating_created, без сортировки
+    query = (
+        select(QuoteModel.id, QuoteModel.author_id, QuoteModel.rating, QuoteModel.created)
+        .order_by(QuoteModel.rating.desc(), QuoteModel.created.desc(), QuoteModel.id.desc())
+        .limit(limit)
+    )
+    if author_id is not None:
+        query = query.where(QuoteModel.author_id == author_id)
+    return db.session.execute(query).all()
+
+
+def ranking_changed(rows):
+    """Pass new ratings (rows with id, author_id, rating, created) to the leaderboard."""
+    for row in rows:
+        leaderboard.update(row.id, row.author_id, row.rating, row.created)
+
+
+# Те же поля, что в AuthorModel.to_dict/QuoteModel.to_dict, но dict собирается прямо
+# из строки результата - без ORM-объектов; запрос: db.session.query(QUOTE_ROW)
+AUTHOR_ROW = Projection("author", AuthorModel.id, AuthorModel.name, AuthorModel.surname, AuthorModel.is_deleted)
+QUOTE_ROW = Projection("quote", QuoteModel.id, QuoteModel.text, AUTHOR_ROW, QuoteModel.rating, QuoteModel.created)
+
+
+# ?fields=id,text,rating - какие поля цитаты отдавать и выбирать из БД (по умолчанию все);
+# ?include=author - в цитатах только author_id, а сами авторы один раз в "authors" по id
+QUOTE_FIELDS = {
+    "id": QuoteModel.id,
+    "text": QuoteModel.text,
+    "author_id": QuoteModel.author_id,
+    "author": AUTHOR_ROW,
+    "rating": QuoteModel.rating,
+    "created": QuoteModel.created,
+}
+QUOTE_DEFAULT_FIELDS = ["id", "text", "author", "rating", "created"]
+
+
+def quote_projection(args=None) -> tuple[Projection, bool]:
+    """Projection asked for by ``?fields=`` and whether ``?include=author`` side-loads the authors."""
+    args = request.args if args is None else args
+    fields = args.get("fields")
+    names = fields.split(",") if fields else list(QUOTE_DEFAULT_FIELDS)
+    unknown = [name for name in names if name not in QUOTE_FIELDS]
+    if unknown:
+        abort(400, f"Unknown field(s): {', '.join(unknown)}, use: {', '.join(QUOTE_FIELDS)}")
+    include = args.get("include")
+    if include not in (None, "author"):
+        abort(400, "Only include=author is supported")
+    if include is not None:
+        names = ["author_id" if name == "author" else name for name in names] + ["author_id"]
+    names = list(dict.fromkeys(names))  # без повторов, порядок как в запросе
+    return Projection("quote", *(QUOTE_FIELDS[name] for name in names)), include is not None
+
+
+def has_author(projection: Projection) -> bool:
+    return "author" in projection.c
+
+
+def quote_rows(projection: Projection = QUOTE_ROW):
+    """Query of quote dicts; author_model is joined only if the projection has the author."""
+    query = db.session.query(projection).select_from(QuoteModel)
+    if has_author(projection):
+        query = query.outerjoin(AuthorModel, QuoteModel.author_id == AuthorModel.id)
+    return query
+
+
+def quote_list(quotes_dict: list[dict], include_author: bool):
+    """Body of a quote list: the list itself, or {"quotes": [...], "authors": {id: author}} with include=author."""
+    if not include_author:
+        return quotes_dict
+    author_ids = {quote["author_id"] for quote in quotes_dict}
+    authors = db.session.query(AUTHOR_ROW).filter(AuthorModel.id.in_(author_ids))
+    return {"quotes": quotes_dict, "authors": {row[0]["id"]: row[0] for row in authors}}
+
+
+def quote_list_tags(body) -> list[str]:
+    """author:<id> cache tags of a quote list body; none if it has no author data."""
+    if isinstance(body, dict):
+        return [f"author:{author_id}" for author_id in body["authors"]]
+    return [f"author:{quote['author']['id']}" for quote in body if "author" in quote]
+
+
+# Кэш сбрасывается по тегам: quote:<id>, author:<id>, author_quotes:<author_id>
+# и quotes - для всех страниц списка цитат. Вызываем после commit.
+def quotes_changed(quote_ids=(), author_ids=()):
+    cache.invalidate(
+        "quotes",
+        *{f"quote:{quote_id}" for quote_id in quote_ids},
+        *{f"author_quotes:{author_id}" for author_id in author_ids},
+    )
+
+
+def authors_changed(author_ids, with_quotes=False):
+    tags = {f"author:{author_id}" for author_id in author_ids}
+    if with_quotes:
+        tags |= {"quotes", *(f"author_quotes:{author_id}" for author_id in author_ids)}
+    cache.invalidate(*tags)
+
+
+@bp.app_errorhandler(404)
 def handler_bad_request(error):
     return "A quote or author with such parameters was not found", 404
 
@@ -74,35 +390,59 @@ def handler_bad_request(error):
 #Author
 #--------------------------------------------------------------------------
 #Author. Get by id
-@app.route("/authors/<int:author_id>")
+@bp.route("/authors/<int:author_id>")
+@versioned(*AUTHOR_TABLES)
 def get_author_by_id(author_id):
-    author = AuthorModel.query.filter_by(is_deleted=False, id=author_id).first()
-    if author is None:
-        abort(404)
-    return author.to_dict()
+    def load():
+        author = AuthorModel.query.filter_by(is_deleted=False, id=author_id).first()
+        if author is None:
+            abort(404)
+        return author.to_dict()
+    return cache.get_or_set(f"author:{author_id}", load, lambda author: [f"author:{author_id}"], current_versions())
 
 #Author. Get all
-@app.route("/authors")
+# http://127.0.0.1:5000/authors?limit=50&after=<X-Next-Cursor>
+# http://127.0.0.1:5000/authors?format=ndjson - выгрузка всех авторов потоком
+@bp.route("/authors")
+@versioned(*AUTHOR_TABLES)
 def get_authors():
-    authors: list[AuthorModel] = AuthorModel.query.filter_by(is_deleted=False).all()
-    authors_dict: list[dict] = [author.to_dict() for author in authors]
-    return authors_dict
+    query = db.session.query(AUTHOR_ROW).filter(AuthorModel.is_deleted == false())
+    if wants_ndjson():
+        return ndjson_response(query.order_by(AuthorModel.id), iter_projected)
+    authors_dict, next_cursor = keyset_page(query, "id", [(AuthorModel.id, False)])
+    return authors_dict, 200, page_headers(next_cursor)
+
+#Author. Full-text search by name and surname
+# http://127.0.0.1:5000/authors/search?q=knu&limit=20
+@bp.route("/authors/search")
+@versioned(*AUTHOR_TABLES)
+def search_authors():
+    q = fts_query(request.args.get("q"), dialect())
+    if q is None:
+        return "Add a search query: ?q=...", 400
+    query, rank = search(AuthorModel.query.filter_by(is_deleted=False), author_fts, AuthorModel, q, dialect())
+    authors, next_cursor = keyset_page(query, "rank", [(rank, False), (AuthorModel.id, False)])
+    return [author.to_dict() for author in authors], 200, page_headers(next_cursor)
 
 #Author. Create
-@app.post("/authors")
+@bp.post("/authors")
 def create_author():
     author_data = request.json
     name = author_data["name"]
+    group_commit = extension("group_commit")
+    if group_commit is not None:
+        return group_commit.submit(("author", {"name": name, "surname": author_data["surname"] or None})), 201
     author = AuthorModel(name)
     if len(author_data["surname"]) != 0:
         surname = author_data["surname"]
         author = AuthorModel(name, surname)
     db.session.add(author)
     db.session.commit()
+    authors_changed([author.id])
     return author.to_dict(), 201
 
 #Author. Edit
-@app.put("/authors/<int:author_id>")
+@bp.put("/authors/<int:author_id>")
 def edit_author(author_id):
     author_data = request.json
     author = AuthorModel.query.filter_by(is_deleted=False, id=author_id).first()
@@ -112,49 +452,155 @@ def edit_author(author_id):
         setattr(author, key, value)
     db.session.add(author)
     db.session.commit()
+    authors_changed([author_id])
     return jsonify(author.to_dict()), 200
 
 #Author. Full delete
-@app.delete("/authors/<int:author_id>/delete")
+@bp.delete("/authors/<int:author_id>/delete")
 def full_delete_author(author_id):
     author = AuthorModel.query.get(author_id)
     if author is None:
         abort(404)
     db.session.delete(author)
     db.session.commit()
+    authors_changed([author_id], with_quotes=True)
+    leaderboard.remove_author(author_id)
     return f"Author with id={author_id} has really been deleted", 200
 
 #Author. Soft delete
-@app.delete("/authors/<int:author_id>")
+@bp.delete("/authors/<int:author_id>")
 def sort_delete_author(author_id):
     author = AuthorModel.query.get(author_id)
     if author is None:
         abort(404)
     author.is_deleted = True
     db.session.commit()
+    authors_changed([author_id])
     return f"Author with id={author_id} has deleted", 200
 
+#Author. Bulk operations
+# Какие авторы затронуты: {"ids": [1, 2, 3]} в теле, ?ids=1,2,3 или фильтр {"name": ..., "surname": ...}
+AUTHOR_SELECTION_FIELDS = {
+    "name": AuthorModel.name,
+    "surname": AuthorModel.surname,
+}
+
+def author_selection(data=None, args=None):
+    """WHERE clause for the authors picked by a bulk request, or None if nothing was picked.
+
+    ``data`` and ``args`` are the JSON body and the query args, by default those of the request.
+    """
+    data = (request.get_json(silent=True) or {}) if data is None else data
+    args = request.args if args is None else args
+    if not isinstance(data, dict):
+        abort(400, "Expected a JSON object")
+    ids = data.get("ids")
+    if ids is not None and not isinstance(ids, list):
+        abort(400, "'ids' must be a list of numbers")  # строка "12" иначе разберется как [1, 2]
+    if ids is None and "ids" in args:
+        ids = args["ids"].split(",")
+    if ids is not None:
+        try:
+            return AuthorModel.id.in_([int(author_id) for author_id in ids])
+        except (TypeError, ValueError):
+            abort(400, "'ids' must be a list of numbers")
+    conditions = [column == data[field] for field, column in AUTHOR_SELECTION_FIELDS.items() if field in data]
+    if not conditions:
+        return None
+    return and_(*conditions)
+
+
+def set_deleted_statement(condition, is_deleted: bool):
+    """UPDATE ... RETURNING that soft deletes or recovers the selected authors."""
+    return (
+        update(AuthorModel)
+        .where(condition, AuthorModel.is_deleted == (not is_deleted))
+        .values(is_deleted=is_deleted)
+        .returning(AuthorModel)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def full_delete_statements(condition) -> tuple:
+    """DELETE of the quotes of the selected authors and DELETE ... RETURNING of the authors themselves."""
+    # bulk DELETE не выполняет ORM cascade, поэтому цитаты удаляем сами в той же транзакции
+    return (
+        delete(QuoteModel)
+        .where(QuoteModel.author_id.in_(select(AuthorModel.id).where(condition)))
+        .execution_options(synchronize_session=False),
+        delete(AuthorModel).where(condition).returning(AuthorModel).execution_options(synchronize_session=False),
+    )
+
+
+def set_authors_deleted(condition, is_deleted: bool) -> list[dict]:
+    """Soft delete or recover the selected authors with one UPDATE ... RETURNING."""
+    authors = db.session.scalars(set_deleted_statement(condition, is_deleted)).all()
+    authors_dict: list[dict] = [author.to_dict() for author in authors]  # до commit, иначе объекты перечитываются
+    db.session.commit()
+    authors_changed([author["id"] for author in authors_dict])
+    return authors_dict
+
+
 #Author. Recover all author
-@app.put("/authors/recover/all")
+@bp.put("/authors/recover/all")
 def recover_all_authors():
-    authors: list[AuthorModel] = AuthorModel.query.filter_by(is_deleted=True).all()
-    if len(authors) == 0:
+    authors_dict: list[dict] = set_authors_deleted(true(), False)
+    if len(authors_dict) == 0:
+        abort(404)
+    return authors_dict
+
+#Author. Recover many authors
+# PUT http://127.0.0.1:5000/authors/recover {"ids": [1, 2, 3]}
+@bp.put("/authors/recover")
+def recover_authors():
+    condition = author_selection()
+    if condition is None:
+        return "Add ids or a filter of authors to recover", 400
+    authors_dict: list[dict] = set_authors_deleted(condition, False)
+    if len(authors_dict) == 0:
+        abort(404)
+    return authors_dict
+
+#Author. Soft delete many authors
+# DELETE http://127.0.0.1:5000/authors?ids=1,2,3
+@bp.delete("/authors")
+def soft_delete_authors():
+    condition = author_selection()
+    if condition is None:
+        return "Add ids or a filter of authors to delete", 400
+    authors_dict: list[dict] = set_authors_deleted(condition, True)
+    if len(authors_dict) == 0:
+        abort(404)
+    return authors_dict
+
+#Author. Full delete many authors together with their quotes
+# DELETE http://127.0.0.1:5000/authors/delete?ids=1,2,3
+@bp.delete("/authors/delete")
+def full_delete_authors():
+    condition = author_selection()
+    if condition is None:
+        return "Add ids or a filter of authors to delete", 400
+    delete_quotes, delete_authors = full_delete_statements(condition)
+    db.session.execute(delete_quotes)
+    authors = db.session.scalars(delete_authors).all()
+    authors_dict: list[dict] = [author.to_dict() for author in authors]
+    db.session.commit()
+    authors_changed([author["id"] for author in authors_dict], with_quotes=True)
+    for author in authors_dict:
+        leaderboard.remove_author(author["id"])
+    if len(authors_dict) == 0:
         abort(404)
-    authors_dict: list[dict] = []
-    for author in authors:
-        author.is_deleted = False
-        db.session.commit()
-        authors_dict.append(author.to_dict())
     return authors_dict
 
 #Author. Recover author by author_id
-@app.put("/authors/recover/<int:author_id>")
+@bp.put("/authors/recover/<int:author_id>")
 def recover_author_by_id(author_id):
     author = AuthorModel.query.get(author_id)
     if author is None:
         abort(404)
     author.is_deleted = False
     db.session.commit()
+    authors_changed([author_id])
     return f"Author with id={author_id} has recovered", 200
 
 #Quotes
@@ -164,34 +610,166 @@ def recover_author_by_id(author_id):
 # Object -> dict (функция) -> JSON (фреймворк)
 
 #Quote. Get all quotes
-# http://127.0.0.1:5000/quotes
-@app.route("/quotes")
+# http://127.0.0.1:5000/quotes?sort=rating&limit=50&after=<X-Next-Cursor>
+# http://127.0.0.1:5000/quotes?format=ndjson (или Accept: application/x-ndjson) - выгрузка всех цитат потоком
+# sort=id (по возрастанию), rating и created (сначала лучшие/новые)
+QUOTE_SORT_KEYS = {
+    "id": [(QuoteModel.id, False)],
+    "rating": [(QuoteModel.rating, True), (QuoteModel.id, True)],
+    "created": [(QuoteModel.created, True), (QuoteModel.id, True)],
+}
+
+@bp.route("/quotes")
+@versioned(*QUOTE_TABLES)
 def get_quotes():
-    quotes: list[QuoteModel] = QuoteModel.query.all()
-    quotes_dict: list[dict] = [quote.to_dict() for quote in quotes]
-    return quotes_dict
+    sort = request.args.get("sort", "id")
+    if sort not in QUOTE_SORT_KEYS:
+        return f"Unknown sort '{sort}', use one of: {', '.join(QUOTE_SORT_KEYS)}", 400
+    projection, include_author = quote_projection()
+    query = quote_rows(projection)
+    if wants_ndjson():
+        if include_author:
+            return "include=author is not supported with NDJSON, use fields=...,author_id", 400
+        order_by = [column.desc() if descending else column for column, descending in QUOTE_SORT_KEYS[sort]]
+        return ndjson_response(query.order_by(*order_by), iter_projected)
+
+    def load():
+        quotes_dict, next_cursor = keyset_page(query, sort, QUOTE_SORT_KEYS[sort])
+        return quote_list(quotes_dict, include_author), page_headers(next_cursor)
+
+    def tags(page):
+        return ["quotes", *quote_list_tags(page[0])]
+
+    body, headers = cache.get_or_set(f"quotes:{request.query_string.decode()}", load, tags, current_versions())
+    return body, 200, headers
+
+#Quote. Full-text search by text, ranked by relevance (bm25)
+# http://127.0.0.1:5000/quotes/search?q=оптимизация&limit=20
+@bp.route("/quotes/search")
+@versioned(*QUOTE_TABLES)
+def search_quotes():
+    q = fts_query(request.args.get("q"), dialect())
+    if q is None:
+        return "Add a search query: ?q=...", 400
+    projection, include_author = quote_projection()
+    query, rank = search(quote_rows(projection), quote_fts, QuoteModel, q, dialect())
+    quotes_dict, next_cursor = keyset_page(query, "rank", [(rank, False), (QuoteModel.id, False)])
+    return quote_list(quotes_dict, include_author), 200, page_headers(next_cursor)
 
 #Quote. Get by id
 # http://127.0.0.1:5000/quotes/1
-@app.route("/quotes/<int:quote_id>")  # шаблон урла
+@bp.route("/quotes/<int:quote_id>")  # шаблон урла
+@versioned(*QUOTE_TABLES)
 def get_quote_by_id(quote_id):
-    quote = QuoteModel.query.get(quote_id)
+    def load():
+        quote = QuoteModel.query.get(quote_id)
+        if quote is None:
+            abort(404)
+        return quote.to_dict()
+    return cache.get_or_set(
+        f"quote:{quote_id}",
+        load,
+        lambda quote: [f"quote:{quote_id}", f"author:{quote['author']['id']}"],
+        current_versions(),
+    )
+
+#Quote. Top rated: by rating, then newest first
+# http://127.0.0.1:5000/quotes/top?limit=10
+# http://127.0.0.1:5000/quotes/top?limit=10&author_id=2
+@bp.route("/quotes/top")
+@versioned(*QUOTE_TABLES)
+def get_top_quotes():
+    limit = request.args.get("limit", 10, type=int)
+    if not 0 < limit <= current_app.config['LEADERBOARD_SIZE']:
+        return f"limit must be between 1 and {current_app.config['LEADERBOARD_SIZE']}", 400
+    ids = leaderboard.top(limit, request.args.get("author_id", type=int))
+    quotes = {row[0]["id"]: row[0] for row in quote_rows().filter(QuoteModel.id.in_(ids))}
+    return [quotes[quote_id] for quote_id in ids if quote_id in quotes]
+
+#Quote. Count
+# http://127.0.0.1:5000/quotes/count
+@bp.route("/quotes/count")
+@versioned("quote_model")
+def count_quotes():
+    # счетчик ведут триггеры, COUNT(*) на каждый запрос не нужен
+    count = db.session.scalar(QUOTE_COUNT)
+    return {"count": count}
+
+#Quote. Random
+# http://127.0.0.1:5000/quotes/random
+@bp.route("/quotes/random")
+def get_random_quote():
+    # Берем случайный id между min(id) и max(id) и ищем его по первичному ключу.
+    # Если id удален - пробуем снова, так что выбор равновероятен и после удалений;
+    # при очень разреженных id после RANDOM_QUOTE_ATTEMPTS попыток берем ближайший следующий,
+    # а если после него цитат нет (удалены уже после чтения min/max) - первую с начала.
+    low, high = db.session.execute(select(
+        select(func.min(QuoteModel.id)).scalar_subquery(),
+        select(func.max(QuoteModel.id)).scalar_subquery(),
+    )).one()
+    if low is None:
+        abort(404)
+    for _ in range(current_app.config['RANDOM_QUOTE_ATTEMPTS']):
+        quote_id = random.randint(low, high)
+        quote = db.session.get(QuoteModel, quote_id)
+        if quote is not None:
+            return quote.to_dict()
+    quote = QuoteModel.query.filter(QuoteModel.id >= quote_id).order_by(QuoteModel.id).first()
+    if quote is None:
+        quote = QuoteModel.query.order_by(QuoteModel.id).first()
     if quote is None:
         abort(404)
     return quote.to_dict()
 
+#Quote. Count and average rating of an author's quotes
+# http://127.0.0.1:5000/authors/2/quotes/stats
+@bp.route("/authors/<int:author_id>/quotes/stats")
+@versioned("quote_model")
+def get_author_quote_stats(author_id):
+    stats = db.session.get(AuthorStats, author_id)
+    if stats is None or stats.quote_count == 0:
+        abort(404)
+    return stats.to_dict()
+
+#Quote. Count and average rating for every author
+# http://127.0.0.1:5000/authors/quotes/stats?limit=100
+@bp.route("/authors/quotes/stats")
+@versioned("quote_model")
+def get_authors_quote_stats():
+    query = AuthorStats.query.filter(AuthorStats.quote_count > 0)
+    stats, next_cursor = keyset_page(query, "author_id", [(AuthorStats.author_id, False)])
+    return [item.to_dict() for item in stats], 200, page_headers(next_cursor)
+
 #Quote. Get all author`s quotes
 # http://127.0.0.1:5000/authors/2/quotes
-@app.route("/authors/<int:author_id>/quotes")
+# http://127.0.0.1:5000/authors/2/quotes?fields=id,text&include=author - автор один раз, а не в каждой цитате
+@bp.route("/authors/<int:author_id>/quotes")
+@versioned(*QUOTE_TABLES)
 def get_all_quotes_by_author(author_id):
-    quotes: list[QuoteModel] = QuoteModel.query.filter_by(author_id=f"{author_id}")
-    quotes_dict: list[dict] = [quote.to_dict() for quote in quotes]
-    if len(quotes_dict) == 0:
-        abort(404)
-    return quotes_dict
+    projection, include_author = quote_projection()
+    query = quote_rows(projection).filter(QuoteModel.author_id == author_id)
+    if wants_ndjson():
+        if include_author:
+            return "include=author is not supported with NDJSON, use fields=...,author_id", 400
+        # EXISTS по одной колонке: из Projection (Bundle) подзапрос не строится
+        if not db.session.query(query.with_entities(QuoteModel.id).exists()).scalar():
+            abort(404)
+        return ndjson_response(query.order_by(QuoteModel.id), iter_projected)
+
+    def load():
+        quotes_dict: list[dict] = [row[0] for row in query]
+        if len(quotes_dict) == 0:
+            abort(404)
+        return quote_list(quotes_dict, include_author)
+    return cache.get_or_set(
+        f"author_quotes:{author_id}:{request.query_string.decode()}",
+        load,
+        lambda body: [f"author_quotes:{author_id}", f"author:{author_id}"],
+        current_versions(),
+    )
 
 #Quote. Create
-@app.route("/authors/<int:author_id>/quotes", methods=["POST"])
+@bp.route("/authors/<int:author_id>/quotes", methods=["POST"])
 def create_quote(author_id):
     author = AuthorModel.query.get(author_id)
     new_quote = request.json
@@ -200,13 +778,192 @@ def create_quote(author_id):
         new_quote['rating'] = '5'
     elif rating <= 0:
         new_quote['rating'] = '1'
+    group_commit = extension("group_commit")
+    if group_commit is not None:
+        if author is None:
+            abort(404)
+        values = {"author_id": author_id, "text": new_quote['text'], "rating": int(new_quote['rating'])}
+        return group_commit.submit(("quote", values)), 201
     quote = QuoteModel(author, **new_quote) #распаковка через **
     db.session.add(quote)
     db.session.commit()
+    quotes_changed([quote.id], [author_id])
+    ranking_changed([quote])
     return quote.to_dict(), 201
 
+def insert_created(app: Flask, items: list[tuple]) -> list[dict]:
+    """Insert a group of new ("author", values) and ("quote", values) in one transaction.
+
+    Returns the to_dict() of every new row in the order of ``items``; see GroupCommit.
+    """
+    with app.app_context():
+        authors = [values for kind, values in items if kind == "author"]
+        quotes = [values for kind, values in items if kind == "quote"]
+        new_authors, new_quotes, quote_authors = [], [], {}
+        if authors:
+            # одна INSERT ... RETURNING на всех; sort_by_parameter_order - строки в порядке authors
+            new_authors = db.session.scalars(
+                insert(AuthorModel).returning(AuthorModel, sort_by_parameter_order=True), authors
+            ).all()
+            new_authors = [author.to_dict() for author in new_authors]  # до commit, иначе объекты перечитываются
+        if quotes:
+            new_quotes = db.session.execute(
+                insert(QuoteModel).returning(
+                    QuoteModel.id, QuoteModel.author_id, QuoteModel.text, QuoteModel.rating, QuoteModel.created,
+                    sort_by_parameter_order=True,
+                ),
+                quotes,
+            ).all()
+            quote_authors = {
+                author.id: author.to_dict()
+                for author in db.session.scalars(
+                    select(AuthorModel).where(AuthorModel.id.in_({quote.author_id for quote in new_quotes}))
+                )
+            }
+        db.session.commit()
+        if new_authors:
+            authors_changed([author["id"] for author in new_authors])
+        if new_quotes:
+            quotes_changed([quote.id for quote in new_quotes], [quote.author_id for quote in new_quotes])
+            ranking_changed(new_quotes)
+        created = {
+            "author": iter(new_authors),
+            "quote": iter(
+                {"id": quote.id, "text": quote.text, "author": quote_authors[quote.author_id],
+                 "rating": quote.rating, "created": quote.created}
+                for quote in new_quotes
+            ),
+        }
+        return [next(created[kind]) for kind, _ in items]
+
+#Quote. Bulk import
+# POST http://127.0.0.1:5000/quotes/bulk?chunk_size=500
+# [{"name": "Donald", "surname": "Knuth", "text": "...", "rating": 5}, ...]
+# или то же самое построчно с Content-Type: application/x-ndjson
+def clean_bulk_row(row) -> tuple[tuple, dict]:
+    """Validate one bulk row and return its author key and quote values, or raise ValueError."""
+    if not isinstance(row, dict):
+        raise ValueError("Row must be a JSON object")
+    name, text = row.get("name"), row.get("text")
+    if not isinstance(name, str) or len(name) == 0:
+        raise ValueError("'name' is required")
+    if not isinstance(text, str) or len(text) == 0:
+        raise ValueError("'text' is required")
+    try:
+        rating = int(row.get("rating", 1))
+    except (TypeError, ValueError):
+        raise ValueError("'rating' must be a number")
+    rating = min(max(rating, 1), 5)  # как в create_quote
+    return (name, row.get("surname") or None), {"text": text, "rating": rating}
+
+
+def resolve_authors(keys: set, known: dict, session=None) -> tuple[list, dict]:
+    """Map (name, surname) keys to author ids, creating the missing authors in one INSERT.
+
+    Found ids are stored in ``known``. Returns the keys of the authors created
+    here and the errors for keys that cannot be used. Runs in ``session``,
+    db.session by default.
+    """
+    session = db.session if session is None else session
+    missing = {key for key in keys if key not in known}
+    if not missing:
+        return [], {}
+    existing = session.execute(
+        select(AuthorModel.id, AuthorModel.name, AuthorModel.surname)
+        .where(AuthorModel.name.in_({name for name, _ in missing}))
+    )
+    taken = set()
+    for author_id, name, surname in existing:
+        known[(name, surname)] = author_id
+        taken.add(name)
+
+    errors = {}
+    new_authors = []
+    for key in missing - known.keys():
+        if key[0] in taken:  # name уникален сам по себе
+            errors[key] = f"Author name '{key[0]}' is already used with another surname"
+        else:
+            new_authors.append({"name": key[0], "surname": key[1]})
+    created = []
+    if new_authors:
+        rows = session.execute(
+            insert(AuthorModel).returning(AuthorModel.id, AuthorModel.name, AuthorModel.surname),
+            new_authors,
+        )
+        for author_id, name, surname in rows:
+            known[(name, surname)] = author_id
+            created.append((name, surname))
+    return created, errors
+
+
+def import_chunk(chunk: list, known: dict, report: dict):
+    """Insert one chunk of (index, key, values) in a single transaction.
+
+    If the transaction fails, the chunk is retried row by row so that only
+    the broken rows are reported.
+    """
+    created = []
+    chunk_errors = []  # в отчет только после commit: при откате строки повторяются по одной
+    try:
+        created, errors = resolve_authors({key for _, key, _ in chunk}, known)
+        quotes = []
+        for index, key, values in chunk:
+            if key in errors:
+                chunk_errors.append({"index": index, "error": errors[key]})
+            else:
+                quotes.append({"author_id": known[key], **values})
+        rows = []
+        if quotes:
+            rows = db.session.execute(
+                insert(QuoteModel).returning(QuoteModel.id, QuoteModel.author_id, QuoteModel.rating, QuoteModel.created),
+                quotes,
+            ).all()
+        db.session.commit()
+        quotes_changed(author_ids=[quote["author_id"] for quote in quotes])
+        ranking_changed(rows)
+    except SQLAlchemyError as error:
+        db.session.rollback()
+        for key in created:
+            known.pop(key, None)
+        if len(chunk) == 1:
+            report["errors"].append({"index": chunk[0][0], "error": str(error.orig or error)})
+            return
+        for row in chunk:
+            import_chunk([row], known, report)
+        return
+    report["errors"].extend(chunk_errors)
+    report["inserted"] += len(quotes)
+    report["authors_created"] += len(created)
+
+
+@bp.post("/quotes/bulk")
+def create_quotes_bulk():
+    chunk_size = request.args.get("chunk_size", current_app.config['BULK_CHUNK_SIZE'], type=int)
+    if chunk_size <= 0:
+        return "chunk_size must be a positive number", 400
+    report = {"inserted": 0, "authors_created": 0, "errors": []}
+    known: dict[tuple, int] = {}
+    chunk = []
+    for index, row, error in iter_request_rows():
+        if error is None:
+            try:
+                key, values = clean_bulk_row(row)
+            except ValueError as exc:
+                error = str(exc)
+        if error is not None:
+            report["errors"].append({"index": index, "error": error})
+            continue
+        chunk.append((index, key, values))
+        if len(chunk) == chunk_size:
+            import_chunk(chunk, known, report)
+            chunk = []
+    if chunk:
+        import_chunk(chunk, known, report)
+    report["errors"].sort(key=lambda e: e["index"])
+    return report, 201 if report["inserted"] else 400
+
 #Quote. Edit
-@app.put("/quotes/<int:quote_id>")
+@bp.put("/quotes/<int:quote_id>")
 def edit_quote(quote_id):
     new_quote = request.json
     quote = QuoteModel.query.get(quote_id)
@@ -214,6 +971,7 @@ def edit_quote(quote_id):
         abort(404)
     quote.text = new_quote["text"]
     db.session.commit()
+    quotes_changed([quote_id], [quote.author_id])
     return jsonify(quote.to_dict()), 200
 #добавить
     # for key, value in author_data.items():
@@ -222,50 +980,214 @@ def edit_quote(quote_id):
     # db.session.commit()
     # return jsonify(author.to_dict()), 200
 
-@app.delete("/quotes/<int:quote_id>")
+@bp.delete("/quotes/<int:quote_id>")
 def delete_quote(quote_id):
     quote = QuoteModel.query.get(quote_id)
     if quote is None:
         abort(404)
     else:
+        author_id = quote.author_id
         db.session.delete(quote)
         db.session.commit()
+        quotes_changed([quote_id], [author_id])
+        leaderboard.remove(quote_id, author_id)
         return f"Quote with id={quote_id} has deleted", 200
 
 
 #Over requests of filters
 #-------------------------------------------------------------------------------
-@app.get("/quotes/<int:quote_id>/increase_rating")
-def increase_rating(quote_id):
-    quote = QuoteModel.query.get(quote_id)
+def change_rating(quote_id: int, delta: int):
+    """Add ``delta`` to the rating with one conditional UPDATE ... RETURNING.
+
+    The check and the change happen inside the database, so concurrent votes
+    are never lost. Returns the updated quote, or None if the rating is already
+    at the limit (aborts with 404 if there is no such quote).
+    """
+    limit = QuoteModel.rating < RATING_MAX if delta > 0 else QuoteModel.rating > RATING_MIN
+    quote = db.session.scalars(
+        update(QuoteModel)
+        .where(QuoteModel.id == quote_id, limit)
+        .values(rating=QuoteModel.rating + delta)
+        .returning(QuoteModel)
+        .execution_options(synchronize_session=False)
+    ).one_or_none()
+    db.session.commit()
     if quote is None:
-        abort(404)
-    if quote.rating < 5:
-        quote.rating += 1
+        if db.session.get(QuoteModel, quote_id) is None:
+            abort(404)
+        return None
+    quotes_changed([quote_id], [quote.author_id])
+    ranking_changed([quote])
+    return quote
+
+
+def rating_steps_statement(steps: dict[int, tuple]):
+    """One UPDATE applying a (delta, low, high) step per quote id, RETURNING (id, rating, author_id, created)."""
+    new_rating = case(
+        {quote_id: step_expression(QuoteModel.rating, step) for quote_id, step in steps.items()},
+        value=QuoteModel.id,
+    )
+    return (
+        update(QuoteModel)
+        .where(QuoteModel.id.in_(steps))
+        .values(rating=new_rating)
+        .returning(QuoteModel.id, QuoteModel.rating, QuoteModel.author_id, QuoteModel.created)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def apply_rating_steps(steps: dict[int, tuple]) -> list:
+    """Apply a (delta, low, high) step per quote id in one UPDATE; returns (id, rating, author_id, created) rows."""
+    if not steps:
+        return []
+    return db.session.execute(rating_steps_statement(steps)).all()
+
+
+def flush_votes(app: Flask, steps: dict[int, tuple]):
+    with app.app_context():
+        rows = apply_rating_steps(steps)
         db.session.commit()
+        quotes_changed([row.id for row in rows], [row.author_id for row in rows])
+        ranking_changed(rows)
+
+
+# Локальная "репликация" для проверки чтения с реплики на двух файлах SQLite:
+# FLASK_SQLALCHEMY_REPLICA_URI=sqlite:///replica.db flask --app app replicate --interval 1
+@bp.cli.command("replicate")
+@click.option("--interval", default=1.0, help="Seconds between copies, i.e. the simulated replication lag.")
+def replicate_command(interval):
+    """Copy the primary SQLite database into the replica every INTERVAL seconds."""
+    primary = current_app.config['SQLALCHEMY_DATABASE_URI']
+    replica_uri = current_app.config['SQLALCHEMY_REPLICA_URI']
+    if not (replica_uri and is_sqlite_file(primary) and is_sqlite_file(replica_uri)):
+        raise click.UsageError("Both SQLALCHEMY_DATABASE_URI and SQLALCHEMY_REPLICA_URI must be SQLite files")
+    primary, replica = make_url(primary), make_url(replica_uri)
+    click.echo(f"Replicating {primary.database} -> {replica.database} every {interval}s, Ctrl+C to stop")
+    try:
+        replicate(primary.database, replica.database, interval)
+    except KeyboardInterrupt:
+        pass
+
+
+class MigrationsGroup(click.Group):
+    """``flask db ...`` that imports Flask-Migrate (and with it Alembic) only when it is run."""
+
+    def commands_group(self) -> click.Group:
+        from flask_migrate import Migrate
+        from flask_migrate.cli import db as migrate_cli
+
+        if "migrate" not in current_app.extensions:
+            Migrate(current_app._get_current_object(), db)
+        return migrate_cli
+
+    def list_commands(self, ctx):
+        return self.commands_group().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self.commands_group().get_command(ctx, name)
+
+
+# flask --app app db upgrade; остальные команды и сервер Alembic не загружают
+bp.cli.add_command(MigrationsGroup("db", help="Perform database migrations."))
+
+
+def buffer_vote(quote_id: int, delta: int):
+    if db.session.get(QuoteModel, quote_id) is None:
+        abort(404)
+    extension("vote_buffer").add(quote_id, delta)
+    return {"id": quote_id, "delta": delta, "buffered": True}, 202
+
+
+@bp.get("/quotes/<int:quote_id>/increase_rating")
+def increase_rating(quote_id):
+    if extension("vote_buffer") is not None:
+        return buffer_vote(quote_id, +1)
+    quote = change_rating(quote_id, +1)
+    if quote is not None:
         return jsonify(quote.to_dict()), 200
     return f"Rating for quote {quote_id} is maxed out", 200
     
-@app.get("/quotes/<int:quote_id>/decrease_rating")
+@bp.get("/quotes/<int:quote_id>/decrease_rating")
 def decrease_rating(quote_id):
-    quote = QuoteModel.query.get(quote_id)
-    if quote is None:
-        abort(404)
-    if quote.rating > 1:
-        quote.rating -= 1
-        db.session.commit()
+    if extension("vote_buffer") is not None:
+        return buffer_vote(quote_id, -1)
+    quote = change_rating(quote_id, -1)
+    if quote is not None:
         return jsonify(quote.to_dict()), 200
     return f"rating for quote {quote_id} is minumum", 200
 
+#Quote. Vote buffer counters
+# http://127.0.0.1:5000/quotes/ratings/buffer
+@bp.get("/quotes/ratings/buffer")
+def get_vote_buffer_stats():
+    vote_buffer = extension("vote_buffer")
+    if vote_buffer is None:
+        return {"enabled": False}
+    return {"enabled": True, **vote_buffer.stats()}
+
+#Quote. Many votes in one request
+# POST http://127.0.0.1:5000/quotes/ratings
+# [{"id": 1, "delta": 1}, {"id": 2, "delta": -2}, {"id": 1, "delta": 1}]
+# delta=N считается как N отдельных голосов, каждый с ограничением 1..5
+def rating_steps(votes) -> dict[int, tuple]:
+    """Fold the votes of a /quotes/ratings body into one step per quote id; raises ValueError on a broken body."""
+    if not isinstance(votes, list):
+        raise ValueError("Expected a list of {\"id\": ..., \"delta\": ...}")
+    steps: dict[int, tuple] = {}
+    for vote in votes:
+        try:
+            quote_id, delta = int(vote["id"]), int(vote["delta"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Invalid vote: {vote}")
+        steps[quote_id] = compose(steps.get(quote_id, IDENTITY), vote_step(delta))
+    return steps
+
+
+@bp.post("/quotes/ratings")
+def change_ratings():
+    try:
+        steps = rating_steps(request.json)
+    except ValueError as error:
+        return str(error), 400
+    rows = apply_rating_steps(steps)
+    db.session.commit()
+    quotes_changed([row.id for row in rows], [row.author_id for row in rows])
+    ranking_changed(rows)
+    ratings = {row.id: row.rating for row in rows}
+    return {
+        "ratings": ratings,
+        "not_found": sorted(set(steps) - ratings.keys()),
+    }, 200
+
+#Group commit counters
+# http://127.0.0.1:5000/commit/stats
+@bp.get("/commit/stats")
+def get_group_commit_stats():
+    group_commit = extension("group_commit")
+    if group_commit is None:
+        return {"enabled": False}
+    return {"enabled": True, **group_commit.stats()}
+
+#Cache counters
+# http://127.0.0.1:5000/cache/stats
+@bp.get("/cache/stats")
+def get_cache_stats():
+    return cache.stats()
+
+#Profiling counters (Prometheus)
+# http://127.0.0.1:5000/metrics
+@bp.get("/metrics")
+def get_metrics():
+    profiler = extension("profiler")
+    if profiler is None:
+        return "Profiling is off, set FLASK_PROFILE_ENABLED=true", 404
+    return profiler.metrics(), 200, {"Content-Type": PROMETHEUS_CONTENT_TYPE}
+
 #Получаем всех авторов с именем или с двумя (ПР, Nina)
 # http://127.0.0.1:5000/authors/filters?name=nina
-@app.get("/authors/filters")
+@bp.get("/authors/filters")
 def get_authors_by():
-    name = request.args.get('name', default=None, type=None)
-    name2 = request.args.get('name2', default=None, type=None)
-    surname = request.args.get('surname', default=None, type=None)
-    surname2 = request.args.get('surname2', default=None, type=None)
-    authors = AuthorModel.query.filter((AuthorModel.name.ilike(f"%{name}%")) | (AuthorModel.name.ilike(f"%{name2}%")) | (AuthorModel.surname.ilike(f"%{surname}%")) | (AuthorModel.surname.ilike(f"%{surname2}%")))
+    authors = AuthorModel.query.filter(author_filters())
     author_dict: list[dict] = []
     for author in authors:
         author_dict.append(author.to_dict())
@@ -273,52 +1195,131 @@ def get_authors_by():
         return abort(404)
     return author_dict
 
+def author_filters(args=None):
+    """WHERE clause of /authors/filters: any of name, name2, surname, surname2 matches as a substring."""
+    args = request.args if args is None else args
+    name = args.get('name', default=None, type=None)
+    name2 = args.get('name2', default=None, type=None)
+    surname = args.get('surname', default=None, type=None)
+    surname2 = args.get('surname2', default=None, type=None)
+    return (AuthorModel.name.ilike(f"%{name}%")) | (AuthorModel.name.ilike(f"%{name2}%")) | (AuthorModel.surname.ilike(f"%{surname}%")) | (AuthorModel.surname.ilike(f"%{surname2}%"))
+
 # Получаем все цитаты по имени автора и/или с определенным рейтингом
-# http://127.0.0.1:5000/quotes/filters?name=rick
-# @app.get("/quotes/filters")
-# def get_quotes_with_filters():
-#     # kwargs = request.args
-#     for x, y in request.args.items():
-#         quotes = QuoteModel.query.join(QuoteModel.author).filter(QuoteModel.f"{x}".ilike(f"%{y}%")) #**kwargs)
-#         if quotes:
-#             result = [quote.to_dict() for quote in quotes]
-#         return jsonify(result), 200
-    # except:
-    #     abort(404)
-    #
-    # name = kwargs.get('name', default=None, type=None)
-    # surname = kwargs.get('surname', default=None, type=None)
-    # rating = kwargs.get('rating', default=None, type=None)
-    # text = kwargs.get('text', default=None, type=None)
-    # quotes = QuoteModel.query.filter((QuoteModel.rating==f"{rating}") | (QuoteModel.text.ilike(f"%{text}%"))
-    # #(QuoteModel.author.has(name=f"%{name}%")) | (QuoteModel.author.has(surname=f"{surname}")) |
-    # # quotes = QuoteModel.qu[[[ery.join(QuoteModel.author).filter(QuoteModel.name == 'Tom')
-    # quote_dict: list[dict] = []
-    # for quote in quotes:
-    #     quote_dict.append(quote.to_dict())
-    # if len(quote_dict) == 0:
-    #     return abort(404)
-    # return quote_dict
-    #
-    #  abort(404)
-    # for key, value in author_data.items():
-    #     setattr(author, key, value)
-    # db.session.add(author)
-    # db.session.commit()
+# http://127.0.0.1:5000/quotes/filters?name=Rick&rating_min=3&sort=created
+# Фильтры объединяются через AND; name/surname - точное совпадение,
+# text - полнотекстовый поиск по словам (как /quotes/search)
+QUOTE_FILTERS = {
+    "author_id": lambda value: QuoteModel.author_id == int(value),
+    "name": lambda value: AuthorModel.name == value,
+    "surname": lambda value: AuthorModel.surname == value,
+    "rating": lambda value: QuoteModel.rating == int(value),
+    "rating_min": lambda value: QuoteModel.rating >= int(value),
+    "rating_max": lambda value: QuoteModel.rating <= int(value),
+}
+QUOTE_FILTER_ARGS = {"text", "sort", "limit", "after", "format", "fields", "include"}
+
 
+def quote_filters_query(args, projection: Projection = QUOTE_ROW, query=None, dialect_name: str | None = None):
+    """Build the quote query for /quotes/filters; raises ValueError on unknown or broken filters.
+
+    Filters are applied in the fixed QUOTE_FILTERS order, so the same set of
+    filters always compiles to the same parameterised SQL and hits the
+    statement cache. ``query`` selects ``projection`` from quote_model
+    (db.session.query by default, appasync.py passes a select()).
+    """
+    unknown = set(args) - QUOTE_FILTERS.keys() - QUOTE_FILTER_ARGS
+    if unknown:
+        raise ValueError(f"Unknown filter(s): {', '.join(sorted(unknown))}")
+    if query is None:
+        query = db.session.query(projection).select_from(QuoteModel)
+    dialect_name = dialect() if dialect_name is None else dialect_name
+    if args.keys() & {"name", "surname"}:
+        query = query.join(AuthorModel, QuoteModel.author_id == AuthorModel.id)
+    elif has_author(projection):
+        # LEFT JOIN не дает планировщику начинать с author_model, и фильтр по рейтингу идет по индексу
+        query = query.outerjoin(AuthorModel, QuoteModel.author_id == AuthorModel.id)
+    for field, condition in QUOTE_FILTERS.items():
+        if field in args:
+            try:
+                query = query.filter(condition(args[field]))
+            except ValueError:
+                raise ValueError(f"'{field}' must be a number")
+    if "text" in args:
+        q = fts_query(args["text"], dialect_name)
+        if q is None:
+            raise ValueError("'text' must contain at least one word")
+        query, _ = search(query, quote_fts, QuoteModel, q, dialect_name)
+    return query
+
+
+@bp.get("/quotes/filters")
+@versioned(*QUOTE_TABLES)
+def get_quotes_with_filters():
+    sort = request.args.get("sort", "id")
+    if sort not in QUOTE_SORT_KEYS:
+        return f"Unknown sort '{sort}', use one of: {', '.join(QUOTE_SORT_KEYS)}", 400
+    projection, include_author = quote_projection()
+    try:
+        query = quote_filters_query(request.args, projection)
+    except ValueError as error:
+        return str(error), 400
+    if wants_ndjson():
+        if include_author:
+            return "include=author is not supported with NDJSON, use fields=...,author_id", 400
+        order_by = [column.desc() if descending else column for column, descending in QUOTE_SORT_KEYS[sort]]
+        return ndjson_response(query.order_by(*order_by), iter_projected)
+    quotes_dict, next_cursor = keyset_page(query, sort, QUOTE_SORT_KEYS[sort])
+    if len(quotes_dict) == 0:
+        abort(404)
+    return quote_list(quotes_dict, include_author), 200, page_headers(next_cursor)
 
 
 #Author. Sorted by name or surname
-@app.route("/authors/sortedby/<tag>")
+# http://127.0.0.1:5000/authors/sortedby/surname?order=desc&then=-name&limit=50
+# then - дополнительные ключи через запятую, "-" перед ключом - по убыванию
+AUTHOR_SORT_COLUMNS = {
+    "name": AuthorModel.name,
+    "surname": AuthorModel.surname,
+}
+
+def author_sort_keys(tag: str, args=None) -> tuple[str, list[tuple]]:
+    """Cursor sort name and keyset keys of /authors/sortedby/<tag>; raises ValueError on an unknown key."""
+    args = request.args if args is None else args
+    if tag not in AUTHOR_SORT_COLUMNS:
+        raise ValueError(f"Unknown sort '{tag}', use one of: {', '.join(AUTHOR_SORT_COLUMNS)}")
+    descending = args.get("order", "asc") == "desc"
+    keys = [(AUTHOR_SORT_COLUMNS[tag], descending)]
+    then = [key for key in args.get("then", "").split(",") if key]
+    for key in then:
+        column = AUTHOR_SORT_COLUMNS.get(key.lstrip("-"))
+        if column is None:
+            raise ValueError(f"Unknown sort '{key}', use one of: {', '.join(AUTHOR_SORT_COLUMNS)}")
+        keys.append((column, key.startswith("-")))
+    keys.append((AuthorModel.id, descending))
+    return f"{tag}:{int(descending)}:{','.join(then)}", keys
+
+@bp.route("/authors/sortedby/<tag>")
+@versioned(*AUTHOR_TABLES)
 def get_sorted_authors(tag):
-    authors: list[AuthorModel] = AuthorModel.query.all()
-    authors_dict: list[dict] = [author.to_dict() for author in authors if author.surname is not None]
-    if tag == "name":
-        authors_dict = sorted(authors_dict, key=lambda x: x['name'])
-    elif tag == "surname":
-        authors_dict = sorted(authors_dict, key=lambda x: x['surname'])
-    return authors_dict
+    try:
+        sort, keys = author_sort_keys(tag)
+    except ValueError as error:
+        return str(error), 400
+    query = AuthorModel.query.filter(AuthorModel.is_deleted == False, AuthorModel.surname.isnot(None))
+    authors, next_cursor = keyset_page(query, sort, keys)
+    authors_dict: list[dict] = [author.to_dict() for author in authors]
+    return authors_dict, 200, page_headers(next_cursor)
+
+def __getattr__(name):
+    # app.app собирается при первом обращении, а не при import app:
+    # flask --app app и gunicorn app:app находят его как раньше
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
 
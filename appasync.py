@@ -0,0 +1,656 @@
+import asyncio
+import contextlib
+import random
+from functools import partial
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql import false, true
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from werkzeug.datastructures import MIMEAccept, MultiDict
+from werkzeug.exceptions import HTTPException, abort
+from werkzeug.http import parse_accept_header
+
+import app as wsgi
+from app import AUTHOR_ROW, QUOTE_COUNT, QUOTE_ROW, QUOTE_SORT_KEYS, AuthorModel, AuthorStats, QuoteModel
+from app import has_author, quote_projection
+from pagination import get_page_args, keyset_query, page_headers, split_page
+from ratings import RATING_MAX, RATING_MIN
+from search import author_fts, fts_query, quote_fts, search
+from sqlite_engine import SQLITE_PROFILES, async_url, set_pragmas
+from streaming import NDJSON
+
+
+# Асинхронный (ASGI) вариант API цитат: те же модели и та же БД, что у app.py,
+# но запросы идут через asyncio-движок SQLAlchemy (aiosqlite для SQLite), и пока
+# один запрос ждет БД, процесс обслуживает остальные.
+# uvicorn appasync:app --port 5000
+# Маршруты те же, что у app.py, кроме счетчиков самого WSGI-процесса:
+# GET /cache/stats, GET /commit/stats, GET /metrics и GET /quotes/ratings/buffer.
+# Кэша ответов, ETag, доски лидеров, буфера голосов и группового коммита здесь нет: они живут
+# в памяти WSGI-процесса, поэтому /quotes/top читает топ прямо по индексу ix_quote_model_top,
+# а голоса и новые записи сразу идут в БД.
+config = wsgi.app.config
+engine = create_async_engine(
+    async_url(config['SQLALCHEMY_DATABASE_URI']),
+    poolclass=AsyncAdaptedQueuePool,  # у aiosqlite по умолчанию NullPool - новое соединение на каждый запрос
+    **config['SQLALCHEMY_ENGINE_OPTIONS'],
+)
+if engine.dialect.name == "sqlite":
+    set_pragmas(engine.sync_engine, SQLITE_PROFILES[config['SQLITE_PROFILE']])
+Session = async_sessionmaker(engine, expire_on_commit=False)
+
+
+class JSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return wsgi.app.json.dumpb(content)  # тот же orjson-провайдер, что у app.py
+
+
+def query_args(request) -> MultiDict:
+    # MultiDict из werkzeug, чтобы общие функции app.py/pagination.py читали аргументы как request.args
+    return MultiDict(request.query_params.multi_items())
+
+
+async def fetch_all(statement) -> list:
+    """Rows of a read ``statement``; every call has its own session, so independent reads can be gathered."""
+    async with Session() as session:
+        return (await session.execute(statement)).all()
+
+
+async def fetch_one(statement):
+    rows = await fetch_all(statement)
+    if not rows:
+        abort(404)
+    return rows[0][0]
+
+
+async def fetch_page(statement, sort: str, keys: list[tuple], args) -> tuple[list, str | None]:
+    page_query, limit = keyset_query(statement, sort, keys, get_page_args(args, config))
+    return split_page(await fetch_all(page_query), limit, sort)
+
+
+async def request_json(request, default=None):
+    """JSON body of the request, or ``default`` if it is empty or broken (as get_json(silent=True))."""
+    try:
+        return await request.json()
+    except ValueError:
+        return default
+
+
+def wants_ndjson(request) -> bool:
+    """streaming.wants_ndjson for a Starlette request."""
+    if request.query_params.get("format") == "ndjson":
+        return True
+    accept = parse_accept_header(request.headers.get("accept"), MIMEAccept)
+    return accept.best_match(["application/json", NDJSON]) == NDJSON
+
+
+def ndjson_response(statement) -> StreamingResponse:
+    """Stream the projected rows of ``statement`` one JSON document per line, as streaming.ndjson_response."""
+    async def generate():
+        dumps = wsgi.app.json.dumps
+        async with Session() as session:
+            rows = await session.stream(statement.execution_options(yield_per=config["EXPORT_YIELD_PER"]))
+            async for row in rows:
+                yield dumps(row[0]) + "\n"
+    return StreamingResponse(generate(), media_type=NDJSON)
+
+
+async def request_lines(request):
+    """Lines of the request body as they arrive."""
+    pending = b""
+    async for chunk in request.stream():
+        *lines, pending = (pending + chunk).split(b"\n")
+        for line in lines:
+            yield line
+    yield pending
+
+
+async def request_rows(request):
+    """streaming.iter_request_rows for a Starlette request: ``(index, row, error)`` per row of the body."""
+    if request.headers.get("content-type", "").split(";")[0].strip().lower() == NDJSON:
+        index = 0
+        async for line in request_lines(request):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield index, wsgi.app.json.loads(line), None
+            except ValueError as error:
+                yield index, None, f"Invalid JSON: {error}"
+            index += 1
+        return
+    rows = await request_json(request)
+    if not isinstance(rows, list):
+        abort(400, "Expected a JSON array or an application/x-ndjson body")
+    for index, row in enumerate(rows):
+        yield index, row, None
+
+
+def quote_select(projection=QUOTE_ROW):
+    """select() of quote dicts; author_model is joined only if the projection has the author (see quote_rows)."""
+    statement = select(projection).select_from(QuoteModel)
+    if has_author(projection):
+        statement = statement.outerjoin(AuthorModel, QuoteModel.author_id == AuthorModel.id)
+    return statement
+
+
+def quote_list(quotes_dict: list[dict], authors: list, include_author: bool):
+    """Same body as app.quote_list, from authors that were loaded alongside the quotes."""
+    if not include_author:
+        return quotes_dict
+    author_ids = {quote["author_id"] for quote in quotes_dict}
+    return {"quotes": quotes_dict, "authors": {row[0]["id"]: row[0] for row in authors if row[0]["id"] in author_ids}}
+
+
+async def no_rows() -> list:
+    return []
+
+
+async def page_authors(quotes_dict: list[dict], include_author: bool) -> list:
+    """Authors for quote_list when the page is already loaded (its author ids are not known in advance)."""
+    if not include_author:
+        return []
+    return await fetch_all(select(AUTHOR_ROW).where(AuthorModel.id.in_({quote["author_id"] for quote in quotes_dict})))
+
+
+async def get_quote_dict(quote_id: int) -> dict:
+    return await fetch_one(quote_select().where(QuoteModel.id == quote_id))
+
+
+async def http_error(request, error: HTTPException):
+    if error.code == 404:
+        return PlainTextResponse("A quote or author with such parameters was not found", 404)
+    return PlainTextResponse(error.description, error.code)
+
+
+#Author
+#--------------------------------------------------------------------------
+#Author. Get by id
+# http://127.0.0.1:5000/authors/1
+async def get_author_by_id(request):
+    author_id = request.path_params["author_id"]
+    author = await fetch_one(select(AUTHOR_ROW).where(AuthorModel.id == author_id, AuthorModel.is_deleted == false()))
+    return JSONResponse(author)
+
+#Author. Get all
+# http://127.0.0.1:5000/authors?limit=50&after=<X-Next-Cursor>
+# http://127.0.0.1:5000/authors?format=ndjson
+async def get_authors(request):
+    args = query_args(request)
+    statement = select(AUTHOR_ROW).where(AuthorModel.is_deleted == false())
+    if wants_ndjson(request):
+        return ndjson_response(statement.order_by(AuthorModel.id))
+    authors_dict, next_cursor = await fetch_page(statement, "id", [(AuthorModel.id, False)], args)
+    return JSONResponse(authors_dict, headers=page_headers(next_cursor, request.url.path, args))
+
+#Author. Full-text search by name and surname
+# http://127.0.0.1:5000/authors/search?q=knu&limit=20
+async def search_authors(request):
+    args = query_args(request)
+    q = fts_query(args.get("q"), engine.dialect.name)
+    if q is None:
+        return PlainTextResponse("Add a search query: ?q=...", 400)
+    statement = select(AUTHOR_ROW).where(AuthorModel.is_deleted == false())
+    statement, rank = search(statement, author_fts, AuthorModel, q, engine.dialect.name)
+    authors_dict, next_cursor = await fetch_page(statement, "rank", [(rank, False), (AuthorModel.id, False)], args)
+    return JSONResponse(authors_dict, headers=page_headers(next_cursor, request.url.path, args))
+
+#Author. Filter by a part of the name or surname
+# http://127.0.0.1:5000/authors/filters?name=nina
+async def get_authors_by(request):
+    rows = await fetch_all(select(AUTHOR_ROW).where(wsgi.author_filters(query_args(request))))
+    if len(rows) == 0:
+        abort(404)
+    return JSONResponse([row[0] for row in rows])
+
+#Author. Sorted by name or surname
+# http://127.0.0.1:5000/authors/sortedby/surname?order=desc&then=-name&limit=50
+async def get_sorted_authors(request):
+    args = query_args(request)
+    try:
+        sort, keys = wsgi.author_sort_keys(request.path_params["tag"], args)
+    except ValueError as error:
+        return PlainTextResponse(str(error), 400)
+    statement = select(AUTHOR_ROW).where(AuthorModel.is_deleted == false(), AuthorModel.surname.isnot(None))
+    authors_dict, next_cursor = await fetch_page(statement, sort, keys, args)
+    return JSONResponse(authors_dict, headers=page_headers(next_cursor, request.url.path, args))
+
+#Author. Create
+async def create_author(request):
+    author_data = await request.json()
+    author = AuthorModel(author_data["name"], author_data["surname"] or None)
+    async with Session.begin() as session:
+        session.add(author)
+    return JSONResponse(author.to_dict(), 201)
+
+#Author. Edit
+async def edit_author(request):
+    author_id = request.path_params["author_id"]
+    author_data = await request.json()
+    async with Session.begin() as session:
+        author = await session.get(AuthorModel, author_id)
+        if author is None or author.is_deleted:
+            abort(404)
+        for key, value in author_data.items():
+            setattr(author, key, value)
+    return JSONResponse(author.to_dict())
+
+#Author. Soft delete
+async def soft_delete_author(request):
+    author_id = request.path_params["author_id"]
+    async with Session.begin() as session:
+        author = await session.get(AuthorModel, author_id)
+        if author is None:
+            abort(404)
+        author.is_deleted = True
+    return PlainTextResponse(f"Author with id={author_id} has deleted")
+
+#Author. Recover author by author_id
+async def recover_author_by_id(request):
+    author_id = request.path_params["author_id"]
+    async with Session.begin() as session:
+        author = await session.get(AuthorModel, author_id)
+        if author is None:
+            abort(404)
+        author.is_deleted = False
+    return PlainTextResponse(f"Author with id={author_id} has recovered")
+
+#Author. Full delete together with the quotes
+async def full_delete_author(request):
+    author_id = request.path_params["author_id"]
+    # у AuthorModel.quotes lazy="dynamic", такой cascade в asyncio не загрузить - удаляем как /authors/delete
+    if len(await delete_authors(AuthorModel.id == author_id)) == 0:
+        abort(404)
+    return PlainTextResponse(f"Author with id={author_id} has really been deleted")
+
+#Author. Bulk operations: {"ids": [1, 2, 3]} в теле, ?ids=1,2,3 или фильтр {"name": ..., "surname": ...}
+async def author_selection(request):
+    return wsgi.author_selection(await request_json(request) or {}, query_args(request))
+
+
+async def set_authors_deleted(condition, is_deleted: bool) -> list[dict]:
+    async with Session.begin() as session:
+        authors = (await session.scalars(wsgi.set_deleted_statement(condition, is_deleted))).all()
+        return [author.to_dict() for author in authors]
+
+
+async def delete_authors(condition) -> list[dict]:
+    quotes_statement, authors_statement = wsgi.full_delete_statements(condition)
+    async with Session.begin() as session:
+        await session.execute(quotes_statement)
+        authors = (await session.scalars(authors_statement)).all()
+        return [author.to_dict() for author in authors]
+
+
+def authors_or_404(authors_dict: list[dict]):
+    if len(authors_dict) == 0:
+        abort(404)
+    return JSONResponse(authors_dict)
+
+#Author. Recover all authors
+async def recover_all_authors(request):
+    return authors_or_404(await set_authors_deleted(true(), False))
+
+#Author. Recover many authors
+# PUT http://127.0.0.1:5000/authors/recover {"ids": [1, 2, 3]}
+async def recover_authors(request):
+    condition = await author_selection(request)
+    if condition is None:
+        return PlainTextResponse("Add ids or a filter of authors to recover", 400)
+    return authors_or_404(await set_authors_deleted(condition, False))
+
+#Author. Soft delete many authors
+# DELETE http://127.0.0.1:5000/authors?ids=1,2,3
+async def soft_delete_authors(request):
+    condition = await author_selection(request)
+    if condition is None:
+        return PlainTextResponse("Add ids or a filter of authors to delete", 400)
+    return authors_or_404(await set_authors_deleted(condition, True))
+
+#Author. Full delete many authors together with their quotes
+# DELETE http://127.0.0.1:5000/authors/delete?ids=1,2,3
+async def full_delete_authors(request):
+    condition = await author_selection(request)
+    if condition is None:
+        return PlainTextResponse("Add ids or a filter of authors to delete", 400)
+    return authors_or_404(await delete_authors(condition))
+
+#Quotes
+#-------------------------------------------------------------------------------
+def ndjson_quotes(statement, sort: str, include_author: bool):
+    if include_author:
+        return PlainTextResponse("include=author is not supported with NDJSON, use fields=...,author_id", 400)
+    order_by = [column.desc() if descending else column for column, descending in QUOTE_SORT_KEYS[sort]]
+    return ndjson_response(statement.order_by(*order_by))
+
+#Quote. Get all quotes
+# http://127.0.0.1:5000/quotes?sort=rating&limit=50&include=author
+# http://127.0.0.1:5000/quotes?format=ndjson
+async def get_quotes(request):
+    args = query_args(request)
+    sort = args.get("sort", "id")
+    if sort not in QUOTE_SORT_KEYS:
+        return PlainTextResponse(f"Unknown sort '{sort}', use one of: {', '.join(QUOTE_SORT_KEYS)}", 400)
+    projection, include_author = quote_projection(args)
+    if wants_ndjson(request):
+        return ndjson_quotes(quote_select(projection), sort, include_author)
+    keys = QUOTE_SORT_KEYS[sort]
+    page_query, limit = keyset_query(quote_select(projection), sort, keys, get_page_args(args, config))
+    authors = no_rows
+    if include_author:
+        # авторов выбираем по id из того же запроса страницы, не дожидаясь самих цитат:
+        # оба запроса идут одновременно, каждый на своем соединении
+        author_ids, _ = keyset_query(select(QuoteModel.author_id), sort, keys, get_page_args(args, config))
+        author_ids = author_ids.subquery()
+        authors = partial(fetch_all, select(AUTHOR_ROW).where(AuthorModel.id.in_(select(author_ids.c.author_id))))
+    rows, authors = await asyncio.gather(fetch_all(page_query), authors())
+    quotes_dict, next_cursor = split_page(rows, limit, sort)
+    return JSONResponse(
+        quote_list(quotes_dict, authors, include_author), headers=page_headers(next_cursor, request.url.path, args)
+    )
+
+#Quote. Full-text search by text, ranked by relevance
+# http://127.0.0.1:5000/quotes/search?q=оптимизация&limit=20
+async def search_quotes(request):
+    args = query_args(request)
+    q = fts_query(args.get("q"), engine.dialect.name)
+    if q is None:
+        return PlainTextResponse("Add a search query: ?q=...", 400)
+    projection, include_author = quote_projection(args)
+    statement, rank = search(quote_select(projection), quote_fts, QuoteModel, q, engine.dialect.name)
+    quotes_dict, next_cursor = await fetch_page(statement, "rank", [(rank, False), (QuoteModel.id, False)], args)
+    authors = await page_authors(quotes_dict, include_author)
+    return JSONResponse(
+        quote_list(quotes_dict, authors, include_author), headers=page_headers(next_cursor, request.url.path, args)
+    )
+
+#Quote. Filters: author_id, name, surname, rating, rating_min, rating_max, text (see QUOTE_FILTERS in app.py)
+# http://127.0.0.1:5000/quotes/filters?name=Rick&rating_min=3&sort=created
+async def get_quotes_with_filters(request):
+    args = query_args(request)
+    sort = args.get("sort", "id")
+    if sort not in QUOTE_SORT_KEYS:
+        return PlainTextResponse(f"Unknown sort '{sort}', use one of: {', '.join(QUOTE_SORT_KEYS)}", 400)
+    projection, include_author = quote_projection(args)
+    try:
+        statement = wsgi.quote_filters_query(
+            args, projection, select(projection).select_from(QuoteModel), engine.dialect.name
+        )
+    except ValueError as error:
+        return PlainTextResponse(str(error), 400)
+    if wants_ndjson(request):
+        return ndjson_quotes(statement, sort, include_author)
+    quotes_dict, next_cursor = await fetch_page(statement, sort, QUOTE_SORT_KEYS[sort], args)
+    if len(quotes_dict) == 0:
+        abort(404)
+    authors = await page_authors(quotes_dict, include_author)
+    return JSONResponse(
+        quote_list(quotes_dict, authors, include_author), headers=page_headers(next_cursor, request.url.path, args)
+    )
+
+#Quote. Get by id
+# http://127.0.0.1:5000/quotes/1
+async def get_quote_by_id(request):
+    return JSONResponse(await get_quote_dict(request.path_params["quote_id"]))
+
+#Quote. Top rated: by rating, then newest first
+# http://127.0.0.1:5000/quotes/top?limit=10&author_id=2
+async def get_top_quotes(request):
+    args = query_args(request)
+    limit = args.get("limit", 10, type=int)
+    if not 0 < limit <= config['LEADERBOARD_SIZE']:
+        return PlainTextResponse(f"limit must be between 1 and {config['LEADERBOARD_SIZE']}", 400)
+    statement = (
+        quote_select()
+        .order_by(QuoteModel.rating.desc(), QuoteModel.created.desc(), QuoteModel.id.desc())
+        .limit(limit)
+    )
+    author_id = args.get("author_id", type=int)
+    if author_id is not None:
+        statement = statement.where(QuoteModel.author_id == author_id)
+    return JSONResponse([row[0] for row in await fetch_all(statement)])
+
+#Quote. Count
+# http://127.0.0.1:5000/quotes/count
+async def count_quotes(request):
+    rows = await fetch_all(QUOTE_COUNT)
+    return JSONResponse({"count": rows[0][0] if rows else None})
+
+#Quote. Random
+# http://127.0.0.1:5000/quotes/random
+async def get_random_quote(request):
+    # как в app.py: случайный id между min(id) и max(id), поиск по первичному ключу
+    low, high = (await fetch_all(select(func.min(QuoteModel.id), func.max(QuoteModel.id))))[0]
+    if low is None:
+        abort(404)
+    for _ in range(config['RANDOM_QUOTE_ATTEMPTS']):
+        quote_id = random.randint(low, high)
+        rows = await fetch_all(quote_select().where(QuoteModel.id == quote_id))
+        if rows:
+            return JSONResponse(rows[0][0])
+    # ближайшая следующая, а если после нее цитат уже нет - первая с начала
+    rows = await fetch_all(quote_select().where(QuoteModel.id >= quote_id).order_by(QuoteModel.id).limit(1))
+    if not rows:
+        rows = await fetch_all(quote_select().order_by(QuoteModel.id).limit(1))
+    if not rows:
+        abort(404)
+    return JSONResponse(rows[0][0])
+
+#Quote. Count and average rating of an author's quotes
+# http://127.0.0.1:5000/authors/2/quotes/stats
+async def get_author_quote_stats(request):
+    async with Session() as session:
+        stats = await session.get(AuthorStats, request.path_params["author_id"])
+    if stats is None or stats.quote_count == 0:
+        abort(404)
+    return JSONResponse(stats.to_dict())
+
+#Quote. Count and average rating for every author
+# http://127.0.0.1:5000/authors/quotes/stats?limit=100
+async def get_authors_quote_stats(request):
+    args = query_args(request)
+    statement = select(AuthorStats).where(AuthorStats.quote_count > 0)
+    stats, next_cursor = await fetch_page(statement, "author_id", [(AuthorStats.author_id, False)], args)
+    return JSONResponse([item.to_dict() for item in stats], headers=page_headers(next_cursor, request.url.path, args))
+
+#Quote. Get all author`s quotes
+# http://127.0.0.1:5000/authors/2/quotes?fields=id,text&include=author
+async def get_all_quotes_by_author(request):
+    author_id = request.path_params["author_id"]
+    projection, include_author = quote_projection(query_args(request))
+    statement = quote_select(projection).where(QuoteModel.author_id == author_id)
+    if wants_ndjson(request):
+        if include_author:
+            return PlainTextResponse("include=author is not supported with NDJSON, use fields=...,author_id", 400)
+        if not await fetch_all(select(QuoteModel.id).where(QuoteModel.author_id == author_id).limit(1)):
+            abort(404)
+        return ndjson_response(statement.order_by(QuoteModel.id))
+    authors = no_rows
+    if include_author:
+        # автор известен по id из URL, так что его читаем одновременно с цитатами
+        authors = partial(fetch_all, select(AUTHOR_ROW).where(AuthorModel.id == author_id))
+    rows, authors = await asyncio.gather(fetch_all(statement), authors())
+    if len(rows) == 0:
+        abort(404)
+    return JSONResponse(quote_list([row[0] for row in rows], authors, include_author))
+
+#Quote. Create
+async def create_quote(request):
+    author_id = request.path_params["author_id"]
+    new_quote = await request.json()
+    rating = min(max(int(new_quote.get('rating', 1)), RATING_MIN), RATING_MAX)
+    async with Session.begin() as session:
+        author = await session.get(AuthorModel, author_id)
+        if author is None:
+            abort(404)
+        quote = QuoteModel(author, new_quote['text'], rating=rating)
+        session.add(quote)
+        await session.flush()
+        await session.refresh(quote, ["created"])  # server_default, без ленивой загрузки после commit
+    return JSONResponse(quote.to_dict(author.to_dict()), 201)
+
+#Quote. Bulk import
+# POST http://127.0.0.1:5000/quotes/bulk?chunk_size=500
+# [{"name": "Donald", "surname": "Knuth", "text": "...", "rating": 5}, ...] или то же построчно (application/x-ndjson)
+async def import_chunk(chunk: list, known: dict, report: dict):
+    """app.import_chunk on the async engine; authors are resolved by app.resolve_authors through run_sync."""
+    created = []
+    chunk_errors = []
+    try:
+        async with Session.begin() as session:
+            created, errors = await session.run_sync(
+                lambda sync_session: wsgi.resolve_authors({key for _, key, _ in chunk}, known, sync_session)
+            )
+            quotes = []
+            for index, key, values in chunk:
+                if key in errors:
+                    chunk_errors.append({"index": index, "error": errors[key]})
+                else:
+                    quotes.append({"author_id": known[key], **values})
+            if quotes:
+                await session.execute(insert(QuoteModel), quotes)
+    except SQLAlchemyError as error:
+        for key in created:
+            known.pop(key, None)
+        if len(chunk) == 1:
+            report["errors"].append({"index": chunk[0][0], "error": str(error.orig or error)})
+            return
+        for row in chunk:
+            await import_chunk([row], known, report)
+        return
+    report["errors"].extend(chunk_errors)
+    report["inserted"] += len(quotes)
+    report["authors_created"] += len(created)
+
+
+async def create_quotes_bulk(request):
+    chunk_size = query_args(request).get("chunk_size", config['BULK_CHUNK_SIZE'], type=int)
+    if chunk_size <= 0:
+        return PlainTextResponse("chunk_size must be a positive number", 400)
+    report = {"inserted": 0, "authors_created": 0, "errors": []}
+    known: dict[tuple, int] = {}
+    chunk = []
+    async for index, row, error in request_rows(request):
+        if error is None:
+            try:
+                key, values = wsgi.clean_bulk_row(row)
+            except ValueError as exc:
+                error = str(exc)
+        if error is not None:
+            report["errors"].append({"index": index, "error": error})
+            continue
+        chunk.append((index, key, values))
+        if len(chunk) == chunk_size:
+            await import_chunk(chunk, known, report)
+            chunk = []
+    if chunk:
+        await import_chunk(chunk, known, report)
+    report["errors"].sort(key=lambda e: e["index"])
+    return JSONResponse(report, 201 if report["inserted"] else 400)
+
+#Quote. Edit
+async def edit_quote(request):
+    quote_id = request.path_params["quote_id"]
+    new_quote = await request.json()
+    async with Session.begin() as session:
+        result = await session.execute(update(QuoteModel).where(QuoteModel.id == quote_id).values(text=new_quote["text"]))
+        if result.rowcount == 0:
+            abort(404)
+    return JSONResponse(await get_quote_dict(quote_id))
+
+#Quote. Delete
+async def delete_quote(request):
+    quote_id = request.path_params["quote_id"]
+    async with Session.begin() as session:
+        quote = await session.get(QuoteModel, quote_id)
+        if quote is None:
+            abort(404)
+        await session.delete(quote)
+    return PlainTextResponse(f"Quote with id={quote_id} has deleted")
+
+#Quote. Rating: один условный UPDATE, как change_rating в app.py
+async def change_rating(quote_id: int, delta: int) -> bool:
+    limit = QuoteModel.rating < RATING_MAX if delta > 0 else QuoteModel.rating > RATING_MIN
+    async with Session.begin() as session:
+        changed = (await session.execute(
+            update(QuoteModel).where(QuoteModel.id == quote_id, limit).values(rating=QuoteModel.rating + delta)
+        )).rowcount
+        if not changed and await session.get(QuoteModel, quote_id) is None:
+            abort(404)
+    return bool(changed)
+
+
+async def increase_rating(request):
+    quote_id = request.path_params["quote_id"]
+    if await change_rating(quote_id, +1):
+        return JSONResponse(await get_quote_dict(quote_id))
+    return PlainTextResponse(f"Rating for quote {quote_id} is maxed out")
+
+
+async def decrease_rating(request):
+    quote_id = request.path_params["quote_id"]
+    if await change_rating(quote_id, -1):
+        return JSONResponse(await get_quote_dict(quote_id))
+    return PlainTextResponse(f"rating for quote {quote_id} is minumum")
+
+#Quote. Many votes in one request: [{"id": 1, "delta": 1}, {"id": 2, "delta": -2}]
+async def change_ratings(request):
+    try:
+        steps = wsgi.rating_steps(await request_json(request))
+    except ValueError as error:
+        return PlainTextResponse(str(error), 400)
+    rows = []
+    if steps:
+        async with Session.begin() as session:
+            rows = (await session.execute(wsgi.rating_steps_statement(steps))).all()
+    ratings = {row.id: row.rating for row in rows}
+    return JSONResponse({"ratings": ratings, "not_found": sorted(set(steps) - ratings.keys())})
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    await engine.dispose()
+
+
+routes = [
+    Route("/authors", get_authors),
+    Route("/authors", create_author, methods=["POST"]),
+    Route("/authors", soft_delete_authors, methods=["DELETE"]),
+    Route("/authors/search", search_authors),
+    Route("/authors/filters", get_authors_by),
+    Route("/authors/sortedby/{tag}", get_sorted_authors),
+    Route("/authors/delete", full_delete_authors, methods=["DELETE"]),
+    Route("/authors/recover", recover_authors, methods=["PUT"]),
+    Route("/authors/recover/all", recover_all_authors, methods=["PUT"]),
+    Route("/authors/recover/{author_id:int}", recover_author_by_id, methods=["PUT"]),
+    Route("/authors/quotes/stats", get_authors_quote_stats),
+    Route("/authors/{author_id:int}", get_author_by_id),
+    Route("/authors/{author_id:int}", edit_author, methods=["PUT"]),
+    Route("/authors/{author_id:int}", soft_delete_author, methods=["DELETE"]),
+    Route("/authors/{author_id:int}/delete", full_delete_author, methods=["DELETE"]),
+    Route("/authors/{author_id:int}/quotes", get_all_quotes_by_author),
+    Route("/authors/{author_id:int}/quotes", create_quote, methods=["POST"]),
+    Route("/authors/{author_id:int}/quotes/stats", get_author_quote_stats),
+    Route("/quotes", get_quotes),
+    Route("/quotes/search", search_quotes),
+    Route("/quotes/filters", get_quotes_with_filters),
+    Route("/quotes/bulk", create_quotes_bulk, methods=["POST"]),
+    Route("/quotes/ratings", change_ratings, methods=["POST"]),
+    Route("/quotes/top", get_top_quotes),
+    Route("/quotes/count", count_quotes),
+    Route("/quotes/random", get_random_quote),
+    Route("/quotes/{quote_id:int}", get_quote_by_id),
+    Route("/quotes/{quote_id:int}", edit_quote, methods=["PUT"]),
+    Route("/quotes/{quote_id:int}", delete_quote, methods=["DELETE"]),
+    Route("/quotes/{quote_id:int}/increase_rating", increase_rating),
+    Route("/quotes/{quote_id:int}/decrease_rating", decrease_rating),
+]
+app = Starlette(routes=routes, exception_handlers={HTTPException: http_error}, lifespan=lifespan)
@@ -1,14 +1,31 @@
 from flask import Flask, json, request, abort
 from flask import g
+import atexit
 import random
-import sqlite3
 from pathlib import Path
 
+from sqlite_pool import ConnectionPool, PoolTimeout
+from sql_queries import Queries
+
 app = Flask(__name__)
 json.provider.DefaultJSONProvider.ensure_ascii = False
 
 BASE_DIR = Path(__file__).parent
-DATABASE = BASE_DIR / 'test.db'
+app.config['DATABASE'] = BASE_DIR / 'test.db'
+# Пул соединений: сколько соединений держать открытыми и сколько секунд ждать свободного
+app.config['SQLITE_POOL_SIZE'] = 5
+app.config['SQLITE_POOL_TIMEOUT'] = 5.0
+app.config['SQLITE_CACHED_STATEMENTS'] = 256
+app.config.from_prefixed_env()  # FLASK_SQLITE_POOL_SIZE=10 и т.п.
+
+DATABASE = app.config['DATABASE']
+pool = ConnectionPool(
+    DATABASE,
+    size=app.config['SQLITE_POOL_SIZE'],
+    timeout=app.config['SQLITE_POOL_TIMEOUT'],
+    cached_statements=app.config['SQLITE_CACHED_STATEMENTS'],
+)
+atexit.register(pool.close)
 
 
 # Функции автоматизации повторяющихся кусков
@@ -17,47 +34,55 @@ def tuple_to_dict(quote: tuple) -> dict:
     return dict(zip(keys, quote))
 
 
-def get_db():  # проверяем есть ли соединение, если нет - устанавливаем
+def get_db():  # проверяем есть ли соединение, если нет - берем из пула
     db = getattr(g, '_database', None)
     if db is None:
-        db = g._database = sqlite3.connect(DATABASE)
+        db = g._database = pool.acquire()
     return db
 
-@app.teardown_appcontext  # закрываем соединение
+# Все запросы к БД - только здесь, с параметрами :name вместо f-строк:
+# текст каждого запроса постоянный, поэтому sqlite3 разбирает его один раз на соединение
+QUERIES = {
+    "get_quotes": "SELECT id, author, text FROM quotes",
+    "get_quote": "SELECT id, author, text FROM quotes WHERE id = :id",
+    "create_quote": "INSERT INTO quotes (author, text) VALUES (:author, :text)",
+    # NULL оставляет поле как есть, так что одно выражение покрывает все три варианта правки
+    "edit_quote": "UPDATE quotes SET author = coalesce(:author, author), text = coalesce(:text, text) WHERE id = :id",
+    "delete_quote": "DELETE FROM quotes WHERE id = :id",
+}
+queries = Queries(get_db, QUERIES)
+
+@app.teardown_appcontext  # возвращаем соединение в пул (незакоммиченное откатывается)
 def close_connection(exception):
-    db = getattr(g, '_database', None)
+    db = g.pop('_database', None)
     if db is not None:
-        db.close()
+        pool.release(db)
 
 @app.errorhandler(404)
 def handler_bad_request(error):
     return "A quote with such parameters was not found", 404
 
+@app.errorhandler(PoolTimeout)
+def handler_pool_timeout(error):
+    return "The database is busy, try again later", 503, {"Retry-After": "1"}
+
 
-def get_object_from_db(sql: str): #, quote_id: int):
-    conn = get_db()  # Подключение в БД
-    cursor = conn.cursor().execute(sql)  # Создаем cursor, он позволяет делать SQL-запросы и Выполняем запрос
-    object = cursor.fetchone()  # Извлекаем результаты запроса
-    cursor.close()  # Закрыть курсор:
-    # conn.close()  # Закрыть соединение:
-    if object is None:
+def get_quote_from_db(quote_id: int) -> dict:
+    quote = queries.fetch_one("get_quote", id=quote_id)
+    if quote is None:
         abort(404)
-    else:
-        object = tuple_to_dict(object)
-        return object
+    return tuple_to_dict(quote)
 
 
-def get_objects_from_db(sql: str) -> list[dict]:
-    conn = get_db()
-    cursor = conn.cursor().execute(sql)
-    objects = cursor.fetchall()
-    cursor.close()
-    # conn.close()
-    if object is None:
-        abort(404)
-    else:
-        objects = list(map(tuple_to_dict, objects))
-        return objects
+def get_quotes_from_db() -> list[dict]:
+    return list(map(tuple_to_dict, queries.fetch_all("get_quotes")))
+
+
+def get_batch() -> list[dict]:
+    rows = request.json
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        abort(400, "Expected a JSON array of objects")
+    return rows
 
 
 # --------------------------------------------------------------------------------
@@ -65,17 +90,13 @@ def get_objects_from_db(sql: str) -> list[dict]:
 # http://127.0.0.1:5000/quotes
 @app.route("/quotes")
 def get_quotes():
-    select_quotes = "SELECT * from quotes"
-    quotes = get_objects_from_db(select_quotes)
-    return quotes
+    return get_quotes_from_db()
 
 
 # http://127.0.0.1:5000/quotes/1
 @app.route("/quotes/<int:quote_id>")  # шаблон урла
 def get_quote_by_id(quote_id):
-    sql = f"SELECT * FROM quotes WHERE id={quote_id}"
-    quote = get_object_from_db(sql)
-    return quote
+    return get_quote_from_db(quote_id)
 
 
 @app.route("/quotes", methods=["POST"])
@@ -84,12 +105,8 @@ def create_quote():
     if len(new_qoute['author']) == 0 or len(new_qoute['text']) == 0:
         return "Add a quote author and text to create new quote!", 400
     else:
-        conn = get_db()  # функци подключения к бд из док-ии
-        sql = f"INSERT INTO quotes(author, text) VALUES('{new_qoute['author']}', '{new_qoute['text']}');"
-        cursor = conn.cursor().execute(sql)
-        conn.commit()
+        cursor = queries.execute("create_quote", author=new_qoute['author'], text=new_qoute['text'])
         new_qoute["id"] = cursor.lastrowid  # получаем id нового объекта
-        cursor.close()
         return new_qoute, 201
 
 @app.route("/quotes/<int:quote_id>", methods=["PUT"])
@@ -100,38 +117,66 @@ def edit_quote(quote_id):
     if len(author) == 0 and len(text) == 0:
         return "Add a new text or author to edit the quote", 400
     else:
-        conn = get_db()
-        if len(author) == 0:
-            sql = f"UPDATE quotes SET text = '{text}' WHERE id = {quote_id};"
-        elif len(text) == 0:
-            sql = f"UPDATE quotes SET author = '{author}' WHERE id = {quote_id};"
-        else:
-            sql = f"UPDATE quotes SET author = '{author}', text = '{text}' WHERE id = {quote_id};"
-        cursor = conn.cursor().execute(sql)
-        conn.commit()
-        result = cursor.rowcount
-        cursor.close()
-        if result == 1:
+        # пустое поле -> NULL -> остается старое значение (см. edit_quote в QUERIES)
+        cursor = queries.execute("edit_quote", id=quote_id, author=author or None, text=text or None)
+        if cursor.rowcount == 1:
             return new_quote
-            # return f"Quote with id {quote_id} changed.", 200
         else:
             return abort(404)
 
 
-@app.route("/quotes/<quote_id>", methods=['DELETE'])
+@app.route("/quotes/<int:quote_id>", methods=['DELETE'])
 def delete(quote_id):
-    conn = get_db()
-    sql = f"DELETE FROM quotes WHERE id = {quote_id};"
-    cursor = conn.cursor().execute(sql)
-    conn.commit()
-    result = cursor.rowcount
-    cursor.close()
-    if result == 1:
+    cursor = queries.execute("delete_quote", id=quote_id)
+    if cursor.rowcount == 1:
         return f"Quote with id {quote_id} is deleted.", 200
     else:
         return abort(404)
 
 
+# Пакетные операции: один запрос, одна транзакция, один подготовленный statement на все строки
+# POST http://127.0.0.1:5000/quotes/batch [{"author": "...", "text": "..."}, ...]
+@app.route("/quotes/batch", methods=["POST"])
+def create_quotes():
+    rows = get_batch()
+    if any(not row.get('author') or not row.get('text') for row in rows):
+        return "Every quote needs an author and a text", 400
+    rows = [{"author": row['author'], "text": row['text']} for row in rows]
+    ids = queries.insert_many("create_quote", rows)
+    return [{"id": quote_id, **row} for quote_id, row in zip(ids, rows)], 201
+
+
+# PUT http://127.0.0.1:5000/quotes/batch [{"id": 1, "author": "", "text": "..."}, ...]
+@app.route("/quotes/batch", methods=["PUT"])
+def edit_quotes():
+    rows = get_batch()
+    try:
+        rows = [
+            {"id": int(row['id']), "author": row.get('author') or None, "text": row.get('text') or None}
+            for row in rows
+        ]
+    except (KeyError, TypeError, ValueError):
+        return "Every quote needs a numeric id", 400
+    return {"updated": queries.execute_many("edit_quote", rows)}
+
+
+# DELETE http://127.0.0.1:5000/quotes/batch {"ids": [1, 2, 3]}
+@app.route("/quotes/batch", methods=["DELETE"])
+def delete_quotes():
+    data = request.json
+    try:
+        rows = [{"id": int(quote_id)} for quote_id in data['ids']]
+    except (KeyError, TypeError, ValueError):
+        return "Add a list of numeric ids: {\"ids\": [1, 2, 3]}", 400
+    return {"deleted": queries.execute_many("delete_quote", rows)}
+
+
+# http://127.0.0.1:5000/pool/stats
+@app.route("/pool/stats")
+def get_pool_stats():
+    return pool.stats()
+
+
 # # http://127.0.0.1:5000/quotes/count
 # @app.route("/quotes/count")
 # def count_quotes():
@@ -0,0 +1,944 @@
+"""Benchmarks for the quotes API.
+
+Every benchmark builds its own synthetic SQLite database (migrated to the
+latest revision), so main.db is never touched. Results are printed as JSON.
+
+    python bench.py filters --quotes 100000
+    python bench.py sorted_authors --authors 100000
+    python bench.py serialization --quotes 10000
+    python bench.py appsql --quotes 10000
+    python bench.py profiles --quotes 10000 --threads 8 --seconds 5
+    python bench.py asgi --quotes 10000 --clients 500 --seconds 10
+    python bench.py routes --dataset 100k --seconds 30 --writes 0.2 > before.json
+    python bench.py compare --baseline before.json --result after.json
+    python bench.py startup --repeat 10 --budget-ms 1000
+    python bench.py group_commit --authors 100 --threads 16 --seconds 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+from sqlalchemy import event
+
+from pagination import keyset_query
+
+
+BASE_DIR = Path(__file__).parent
+
+
+def setup_app(db_path: Path):
+    """Import app.py against ``db_path`` and migrate the database to head.
+
+    The benchmarks work with ``quotes_app.app`` outside requests, so its app
+    context stays pushed.
+    """
+    os.environ["FLASK_SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
+    import app as quotes_app
+    from flask_migrate import Migrate, upgrade
+    Migrate(quotes_app.app, quotes_app.db)
+    quotes_app.app.app_context().push()
+    upgrade(directory=str(BASE_DIR / "migrations"))
+    return quotes_app
+
+
+def seed(quotes_app, authors: int, quotes: int, seed: int = 1):
+    """Fill the database with ``authors`` authors and ``quotes`` quotes of random words."""
+    rnd = random.Random(seed)
+    words = [f"word{i}" for i in range(2000)]
+    connection = quotes_app.db.engine.raw_connection()
+    try:
+        connection.executemany(
+            "INSERT INTO author_model (id, name, surname, is_deleted) VALUES (?, ?, ?, 0)",
+            ((i, f"Name{i}", f"Surname{i % (authors // 2 + 1)}") for i in range(1, authors + 1)),
+        )
+        connection.executemany(
+            "INSERT INTO quote_model (author_id, text, rating, created) VALUES (?, ?, ?, ?)",
+            (
+                (
+                    rnd.randint(1, authors),
+                    " ".join(rnd.choices(words, k=8)),
+                    rnd.randint(1, 5),
+                    f"2023-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d} 12:00:00",
+                )
+                for _ in range(quotes)
+            ),
+        )
+        connection.commit()
+        connection.execute("ANALYZE")
+    finally:
+        connection.close()
+
+
+def query_plan(quotes_app, query) -> list[str]:
+    """EXPLAIN QUERY PLAN of an ORM query, one line per plan step."""
+    compiled = query.statement.compile(dialect=quotes_app.db.engine.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    with quotes_app.db.engine.connect() as connection:
+        rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + compiled.string, params)
+        return [row[-1] for row in rows]
+
+
+def timed_requests(client, url: str, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        timings.append(time.perf_counter() - start)
+        assert response.status_code in (200, 404), (url, response.status_code)
+    timings.sort()
+    return {
+        "mean_ms": round(sum(timings) / len(timings) * 1000, 3),
+        "p50_ms": round(timings[len(timings) // 2] * 1000, 3),
+    }
+
+
+def bench_filters(quotes_app, args) -> dict:
+    """/quotes/filters: check that every filter combination is served by an index."""
+    cases = [
+        "author_id=7&rating=5",
+        "author_id=7&rating_min=3&rating_max=4",
+        "name=Name7&rating_min=4",
+        "surname=Surname3",
+        "rating=5&sort=created",
+        "rating_min=4&sort=rating",
+        "text=word42&rating=3",
+    ]
+    client = quotes_app.app.test_client()
+    results = []
+    for case in cases:
+        with quotes_app.app.test_request_context(f"/quotes/filters?{case}&limit=50"):
+            from flask import request
+            sort = request.args.get("sort", "id")
+            query = quotes_app.quote_filters_query(request.args)
+            page_query, _ = keyset_query(query, sort, quotes_app.QUOTE_SORT_KEYS[sort])
+            plan = query_plan(quotes_app, page_query)
+        full_scan = [step for step in plan if step.startswith("SCAN") and "INDEX" not in step and "VIRTUAL" not in step]
+        results.append({
+            "filters": case,
+            "plan": plan,
+            "uses_index": not full_scan,
+            **timed_requests(client, f"/quotes/filters?{case}&limit=50", args.repeat),
+        })
+    return {"benchmark": "filters", "quotes": args.quotes, "cases": results}
+
+
+def legacy_sorted_authors(quotes_app, tag: str) -> list[dict]:
+    """/authors/sortedby/<tag> as it used to be: load every author and sort in Python."""
+    authors = quotes_app.AuthorModel.query.all()
+    authors_dict = [author.to_dict() for author in authors if author.surname is not None]
+    return sorted(authors_dict, key=lambda x: x[tag])
+
+
+def bench_sorted_authors(quotes_app, args) -> dict:
+    """/authors/sortedby/<tag>: ORDER BY + keyset page in SQL against the old in-Python sort."""
+    client = quotes_app.app.test_client()
+    results = []
+    for tag, query_string in [("name", "limit=100"), ("surname", "limit=100"), ("surname", "order=desc&limit=100")]:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            legacy_sorted_authors(quotes_app, tag)
+            quotes_app.db.session.remove()
+        legacy_ms = (time.perf_counter() - start) / args.repeat * 1000
+        url = f"/authors/sortedby/{tag}?{query_string}"
+        with quotes_app.app.test_request_context(url):
+            from flask import request
+            descending = request.args.get("order") == "desc"
+            keys = [(quotes_app.AUTHOR_SORT_COLUMNS[tag], descending), (quotes_app.AuthorModel.id, descending)]
+            query = quotes_app.AuthorModel.query.filter(quotes_app.AuthorModel.is_deleted == False)
+            plan = query_plan(quotes_app, keyset_query(query, tag, keys)[0])
+        timings = timed_requests(client, url, args.repeat)
+        results.append({
+            "url": url,
+            "plan": plan,
+            "uses_index": not any(step.startswith("SCAN author_model") and "INDEX" not in step for step in plan),
+            "legacy_ms": round(legacy_ms, 3),
+            **timings,
+            "speedup": round(legacy_ms / timings["mean_ms"], 1),
+        })
+    return {"benchmark": "sorted_authors", "authors": args.authors, "cases": results}
+
+
+def bench_serialization(quotes_app, args) -> dict:
+    """Quote list to JSON bytes: ORM objects + to_dict + Flask's provider against Projection + FastJSONProvider.
+
+    Also reports payload size and request time of the ``fields``/``include`` variants.
+    """
+    from flask.json.provider import DefaultJSONProvider
+    from sqlalchemy.orm import joinedload
+    import serialization
+
+    app = quotes_app.app
+    default_provider = DefaultJSONProvider(app)
+    default_provider.ensure_ascii = app.config["JSON_AS_ASCII"]
+
+    def legacy(limit):
+        query = quotes_app.QuoteModel.query.options(joinedload(quotes_app.QuoteModel.author))
+        quotes = query.order_by(quotes_app.QuoteModel.id).limit(limit).all()
+        return default_provider.dumps([quote.to_dict() for quote in quotes]).encode()
+
+    def projection(limit):
+        rows = quotes_app.quote_rows().order_by(quotes_app.QuoteModel.id).limit(limit)
+        return app.json.dumpb([row[0] for row in rows])
+
+    results = []
+    for limit in (100, 1000, args.quotes):
+        case = {"rows": limit}
+        for name, serialize in [("legacy", legacy), ("projection", projection)]:
+            size = 0
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                size += len(serialize(limit))
+                quotes_app.db.session.remove()
+            elapsed = time.perf_counter() - start
+            case[f"{name}_ms"] = round(elapsed / args.repeat * 1000, 3)
+            case[f"{name}_mb_per_s"] = round(size / elapsed / 1e6, 2)
+        case["speedup"] = round(case["legacy_ms"] / case["projection_ms"], 1)
+        results.append(case)
+
+    # размер ответа и время для ?fields= / ?include=author (/quotes/filters не кэшируется)
+    client = app.test_client()
+    payloads = []
+    for query_string in ["", "fields=id,text,rating", "include=author", "fields=id,rating&include=author"]:
+        url = f"/quotes/filters?rating_min=1&limit=1000&{query_string}"
+        payloads.append({
+            "url": url,
+            "bytes": len(client.get(url).data),
+            **timed_requests(client, url, args.repeat),
+        })
+    return {
+        "benchmark": "serialization",
+        "quotes": args.quotes,
+        "encoder": "orjson" if serialization.orjson is not None else "json",
+        "cases": results,
+        "payloads": payloads,
+    }
+
+
+def per_call_us(func, calls) -> float:
+    start = time.perf_counter()
+    for args in calls:
+        func(*args)
+    return round((time.perf_counter() - start) / len(calls) * 1e6, 2)
+
+
+def bench_appsql(db_path: Path, args) -> dict:
+    """appsql.py: f-string SQL (parsed on every call) against the named queries of sql_queries.py."""
+    os.environ["FLASK_DATABASE"] = str(db_path)
+    import appsql
+    connection = sqlite3.connect(db_path)
+    connection.execute("CREATE TABLE quotes (id INTEGER PRIMARY KEY AUTOINCREMENT, author TEXT NOT NULL, text TEXT NOT NULL)")
+    connection.close()
+
+    rnd = random.Random(1)
+    rows = [{"author": f"Author{i % 100}", "text": f"text {i}"} for i in range(args.quotes)]
+    with appsql.app.app_context():
+        appsql.queries.insert_many("create_quote", rows)
+        conn = appsql.get_db()
+        ids = [(rnd.randint(1, args.quotes),) for _ in range(args.repeat * 100)]
+
+        def legacy_get(quote_id):
+            cursor = conn.execute(f"SELECT * FROM quotes WHERE id={quote_id}")
+            cursor.fetchone()
+            cursor.close()
+
+        def named_get(quote_id):
+            appsql.queries.fetch_one("get_quote", id=quote_id)
+
+        batch = [{"author": "Batch", "text": f"batch {i}"} for i in range(1000)]
+
+        def legacy_insert(row):
+            conn.execute(f"INSERT INTO quotes(author, text) VALUES('{row['author']}', '{row['text']}');")
+            conn.commit()
+
+        start = time.perf_counter()
+        for row in batch:
+            legacy_insert(row)
+        legacy_batch_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        appsql.queries.insert_many("create_quote", batch)
+        batch_ms = (time.perf_counter() - start) * 1000
+
+        result = {
+            "benchmark": "appsql",
+            "quotes": args.quotes,
+            "get_by_id": {
+                "legacy_us": per_call_us(legacy_get, ids),
+                "named_us": per_call_us(named_get, ids),
+            },
+            "insert_1000": {
+                "legacy_ms": round(legacy_batch_ms, 3),
+                "insert_many_ms": round(batch_ms, 3),
+            },
+        }
+    client = appsql.app.test_client()
+    result["get_by_id"]["request"] = timed_requests(client, "/quotes/1", args.repeat)
+    result["pool"] = appsql.pool.stats()
+    appsql.pool.close()
+    return result
+
+
+def percentiles(timings: list[float]) -> dict:
+    timings = sorted(timings)
+    if not timings:
+        return {}
+    return {
+        f"p{p}_ms": round(timings[min(len(timings) - 1, len(timings) * p // 100)] * 1000, 3)
+        for p in (50, 95, 99)
+    }
+
+
+def bench_load(quotes_app, args) -> dict:
+    """Concurrent read/write mix for ``--seconds`` from ``--threads`` threads against the current profile."""
+    app = quotes_app.app
+    max_id = args.quotes
+    reads = [
+        lambda rnd: f"/quotes/{rnd.randint(1, max_id)}",
+        lambda rnd: "/quotes?limit=20&sort=rating",
+        lambda rnd: f"/authors/{rnd.randint(1, args.authors)}/quotes",
+        lambda rnd: "/quotes/top?limit=10",
+    ]
+    writes = [
+        lambda client, rnd: client.get(f"/quotes/{rnd.randint(1, max_id)}/increase_rating"),
+        lambda client, rnd: client.get(f"/quotes/{rnd.randint(1, max_id)}/decrease_rating"),
+        lambda client, rnd: client.post(f"/authors/{rnd.randint(1, args.authors)}/quotes", json={"text": "load", "rating": 3}),
+    ]
+    stats = {"read": [], "write": []}
+    errors = []
+    deadline = time.perf_counter() + args.seconds
+
+    def worker(seed):
+        rnd = random.Random(seed)
+        client = app.test_client()
+        while time.perf_counter() < deadline:
+            kind = "write" if rnd.random() < args.writes else "read"
+            start = time.perf_counter()
+            if kind == "read":
+                response = client.get(rnd.choice(reads)(rnd))
+            else:
+                response = rnd.choice(writes)(client, rnd)
+            stats[kind].append(time.perf_counter() - start)
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        "benchmark": "load",
+        "profile": app.config["SQLITE_PROFILE"],
+        "read_pool": quotes_app.READ_BIND in quotes_app.db.engines,
+        "threads": args.threads,
+        "writes": args.writes,
+        "requests_per_s": round((len(stats["read"]) + len(stats["write"])) / args.seconds, 1),
+        "errors": len(errors),
+        **{kind: {"requests": len(timings), **percentiles(timings)} for kind, timings in stats.items()},
+    }
+
+
+def bench_profiles(db_path: Path, args) -> dict:
+    """Run the load benchmark once per SQLite profile / read pool setting, each in its own process."""
+    results = []
+    for profile, read_pool in [("default", False), ("production", False), ("production", True)]:
+        env = {
+            **os.environ,
+            "FLASK_SQLITE_PROFILE": profile,
+            "FLASK_SQLITE_READ_POOL": "true" if read_pool else "false",
+            "FLASK_CACHE_TYPE": "null",  # меряем БД, а не кэш ответов
+        }
+        command = [
+            sys.executable, __file__, "load",
+            "--authors", str(args.authors), "--quotes", str(args.quotes),
+            "--threads", str(args.threads), "--seconds", str(args.seconds), "--writes", str(args.writes),
+        ]
+        output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output))
+    return {"benchmark": "profiles", "quotes": args.quotes, "cases": results}
+
+
+# Наборы данных bench.py routes: (авторов, цитат)
+DATASETS = {
+    "1k": (100, 1_000),
+    "100k": (1_000, 100_000),
+    "1m": (10_000, 1_000_000),
+}
+
+
+class StatementCounter:
+    """Counts the SQL statements run by the current thread between ``start`` and ``stop``."""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def start(self):
+        self.local.count = 0
+
+    def stop(self) -> int:
+        count, self.local.count = self.local.count, None
+        return count
+
+    def __call__(self, *args):
+        # before_cursor_execute у SQLAlchemy и trace callback у sqlite3
+        if getattr(self.local, "count", None) is not None:
+            self.local.count += 1
+
+
+class RouteContext:
+    """What the route cases need: dataset size, unique names, and the client for untimed setup requests."""
+
+    def __init__(self, client, authors: int, quotes: int):
+        self.client = client
+        self.authors = authors
+        self.quotes = quotes
+        self.counter = threading.Lock(), [0]
+
+    def unique(self) -> int:
+        lock, value = self.counter
+        with lock:
+            value[0] += 1
+            return value[0]
+
+    def author_id(self, rnd) -> int:
+        return rnd.randint(1, self.authors)
+
+    def author(self, rnd) -> dict:
+        """Name and surname of a seeded author, as seed() made them."""
+        author_id = self.author_id(rnd)
+        return {"name": f"Name{author_id}", "surname": f"Surname{author_id % (self.authors // 2 + 1)}"}
+
+    def quote_id(self, rnd) -> int:
+        return rnd.randint(1, self.quotes)
+
+    def new_author(self, with_quote: bool = False) -> int:
+        number = self.unique()
+        author_id = self.client.post("/authors", json={"name": f"Bench{number}-{id(self)}", "surname": "Bench"}).json["id"]
+        if with_quote:
+            self.client.post(f"/authors/{author_id}/quotes", json={"text": "bench", "rating": 3})
+        return author_id
+
+    def new_quote(self) -> int:
+        return self.client.post(f"/authors/1/quotes", json={"text": "bench", "rating": 3}).json["id"]
+
+
+# Каждый маршрут app.py: (название, read/write, функция (rnd, ctx) -> (метод, url, json)).
+# Подготовка (создать автора, чтобы потом его удалить) идет через ctx.client и не замеряется.
+# Полные NDJSON-выгрузки /quotes и /authors не включены: один такой запрос читает всю таблицу.
+APP_ROUTES = [
+    ("GET /authors/<id>", "read", lambda rnd, ctx: ("GET", f"/authors/{ctx.author_id(rnd)}", None)),
+    ("GET /authors", "read", lambda rnd, ctx: ("GET", "/authors?limit=50", None)),
+    ("GET /authors/search", "read", lambda rnd, ctx: ("GET", f"/authors/search?q=Name{ctx.author_id(rnd)}", None)),
+    ("GET /authors/filters", "read", lambda rnd, ctx: ("GET", f"/authors/filters?name=Name{ctx.author_id(rnd)}", None)),
+    ("GET /authors/sortedby/<tag>", "read", lambda rnd, ctx: ("GET", "/authors/sortedby/surname?then=-name&limit=50", None)),
+    ("GET /authors/<id>/quotes", "read", lambda rnd, ctx: ("GET", f"/authors/{ctx.author_id(rnd)}/quotes", None)),
+    ("GET /authors/<id>/quotes?format=ndjson", "read",
+     lambda rnd, ctx: ("GET", f"/authors/{ctx.author_id(rnd)}/quotes?format=ndjson", None)),
+    ("GET /authors/<id>/quotes/stats", "read", lambda rnd, ctx: ("GET", f"/authors/{ctx.author_id(rnd)}/quotes/stats", None)),
+    ("GET /authors/quotes/stats", "read", lambda rnd, ctx: ("GET", "/authors/quotes/stats?limit=100", None)),
+    ("GET /quotes", "read", lambda rnd, ctx: ("GET", f"/quotes?limit=50&sort={rnd.choice(['id', 'rating', 'created'])}", None)),
+    ("GET /quotes?include=author", "read", lambda rnd, ctx: ("GET", "/quotes?limit=50&fields=id,text&include=author", None)),
+    ("GET /quotes/search", "read", lambda rnd, ctx: ("GET", f"/quotes/search?q=word{rnd.randint(0, 1999)}&limit=20", None)),
+    ("GET /quotes/filters", "read",
+     lambda rnd, ctx: ("GET", f"/quotes/filters?author_id={ctx.author_id(rnd)}&rating_min=3&limit=50", None)),
+    ("GET /quotes/filters?text", "read",
+     lambda rnd, ctx: ("GET", f"/quotes/filters?text=word{rnd.randint(0, 1999)}&rating=5&limit=50", None)),
+    ("GET /quotes/<id>", "read", lambda rnd, ctx: ("GET", f"/quotes/{ctx.quote_id(rnd)}", None)),
+    ("GET /quotes/top", "read", lambda rnd, ctx: ("GET", "/quotes/top?limit=10", None)),
+    ("GET /quotes/top?author_id", "read", lambda rnd, ctx: ("GET", f"/quotes/top?limit=10&author_id={ctx.author_id(rnd)}", None)),
+    ("GET /quotes/count", "read", lambda rnd, ctx: ("GET", "/quotes/count", None)),
+    ("GET /quotes/random", "read", lambda rnd, ctx: ("GET", "/quotes/random", None)),
+    ("GET /quotes/ratings/buffer", "read", lambda rnd, ctx: ("GET", "/quotes/ratings/buffer", None)),
+    ("GET /cache/stats", "read", lambda rnd, ctx: ("GET", "/cache/stats", None)),
+    ("GET /commit/stats", "read", lambda rnd, ctx: ("GET", "/commit/stats", None)),
+    ("GET /metrics", "read", lambda rnd, ctx: ("GET", "/metrics", None)),
+
+    ("POST /authors", "write", lambda rnd, ctx: ("POST", "/authors", {"name": f"New{ctx.unique()}-{id(ctx)}", "surname": ""})),
+    ("PUT /authors/<id>", "write",
+     lambda rnd, ctx: ("PUT", f"/authors/{ctx.author_id(rnd)}", {"surname": f"Surname{rnd.randint(0, ctx.authors)}"})),
+    ("DELETE /authors/<id>", "write", lambda rnd, ctx: ("DELETE", f"/authors/{ctx.author_id(rnd)}", None)),
+    ("PUT /authors/recover/<id>", "write", lambda rnd, ctx: ("PUT", f"/authors/recover/{ctx.author_id(rnd)}", None)),
+    ("PUT /authors/recover/all", "write", lambda rnd, ctx: ("PUT", "/authors/recover/all", None)),
+    ("DELETE /authors?ids", "write",
+     lambda rnd, ctx: ("DELETE", f"/authors?ids={ctx.author_id(rnd)},{ctx.author_id(rnd)}", None)),
+    ("PUT /authors/recover", "write",
+     lambda rnd, ctx: ("PUT", "/authors/recover", {"ids": [ctx.author_id(rnd) for _ in range(5)]})),
+    ("DELETE /authors/<id>/delete", "write", lambda rnd, ctx: ("DELETE", f"/authors/{ctx.new_author(True)}/delete", None)),
+    ("DELETE /authors/delete", "write",
+     lambda rnd, ctx: ("DELETE", f"/authors/delete?ids={ctx.new_author(True)},{ctx.new_author()}", None)),
+    ("POST /authors/<id>/quotes", "write",
+     lambda rnd, ctx: ("POST", f"/authors/{ctx.author_id(rnd)}/quotes", {"text": "bench", "rating": rnd.randint(1, 5)})),
+    ("POST /quotes/bulk", "write", lambda rnd, ctx: ("POST", "/quotes/bulk", [
+        {**ctx.author(rnd), "text": "bulk", "rating": rnd.randint(1, 5)} for _ in range(10)
+    ])),
+    ("PUT /quotes/<id>", "write", lambda rnd, ctx: ("PUT", f"/quotes/{ctx.quote_id(rnd)}", {"text": f"edited {ctx.unique()}"})),
+    ("DELETE /quotes/<id>", "write", lambda rnd, ctx: ("DELETE", f"/quotes/{ctx.new_quote()}", None)),
+    ("GET /quotes/<id>/increase_rating", "write", lambda rnd, ctx: ("GET", f"/quotes/{ctx.quote_id(rnd)}/increase_rating", None)),
+    ("GET /quotes/<id>/decrease_rating", "write", lambda rnd, ctx: ("GET", f"/quotes/{ctx.quote_id(rnd)}/decrease_rating", None)),
+    ("POST /quotes/ratings", "write", lambda rnd, ctx: ("POST", "/quotes/ratings", [
+        {"id": ctx.quote_id(rnd), "delta": rnd.choice([-1, 1])} for _ in range(10)
+    ])),
+]
+
+# Маршруты appsql.py; GET /quotes отдает всю таблицу quotes
+APPSQL_ROUTES = [
+    ("GET /quotes", "read", lambda rnd, ctx: ("GET", "/quotes", None)),
+    ("GET /quotes/<id>", "read", lambda rnd, ctx: ("GET", f"/quotes/{ctx.quote_id(rnd)}", None)),
+    ("GET /pool/stats", "read", lambda rnd, ctx: ("GET", "/pool/stats", None)),
+
+    ("POST /quotes", "write", lambda rnd, ctx: ("POST", "/quotes", {"author": "Bench", "text": "bench"})),
+    ("PUT /quotes/<id>", "write",
+     lambda rnd, ctx: ("PUT", f"/quotes/{ctx.quote_id(rnd)}", {"author": "", "text": f"edited {ctx.unique()}"})),
+    ("DELETE /quotes/<id>", "write", lambda rnd, ctx: (
+        "DELETE", f"/quotes/{ctx.client.post('/quotes', json={'author': 'Bench', 'text': 'bench'}).json['id']}", None
+    )),
+    ("POST /quotes/batch", "write",
+     lambda rnd, ctx: ("POST", "/quotes/batch", [{"author": "Bench", "text": "batch"} for _ in range(10)])),
+    ("PUT /quotes/batch", "write", lambda rnd, ctx: ("PUT", "/quotes/batch", [
+        {"id": ctx.quote_id(rnd), "author": "", "text": f"batch {ctx.unique()}"} for _ in range(10)
+    ])),
+    ("DELETE /quotes/batch", "write", lambda rnd, ctx: ("DELETE", "/quotes/batch", {"ids": [
+        row["id"] for row in ctx.client.post("/quotes/batch", json=[{"author": "Bench", "text": "batch"}] * 10).json
+    ]})),
+]
+
+
+def drive_routes(flask_app, routes: list, counter: StatementCounter, authors: int, quotes: int, args) -> dict:
+    """Send the ``routes`` mix from ``--threads`` threads for ``--seconds``; per-route latency and SQL statements."""
+    by_kind = {kind: [route for route in routes if route[1] == kind] for kind in ("read", "write")}
+    stats = {name: {"timings": [], "statements": 0, "errors": 0, "status": {}} for name, _, _ in routes}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def worker(seed):
+        rnd = random.Random(seed)
+        client = flask_app.test_client()
+        ctx = RouteContext(client, authors, quotes)
+        while time.perf_counter() < deadline:
+            kind = "write" if rnd.random() < args.writes else "read"
+            name, _, make_request = rnd.choice(by_kind[kind] or by_kind["read"])
+            method, url, body = make_request(rnd, ctx)
+            counter.start()
+            start = time.perf_counter()
+            response = client.open(url, method=method, json=body)
+            response.close()  # дочитывает потоковые (NDJSON) ответы
+            elapsed = time.perf_counter() - start
+            statements = counter.stop()
+            with lock:
+                route = stats[name]
+                route["timings"].append(elapsed)
+                route["statements"] += statements
+                route["status"][response.status_code] = route["status"].get(response.status_code, 0) + 1
+                if response.status_code >= 500:
+                    route["errors"] += 1
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    results = []
+    for name, kind, _ in routes:
+        route = stats[name]
+        requests = len(route["timings"])
+        results.append({
+            "route": name,
+            "kind": kind,
+            "requests": requests,
+            "errors": route["errors"],
+            "status": {str(code): count for code, count in sorted(route["status"].items())},
+            **percentiles(route["timings"]),
+            "statements_per_request": round(route["statements"] / requests, 2) if requests else None,
+        })
+    totals = {
+        kind: [t for name, route_kind, _ in routes if route_kind == kind for t in stats[name]["timings"]]
+        for kind in ("read", "write")
+    }
+    return {
+        "requests_per_s": round(sum(len(timings) for timings in totals.values()) / args.seconds, 1),
+        "errors": sum(route["errors"] for route in results),
+        **{kind: {"requests": len(timings), **percentiles(timings)} for kind, timings in totals.items()},
+        "routes": results,
+    }
+
+
+def git_commit() -> dict:
+    """Commit of the working tree, so results of different commits can be told apart."""
+    def git(*command):
+        return subprocess.run(["git", *command], cwd=BASE_DIR, capture_output=True, text=True).stdout.strip()
+    try:
+        return {"commit": git("rev-parse", "--short", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    except OSError:
+        return {"commit": None, "dirty": None}
+
+
+def bench_routes(db_path: Path, args) -> dict:
+    """Every route of app.py and appsql.py under a read/write mix: throughput, p50/p95/p99, SQL statements per request."""
+    counter = StatementCounter()
+    quotes_app = setup_app(db_path)
+    seed(quotes_app, args.authors, args.quotes)
+    for engine in quotes_app.db.engines.values():
+        event.listen(engine, "before_cursor_execute", counter)
+    apps = {"app": drive_routes(quotes_app.app, APP_ROUTES, counter, args.authors, args.quotes, args)}
+    quotes_app.db.engine.dispose()
+
+    appsql_path = db_path.with_name("appsql.db")
+    connection = sqlite3.connect(appsql_path)
+    connection.execute("CREATE TABLE quotes (id INTEGER PRIMARY KEY AUTOINCREMENT, author TEXT NOT NULL, text TEXT NOT NULL)")
+    connection.executemany(
+        "INSERT INTO quotes (author, text) VALUES (?, ?)",
+        ((f"Author{i % args.authors}", f"text {i}") for i in range(args.quotes)),
+    )
+    connection.commit()
+    connection.close()
+    os.environ["FLASK_DATABASE"] = str(appsql_path)
+    import appsql
+    connect = appsql.pool.connect
+
+    def traced_connect():
+        connection = connect()
+        connection.set_trace_callback(counter)
+        return connection
+
+    appsql.pool.connect = traced_connect
+    apps["appsql"] = drive_routes(appsql.app, APPSQL_ROUTES, counter, args.authors, args.quotes, args)
+    appsql.pool.close()
+    return {
+        "benchmark": "routes",
+        **git_commit(),
+        "dataset": args.dataset,
+        "authors": args.authors,
+        "quotes": args.quotes,
+        "threads": args.threads,
+        "seconds": args.seconds,
+        "writes": args.writes,
+        "apps": apps,
+    }
+
+
+COMPARE_MIN_REQUESTS = 100
+
+
+def bench_compare(db_path: Path, args) -> dict:
+    """Compare two ``routes`` results (``--baseline`` and ``--result``); slower p99 or more SQL is a regression."""
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.result) as file:
+        result = json.load(file)
+    routes, regressions = [], []
+    for app_name, app_result in result["apps"].items():
+        old_routes = {route["route"]: route for route in baseline["apps"].get(app_name, {}).get("routes", [])}
+        for route in app_result["routes"]:
+            old = old_routes.get(route["route"])
+            if old is None or not old["requests"] or not route["requests"]:
+                continue
+            change = {
+                "app": app_name,
+                "route": route["route"],
+                **{key: [old.get(key), route.get(key)] for key in ("p50_ms", "p99_ms", "statements_per_request")},
+                "p99_ratio": round(route["p99_ms"] / old["p99_ms"], 2) if old["p99_ms"] else None,
+            }
+            routes.append(change)
+            more_sql = route["statements_per_request"] > old["statements_per_request"] + 0.5
+            # p99 по паре десятков запросов - шум, сравниваем только достаточно большие выборки
+            enough = min(old["requests"], route["requests"]) >= COMPARE_MIN_REQUESTS
+            if more_sql or (enough and (change["p99_ratio"] or 0) > 1 + args.tolerance):
+                regressions.append(f"{app_name} {route['route']}")
+    return {
+        "benchmark": "compare",
+        "baseline": baseline.get("commit"),
+        "result": result.get("commit"),
+        "tolerance": args.tolerance,
+        "routes": routes,
+        "regressions": regressions,
+    }
+
+
+async def read_response(reader) -> tuple[int, bool]:
+    """Read one HTTP/1.x response; returns the status and whether the connection stays open."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    version, status = status_line.split(b" ", 2)[:2]
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    await reader.readexactly(int(headers.get("content-length", 0)))
+    keep_alive = version == b"HTTP/1.1" and headers.get("connection", "").lower() != "close"
+    return int(status), keep_alive
+
+
+async def http_load(port: int, reads: list, writes: list, args) -> dict:
+    """``--clients`` keep-alive connections sending GET requests for ``--seconds``, ``--writes`` of them writes."""
+    timings, errors = [], []
+    deadline = time.perf_counter() + args.seconds
+
+    async def client(seed):
+        rnd = random.Random(seed)
+        writer = None
+        while time.perf_counter() < deadline:
+            path = rnd.choice(writes if rnd.random() < args.writes else reads)(rnd)
+            start = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n".encode())
+                status, keep_alive = await read_response(reader)
+            except (OSError, ValueError, asyncio.IncompleteReadError) as error:
+                errors.append(type(error).__name__)
+                writer = None
+                continue
+            timings.append(time.perf_counter() - start)
+            if status >= 500:
+                errors.append(status)
+            if not keep_alive:  # сервер Werkzeug отвечает по HTTP/1.0 и закрывает соединение
+                writer.close()
+                writer = None
+        if writer is not None:
+            writer.close()
+
+    await asyncio.gather(*(client(seed) for seed in range(args.clients)))
+    return {
+        "requests_per_s": round(len(timings) / args.seconds, 1),
+        "errors": len(errors),
+        **percentiles(timings),
+    }
+
+
+def wait_for_server(port: int, process, timeout: float = 30):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with {process.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/quotes/count") as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"Server on port {port} did not start")
+
+
+def bench_asgi(db_path: Path, args) -> dict:
+    """The same read/write mix against app.py (threaded WSGI server) and appasync.py (uvicorn) at ``--clients`` clients."""
+    quotes_app = setup_app(db_path)
+    seed(quotes_app, args.authors, args.quotes)
+    quotes_app.db.engine.dispose()
+    max_id = args.quotes
+    reads = [
+        lambda rnd: f"/quotes/{rnd.randint(1, max_id)}",
+        lambda rnd: "/quotes?limit=20&sort=rating",
+        lambda rnd: f"/authors/{rnd.randint(1, args.authors)}/quotes",
+        lambda rnd: "/quotes/top?limit=10",
+    ]
+    writes = [
+        lambda rnd: f"/quotes/{rnd.randint(1, max_id)}/increase_rating",
+        lambda rnd: f"/quotes/{rnd.randint(1, max_id)}/decrease_rating",
+    ]
+    env = {
+        **os.environ,
+        "FLASK_SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}",
+        "FLASK_CACHE_TYPE": "null",  # меряем обработку запросов, а не кэш ответов
+    }
+    servers = {
+        "wsgi": [sys.executable, "-m", "flask", "--app", "app", "run", "--with-threads", "--port"],
+        "asgi": [sys.executable, "-m", "uvicorn", "appasync:app", "--log-level", "warning", "--no-access-log", "--port"],
+    }
+    results = []
+    for port, (name, command) in enumerate(servers.items(), start=5601):
+        process = subprocess.Popen(
+            [*command, str(port)], cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_for_server(port, process)
+            result = asyncio.run(http_load(port, reads, writes, args))
+        finally:
+            process.terminate()
+            process.wait()
+        results.append({"server": name, "clients": args.clients, **result})
+    return {"benchmark": "asgi", "quotes": args.quotes, "writes": args.writes, "cases": results}
+
+
+def bench_group_commit(db_path: Path, args) -> dict:
+    """POST /authors and POST /authors/<id>/quotes from ``--threads`` clients, with and without group commit.
+
+    Runs on both SQLite profiles: with "default" (rollback journal,
+    synchronous=FULL) every commit is an fsync, with "production" (WAL,
+    synchronous=NORMAL) commits are cheaper, so the gain is smaller.
+    """
+    import app as quotes_app
+    from flask_migrate import Migrate, upgrade
+
+    results = []
+    for profile in ("default", "production"):
+        for enabled in (False, True):
+            path = db_path.with_name(f"group_{profile}_{int(enabled)}.db")
+            flask_app = quotes_app.create_app({
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+                "SQLITE_PROFILE": profile,
+                "GROUP_COMMIT_ENABLED": enabled,
+                "GROUP_COMMIT_WINDOW_MS": args.window_ms,
+                "SQLALCHEMY_ENGINE_OPTIONS": {"pool_size": args.threads + 1, "max_overflow": 0},
+            })
+            Migrate(flask_app, quotes_app.db)
+            with flask_app.app_context():
+                upgrade(directory=str(BASE_DIR / "migrations"))
+                seed(quotes_app, args.authors, 0)
+            timings, errors, counter = [], [], iter(range(10 ** 9))
+            deadline = time.perf_counter() + args.seconds
+
+            def worker(seed_value):
+                rnd = random.Random(seed_value)
+                client = flask_app.test_client()
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    if rnd.random() < 0.5:
+                        response = client.post("/authors", json={"name": f"Group{next(counter)}", "surname": ""})
+                    else:
+                        response = client.post(f"/authors/{rnd.randint(1, args.authors)}/quotes", json={"text": "group", "rating": 3})
+                    timings.append(time.perf_counter() - start)
+                    if response.status_code != 201:
+                        errors.append(response.status_code)
+
+            threads = [threading.Thread(target=worker, args=(seed_value,)) for seed_value in range(args.threads)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            group_commit = flask_app.extensions["quotes"]["group_commit"]
+            if group_commit is not None:
+                group_commit.close()
+            with flask_app.app_context():
+                quotes_app.db.engine.dispose()
+            results.append({
+                "profile": profile,
+                "group_commit": enabled,
+                "inserts_per_s": round(len(timings) / args.seconds, 1),
+                "errors": len(errors),
+                **percentiles(timings),
+                **({"groups": group_commit.stats()} if group_commit is not None else {}),
+            })
+    return {
+        "benchmark": "group_commit",
+        "threads": args.threads,
+        "seconds": args.seconds,
+        "window_ms": args.window_ms,
+        "cases": results,
+    }
+
+
+# Запускается в отдельном интерпретаторе, чтобы модули не были уже загружены
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+flask_app = app.create_app()
+created = time.perf_counter()
+with flask_app.app_context():
+    connections = sum(engine.pool.checkedin() + engine.pool.checkedout() for engine in app.db.engines.values())
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "alembic_loaded": "alembic" in sys.modules,
+    "connections": connections,
+}))
+"""
+
+
+def bench_startup(db_path: Path, args) -> dict:
+    """Cold start of a worker: ``import app`` + ``create_app()`` against ``--budget-ms``.
+
+    Serving must not load Alembic or open database connections before the
+    first request; either one fails the check as well.
+    """
+    env = {**os.environ, "FLASK_SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}"}
+    runs = []
+    for _ in range(args.repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT], cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        runs.append(json.loads(output))
+    total = sorted(run["import_ms"] + run["create_app_ms"] for run in runs)
+    median = total[len(total) // 2]
+    alembic_loaded = any(run["alembic_loaded"] for run in runs)
+    connections = max(run["connections"] for run in runs)
+    return {
+        "benchmark": "startup",
+        "runs": args.repeat,
+        "import_ms": round(sorted(run["import_ms"] for run in runs)[len(runs) // 2], 1),
+        "create_app_ms": round(sorted(run["create_app_ms"] for run in runs)[len(runs) // 2], 1),
+        "total_ms": round(median, 1),
+        "budget_ms": args.budget_ms,
+        "alembic_loaded": alembic_loaded,
+        "connections": connections,
+        "over_budget": median > args.budget_ms or alembic_loaded or connections > 0,
+    }
+
+
+BENCHMARKS = {
+    "filters": bench_filters,
+    "sorted_authors": bench_sorted_authors,
+    "serialization": bench_serialization,
+    "load": bench_load,
+}
+# эти не используют app.py и получают только путь к своей временной БД
+STANDALONE_BENCHMARKS = {
+    "appsql": bench_appsql,
+    "profiles": bench_profiles,
+    "asgi": bench_asgi,
+    "routes": bench_routes,
+    "compare": bench_compare,
+    "startup": bench_startup,
+    "group_commit": bench_group_commit,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("benchmark", choices=[*BENCHMARKS, *STANDALONE_BENCHMARKS])
+    parser.add_argument("--authors", type=int, default=1000)
+    parser.add_argument("--quotes", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--writes", type=float, default=0.2, help="share of write requests in the load mix")
+    parser.add_argument("--clients", type=int, default=500, help="concurrent connections of the asgi benchmark")
+    parser.add_argument("--dataset", choices=DATASETS, help="preset --authors/--quotes size")
+    parser.add_argument("--baseline", help="compare: routes result of the old commit")
+    parser.add_argument("--result", help="compare: routes result of the new commit")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="compare: allowed p99 slowdown (0.2 = 20%%)")
+    parser.add_argument("--window-ms", type=float, default=2, help="group_commit: GROUP_COMMIT_WINDOW_MS")
+    parser.add_argument("--budget-ms", type=float, default=1000, help="startup: allowed import app + create_app() time")
+    args = parser.parse_args()
+    if args.dataset is not None:
+        args.authors, args.quotes = DATASETS[args.dataset]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.benchmark in STANDALONE_BENCHMARKS:
+            result = STANDALONE_BENCHMARKS[args.benchmark](Path(tmp) / "bench.db", args)
+        else:
+            quotes_app = setup_app(Path(tmp) / "bench.db")
+            seed(quotes_app, args.authors, args.quotes)
+            result = BENCHMARKS[args.benchmark](quotes_app, args)
+            quotes_app.db.engine.dispose()
+    json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+    if result.get("regressions") or result.get("over_budget"):
+        return 1
+    return 0 if all(case.get("uses_index", True) for case in result.get("cases", [])) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
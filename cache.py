@@ -0,0 +1,204 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+
+MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache; every entry lives at most ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key, MISSING)
+            if item is MISSING:
+                return MISSING
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SharedCache:
+    """Local stand-in for a shared cache server (Redis/memcached).
+
+    Has the same small interface a network client would have - bytes in,
+    bytes out, TTL on set and an atomic ``incr`` - so it can be swapped for
+    a real client without touching ResponseCache.
+    """
+
+    def __init__(self, ttl: float = 60):
+        self.ttl = ttl
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            return MISSING
+        return pickle.loads(item[1])
+
+    def set(self, key, value):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, data)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key) -> int:
+        with self._lock:
+            _, data = self._data.get(key, (None, None))
+            value = (pickle.loads(data) if data is not None else 0) + 1
+            self._data[key] = (float("inf"), pickle.dumps(value))
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class ResponseCache:
+    """Read-through cache for serialized responses with tag-based invalidation.
+
+    Every entry is stored with the versions of its tags (e.g. ``quote:1``,
+    ``author:2``); ``invalidate`` bumps the versions of the given tags, so
+    exactly the entries built from the changed rows stop matching. Lookups go
+    to the in-process LRU first and then to the optional shared backend; tag
+    versions live in the shared backend when there is one, so all processes
+    see the same invalidations.
+
+    Tags are bumped only by the process that made the write. An entry can
+    also carry a ``version`` - the table versions of the response, which the
+    database bumps on every write (see conditional.py) - and is served only
+    for the same version, so writes of other processes are seen as well.
+    """
+
+    def __init__(self, local: LRUCache, shared: SharedCache | None = None):
+        self.local = local
+        self.shared = shared
+        self._tags: dict[str, int] = {}  # версии тегов, если нет общего кэша
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _tag_versions(self, tags) -> dict:
+        if self.shared is not None:
+            versions = {tag: self.shared.get(f"tag:{tag}") for tag in tags}
+            return {tag: 0 if version is MISSING else version for tag, version in versions.items()}
+        return {tag: self._tags.get(tag, 0) for tag in tags}
+
+    def _lookup(self, key, version):
+        for backend in (self.local, self.shared):
+            if backend is None:
+                continue
+            entry = backend.get(key)
+            if entry is MISSING:
+                continue
+            versions, entry_version, value = entry
+            if entry_version == version and self._tag_versions(versions) == versions:
+                if backend is self.shared:
+                    self.local.set(key, entry)
+                return value
+        return MISSING
+
+    def get_or_set(self, key: str, loader, tags=lambda value: (), version=None):
+        """Return the cached value of ``key`` or call ``loader()`` and cache its result.
+
+        ``tags`` maps the loaded value to the tags it depends on; an entry
+        stored with another ``version`` is loaded again.
+        """
+        value = self._lookup(key, version)
+        if value is not MISSING:
+            self.hits += 1
+            return value
+        self.misses += 1
+        epoch = self.invalidations
+        value = loader()
+        entry = (self._tag_versions(set(tags(value))), version, value)
+        if self.invalidations != epoch:
+            return value  # за время загрузки что-то изменилось - не кэшируем, значение могло устареть
+        self.local.set(key, entry)
+        if self.shared is not None:
+            self.shared.set(key, entry)
+        return value
+
+    def invalidate(self, *tags):
+        self.invalidations += 1
+        for tag in tags:
+            if self.shared is not None:
+                self.shared.incr(f"tag:{tag}")
+            else:
+                with self._lock:
+                    self._tags[tag] = self._tags.get(tag, 0) + 1
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            "local_size": len(self.local),
+        }
+
+
+class NullCache:
+    """Cache that never stores anything, used when CACHE_TYPE is None."""
+
+    def get_or_set(self, key, loader, tags=lambda value: (), version=None):
+        return loader()
+
+    def invalidate(self, *tags):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"enabled": False}
+
+
+def cache_from_config(config):
+    """Build the response cache described by CACHE_TYPE ("local", "shared" or None)."""
+    if config["CACHE_TYPE"] is None:
+        return NullCache()
+    local = LRUCache(config["CACHE_MAXSIZE"], config["CACHE_TTL"])
+    shared = SharedCache(config["CACHE_TTL"]) if config["CACHE_TYPE"] == "shared" else None
+    return ResponseCache(local, shared)
@@ -0,0 +1,67 @@
+import hashlib
+from datetime import timezone
+from functools import wraps
+
+from flask import current_app, g, make_response, request
+
+
+def representation_etag(versions: dict, variant: str = "") -> str:
+    """Strong ETag for the current URL built from the versions of the tables behind it."""
+    key = "|".join([request.full_path, variant, *(f"{name}={versions[name]}" for name in sorted(versions))])
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def current_versions() -> tuple | None:
+    """Table versions the ETag of the current response is built from, or None outside ``conditional`` views."""
+    versions = g.get("_table_versions")
+    return None if versions is None else tuple(sorted(versions.items()))
+
+
+def is_not_modified(etag: str, last_modified) -> bool:
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    # Last-Modified точен до секунды, а версия таблицы меняется чаще: две записи за одну секунду
+    # If-Modified-Since не различает. Клиент с ETag сюда не доходит - If-None-Match главнее
+    if request.if_modified_since and last_modified is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def conditional(load_versions, *tables, variant=lambda: "", vary=None):
+    """Add ETag/Last-Modified to a GET view and answer 304 when nothing has changed.
+
+    ``load_versions(tables)`` returns ``({table: version}, last_modified)``; it
+    is called before the view, so an unchanged resource is answered without
+    loading or serializing any rows. ``variant`` distinguishes representations
+    of the same URL (e.g. JSON and NDJSON), and ``vary`` names the request
+    header it depends on.
+
+    The versions are read again after the view: a body built while a write
+    was being committed may be newer than the ETag, so such a response is sent
+    without validators. A streamed body is read only after the headers are
+    sent and cannot be checked, so it never gets them.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions, last_modified = load_versions(tables)
+            g._table_versions = versions
+            if last_modified is not None:
+                last_modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+            etag = representation_etag(versions, variant())
+            if is_not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            if vary is not None:
+                response.vary.add(vary)
+            if response.status_code == 200 and (response.is_streamed or load_versions(tables)[0] != versions):
+                return response
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            return response
+        return wrapper
+    return decorator
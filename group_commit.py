@@ -0,0 +1,103 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommit:
+    """Write-behind group commit: concurrent writes share one transaction.
+
+    ``write`` is a callable that inserts a list of items in one transaction
+    and returns one result per item (e.g. the new row with its id). ``submit``
+    queues an item and blocks until the transaction holding it has committed,
+    then returns the item's result, so every caller still gets its own id and
+    knows its row is durable.
+
+    A group is written ``window_ms`` milliseconds after its first item arrives
+    or as soon as ``max_size`` items are waiting; items that arrive while a
+    group is being written form the next one. If a group fails, its items are
+    retried one by one, so only the broken ones get the error. The background
+    thread starts with the first item; ``close`` stops it after writing
+    whatever is still queued.
+    """
+
+    def __init__(self, write, window_ms: float = 2, max_size: int = 100):
+        self._write = write
+        self.window = window_ms / 1000
+        self.max_size = max_size
+        self._ready = threading.Condition()
+        self._queue: list[tuple] = []
+        self._thread = None
+        self._closed = False
+        self.groups = 0
+        self.committed = 0
+        self.failed = 0
+        self.largest_group = 0
+
+    def submit(self, item):
+        future = Future()
+        with self._ready:
+            if self._closed:
+                raise RuntimeError("Group commit is closed")
+            self._queue.append((item, future))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                self._thread.start()
+            self._ready.notify()
+        return future.result()
+
+    def close(self):
+        with self._ready:
+            self._closed = True
+            self._ready.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def stats(self) -> dict:
+        return {
+            "groups": self.groups,
+            "committed": self.committed,
+            "failed": self.failed,
+            "pending": len(self._queue),
+            "largest_group": self.largest_group,
+            "average_group": round(self.committed / self.groups, 2) if self.groups else None,
+        }
+
+    def _run(self):
+        while True:
+            with self._ready:
+                while not self._queue and not self._closed:
+                    self._ready.wait()
+                if not self._queue:
+                    return
+                # ждем, пока группа наберется, но не дольше окна от ее первой записи
+                deadline = time.monotonic() + self.window
+                while len(self._queue) < self.max_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._ready.wait(remaining)
+                group, self._queue = self._queue[:self.max_size], self._queue[self.max_size:]
+            self._commit(group)
+
+    def _commit(self, group: list[tuple]):
+        try:
+            results = self._write([item for item, _ in group])
+        except Exception as error:
+            if len(group) > 1:
+                # как в import_chunk: по одной, чтобы ошибку получили только сломанные записи
+                for entry in group:
+                    self._commit([entry])
+                return
+            logger.debug("Group commit item failed: %s", error)
+            self.failed += 1
+            group[0][1].set_exception(error)
+            return
+        self.groups += 1
+        self.committed += len(group)
+        self.largest_group = max(self.largest_group, len(group))
+        for (_, future), result in zip(group, results):
+            future.set_result(result)
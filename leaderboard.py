@@ -0,0 +1,107 @@
+import bisect
+import threading
+import time
+
+
+def rank_key(quote_id: int, rating: int, created) -> tuple:
+    """Sort key: higher rating first, then newer, then higher id."""
+    return (-rating, -created.timestamp() if created is not None else 0, -quote_id)
+
+
+class Board:
+    """Exact top rows of one ranking, kept as a sorted list of rank keys.
+
+    The board always holds the first ``len(keys)`` rows of the ranking.
+    ``complete`` means it holds every row, so any new row can be placed;
+    otherwise a row that ranks after the last held one is simply dropped.
+    """
+
+    def __init__(self, rows, capacity: int):
+        self.capacity = capacity
+        self.keys = sorted(rank_key(quote_id, rating, created) for quote_id, _, rating, created in rows)
+        self.by_id = {-key[2]: key for key in self.keys}
+        self.authors = {quote_id: author_id for quote_id, author_id, _, _ in rows}
+        self.complete = len(self.keys) < capacity
+        self.loaded = time.monotonic()
+
+    def discard(self, quote_id: int):
+        key = self.by_id.pop(quote_id, None)
+        if key is not None:
+            del self.keys[bisect.bisect_left(self.keys, key)]
+            self.authors.pop(quote_id, None)
+
+    def put(self, quote_id: int, author_id: int, rating: int, created):
+        self.discard(quote_id)
+        key = rank_key(quote_id, rating, created)
+        if not self.complete and (not self.keys or key > self.keys[-1]):
+            return  # между последней строкой доски и этой могут быть строки, которых мы не знаем
+        bisect.insort(self.keys, key)
+        self.by_id[quote_id] = key
+        self.authors[quote_id] = author_id
+        if len(self.keys) > self.capacity:
+            dropped = self.keys.pop()
+            self.by_id.pop(-dropped[2], None)
+            self.authors.pop(-dropped[2], None)
+            self.complete = False
+
+
+class Leaderboard:
+    """In-memory top-K of quotes by rating and recency, overall and per author.
+
+    Boards are loaded on first read with ``load(author_id, limit)`` - an
+    index-ordered query returning ``(id, author_id, rating, created)`` rows -
+    and then kept up to date by ``update``/``remove`` calls from the write
+    paths, so reads never sort the table. Each board holds ``size * 2`` rows;
+    when changes push it below ``size`` rows (or after ``ttl`` seconds, to pick
+    up writes from other processes) it is reloaded from the index.
+    """
+
+    def __init__(self, load, size: int = 100, ttl: float = 300, max_authors: int = 1000):
+        self._load = load
+        self.size = size
+        self.ttl = ttl
+        self.max_authors = max_authors
+        self._boards: dict = {}
+        self._lock = threading.Lock()
+
+    def top(self, limit: int, author_id: int | None = None) -> list[int]:
+        """Ids of the best ``limit`` quotes (``limit`` is capped at ``size``)."""
+        with self._lock:
+            board = self._boards.get(author_id)
+            if board is None or self._is_stale(board):
+                if author_id is not None and len(self._boards) > self.max_authors:
+                    self._boards = {None: self._boards[None]} if None in self._boards else {}
+                board = self._boards[author_id] = Board(self._load(author_id, self.size * 2), self.size * 2)
+            return [-key[2] for key in board.keys[:min(limit, self.size)]]
+
+    def update(self, quote_id: int, author_id: int, rating: int, created):
+        """A quote was created or its rating changed."""
+        with self._lock:
+            for board in self._affected(author_id):
+                board.put(quote_id, author_id, rating, created)
+
+    def remove(self, quote_id: int, author_id: int):
+        with self._lock:
+            for board in self._affected(author_id):
+                board.discard(quote_id)
+
+    def remove_author(self, author_id: int):
+        """All quotes of an author were deleted."""
+        with self._lock:
+            self._boards.pop(author_id, None)
+            board = self._boards.get(None)
+            if board is not None:
+                for quote_id in [q for q, a in board.authors.items() if a == author_id]:
+                    board.discard(quote_id)
+
+    def reset(self):
+        with self._lock:
+            self._boards.clear()
+
+    def _affected(self, author_id):
+        return [board for key, board in self._boards.items() if key is None or key == author_id]
+
+    def _is_stale(self, board: Board) -> bool:
+        if time.monotonic() - board.loaded > self.ttl:
+            return True
+        return not board.complete and len(board.keys) < self.size
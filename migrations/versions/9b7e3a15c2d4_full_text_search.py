@@ -0,0 +1,76 @@
+"""full text search
+
+Revision ID: 9b7e3a15c2d4
+Revises: 4f2d8c1e7a90
+Create Date: 2026-10-18 12:40:07.552781
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b7e3a15c2d4'
+down_revision = '4f2d8c1e7a90'
+branch_labels = None
+depends_on = None
+
+
+# Выражения GIN индексов на PostgreSQL; search.py строит такие же, иначе индекс не используется
+QUOTE_DOCUMENT = "to_tsvector('simple', text)"
+AUTHOR_DOCUMENT = "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(surname, ''))"
+
+
+# FTS5 индексы с внешним содержимым (content=...): текст хранится только в
+# quote_model/author_model, а триггеры поддерживают индекс в актуальном виде.
+# Внимание: batch_alter_table, пересоздающий эти таблицы, удалит триггеры.
+# На PostgreSQL вместо них - GIN индексы по tsvector, которые обновляет сама БД.
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(f"CREATE INDEX ix_quote_model_fts ON quote_model USING gin ({QUOTE_DOCUMENT})")
+        op.execute(f"CREATE INDEX ix_author_model_fts ON author_model USING gin ({AUTHOR_DOCUMENT})")
+        return
+
+    op.execute("CREATE VIRTUAL TABLE quote_fts USING fts5(text, content='quote_model', content_rowid='id')")
+    op.execute("""
+        CREATE TRIGGER quote_fts_ai AFTER INSERT ON quote_model BEGIN
+            INSERT INTO quote_fts(rowid, text) VALUES (new.id, new.text);
+        END""")
+    op.execute("""
+        CREATE TRIGGER quote_fts_ad AFTER DELETE ON quote_model BEGIN
+            INSERT INTO quote_fts(quote_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        END""")
+    op.execute("""
+        CREATE TRIGGER quote_fts_au AFTER UPDATE OF text ON quote_model BEGIN
+            INSERT INTO quote_fts(quote_fts, rowid, text) VALUES ('delete', old.id, old.text);
+            INSERT INTO quote_fts(rowid, text) VALUES (new.id, new.text);
+        END""")
+    op.execute("INSERT INTO quote_fts(quote_fts) VALUES ('rebuild')")
+
+    op.execute("CREATE VIRTUAL TABLE author_fts USING fts5(name, surname, content='author_model', content_rowid='id')")
+    op.execute("""
+        CREATE TRIGGER author_fts_ai AFTER INSERT ON author_model BEGIN
+            INSERT INTO author_fts(rowid, name, surname) VALUES (new.id, new.name, new.surname);
+        END""")
+    op.execute("""
+        CREATE TRIGGER author_fts_ad AFTER DELETE ON author_model BEGIN
+            INSERT INTO author_fts(author_fts, rowid, name, surname) VALUES ('delete', old.id, old.name, old.surname);
+        END""")
+    op.execute("""
+        CREATE TRIGGER author_fts_au AFTER UPDATE OF name, surname ON author_model BEGIN
+            INSERT INTO author_fts(author_fts, rowid, name, surname) VALUES ('delete', old.id, old.name, old.surname);
+            INSERT INTO author_fts(rowid, name, surname) VALUES (new.id, new.name, new.surname);
+        END""")
+    op.execute("INSERT INTO author_fts(author_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_author_model_fts")
+        op.execute("DROP INDEX IF EXISTS ix_quote_model_fts")
+        return
+
+    for trigger in ('author_fts_au', 'author_fts_ad', 'author_fts_ai', 'quote_fts_au', 'quote_fts_ad', 'quote_fts_ai'):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS author_fts")
+    op.execute("DROP TABLE IF EXISTS quote_fts")
@@ -19,7 +19,7 @@ depends_on = None
 def upgrade():
     # ### commands auto generated by Alembic - please adjust! ###
     with op.batch_alter_table('author_model', schema=None) as batch_op:
-        batch_op.add_column(sa.Column('is_deleted', sa.Boolean(), server_default=sa.text('0'), nullable=True))
+        batch_op.add_column(sa.Column('is_deleted', sa.Boolean(), server_default=sa.false(), nullable=True))  # '0' на SQLite, false на PostgreSQL
 
     # ### end Alembic commands ###
 
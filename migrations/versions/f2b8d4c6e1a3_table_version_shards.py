@@ -0,0 +1,88 @@
+"""table version shards
+
+Revision ID: f2b8d4c6e1a3
+Revises: b4e7d2a9c1f6
+Create Date: 2026-10-18 21:14:52.306118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b8d4c6e1a3'
+down_revision = 'b4e7d2a9c1f6'
+branch_labels = None
+depends_on = None
+
+TABLES = ('quote_model', 'author_model')
+EVENTS = (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD'))
+# PostgreSQL: на сколько строк делится счетчик каждой таблицы
+SHARDS = 16
+
+# Строчные триггеры из 7a4c2e91d0b8/e18b5f3c9a27 обновляли одну строку table_version на каждую
+# измененную строку таблицы. В PostgreSQL блокировка этой строки держится до commit, так что все
+# пишущие транзакции шли по одной. Теперь триггер срабатывает раз на оператор и увеличивает строку
+# своего shard (по pid соединения): разные соединения пишут в разные строки, а версия таблицы -
+# сумма по всем shard. В SQLite писатель и так один, там остается одна строка (shard 0).
+PG_STATEMENT_FUNCTION = f"""
+    CREATE FUNCTION table_version_bump_statement() RETURNS trigger AS $$
+    DECLARE
+        changed_rows integer;
+    BEGIN
+        SELECT count(*) INTO changed_rows FROM changed;
+        IF changed_rows = 0 THEN
+            RETURN NULL;
+        END IF;
+        UPDATE table_version SET version = version + 1,
+                                 row_count = row_count + CASE TG_OP WHEN 'INSERT' THEN changed_rows
+                                                                    WHEN 'DELETE' THEN -changed_rows ELSE 0 END,
+                                 modified = CURRENT_TIMESTAMP
+        WHERE name = TG_TABLE_NAME AND shard = pg_backend_pid() % {SHARDS};
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql"""
+
+# author_stats (e18b5f3c9a27) остается строчным: строка на автора, так что ждут друг друга
+# только транзакции, меняющие цитаты одного автора, а не все пишущие.
+
+
+def upgrade():
+    op.add_column('table_version', sa.Column('shard', sa.Integer(), server_default='0', nullable=False))
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("ALTER TABLE table_version DROP CONSTRAINT table_version_pkey")
+    op.execute("ALTER TABLE table_version ADD PRIMARY KEY (name, shard)")
+    for table in TABLES:
+        op.execute(f"""
+            INSERT INTO table_version (name, shard, version, row_count)
+            SELECT '{table}', shard, 0, 0 FROM generate_series(1, {SHARDS - 1}) AS shard""")
+    op.execute(PG_STATEMENT_FUNCTION)
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER {table}_version ON {table}")
+        # у триггера с таблицей переходов может быть только одно событие
+        for event, transition in EVENTS:
+            op.execute(f"""
+                CREATE TRIGGER {table}_version_{event.lower()} AFTER {event} ON {table}
+                REFERENCING {transition} TABLE AS changed
+                FOR EACH STATEMENT EXECUTE FUNCTION table_version_bump_statement()""")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for table in TABLES:
+            for event, _ in EVENTS:
+                op.execute(f"DROP TRIGGER {table}_version_{event.lower()} ON {table}")
+            op.execute(f"""
+                CREATE TRIGGER {table}_version AFTER INSERT OR UPDATE OR DELETE ON {table}
+                FOR EACH ROW EXECUTE FUNCTION table_version_bump()""")
+        op.execute("DROP FUNCTION table_version_bump_statement()")
+        op.execute("""
+            UPDATE table_version SET version = totals.version, row_count = totals.row_count, modified = totals.modified
+            FROM (SELECT name, sum(version) AS version, sum(row_count) AS row_count, max(modified) AS modified
+                  FROM table_version GROUP BY name) AS totals
+            WHERE table_version.name = totals.name AND table_version.shard = 0""")
+        op.execute("DELETE FROM table_version WHERE shard <> 0")
+        op.execute("ALTER TABLE table_version DROP CONSTRAINT table_version_pkey")
+        op.execute("ALTER TABLE table_version ADD PRIMARY KEY (name)")
+    # SQLite 3.35+: без пересоздания таблицы, на которую ссылаются триггеры
+    op.execute("ALTER TABLE table_version DROP COLUMN shard")
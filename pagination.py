@@ -0,0 +1,107 @@
+import base64
+import binascii
+import json
+from urllib.parse import urlencode
+
+from flask import abort, request, current_app
+from sqlalchemy import and_, or_, String, DateTime, type_coerce
+
+
+# Keyset (cursor) пагинация: вместо OFFSET запоминаем ключ последней строки
+# и следующей страницей ищем строки "после" него - это поиск по индексу,
+# поэтому глубокие страницы стоят столько же, сколько первая.
+
+
+def encode_cursor(sort: str, values: list) -> str:
+    raw = json.dumps({"s": sort, "k": values}, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> list:
+    """Decode an opaque cursor, aborting with 400 if it is broken or belongs to another sort order."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        values = data["k"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        abort(400, "Invalid cursor")
+    if data.get("s") != sort or not isinstance(values, list):
+        abort(400, "Cursor does not match the requested sort order")
+    return values
+
+
+def sort_expression(column):
+    # SQLite хранит DateTime строкой, а ORM отдает datetime; сравниваем "сырые"
+    # строки, иначе '2023-08-06 18:19:05' != '2023-08-06 18:19:05.000000'
+    if isinstance(column.type, DateTime):
+        return type_coerce(column, String)
+    return column
+
+
+def seek_condition(keys: list[tuple], values: list):
+    """(k1 > v1) OR (k1 = v1 AND k2 > v2) OR ... with per-key direction."""
+    conditions = []
+    for i, (column, descending) in enumerate(keys):
+        expr = sort_expression(column)
+        step = expr < values[i] if descending else expr > values[i]
+        equal = [sort_expression(c) == v for (c, _), v in zip(keys[:i], values[:i])]
+        conditions.append(and_(*equal, step))
+    # избыточное условие на первый ключ, чтобы планировщик взял диапазон по индексу
+    first = sort_expression(keys[0][0])
+    bound = first <= values[0] if keys[0][1] else first >= values[0]
+    return and_(bound, or_(*conditions))
+
+
+def get_page_args(args=None, config=None) -> tuple[int, str | None]:
+    """``limit`` and ``after`` from ``args`` (the request args by default)."""
+    args = request.args if args is None else args
+    config = current_app.config if config is None else config
+    limit = args.get("limit", config["PAGE_LIMIT_DEFAULT"], type=int)
+    if limit <= 0:
+        abort(400, "limit must be a positive number")
+    limit = min(limit, config["PAGE_LIMIT_MAX"])
+    return limit, args.get("after")
+
+
+def keyset_query(query, sort: str, keys: list[tuple], page: tuple[int, str | None] | None = None):
+    """Add the seek condition, ORDER BY and LIMIT of the requested page to ``query``.
+
+    keys - list of (column, descending); the last key must be unique (usually id).
+    Page size and position come from ``page`` - ``(limit, after)`` - or from
+    the ``limit``/``after`` request args. Works on ORM queries and on select().
+    Returns the page query (rows are ``(obj, *key values)``) and the page size.
+    """
+    limit, after = get_page_args() if page is None else page
+    if after is not None:
+        values = decode_cursor(after, sort)
+        if len(values) != len(keys):
+            abort(400, "Cursor does not match the requested sort order")
+        query = query.filter(seek_condition(keys, values))
+    order_by = [sort_expression(c).desc() if d else sort_expression(c) for c, d in keys]
+    return query.add_columns(*(sort_expression(c) for c, _ in keys)).order_by(*order_by).limit(limit + 1), limit
+
+
+def keyset_page(query, sort: str, keys: list[tuple]) -> tuple[list, str | None]:
+    """Return one page of ``query`` ordered by ``keys`` and the cursor of the next page."""
+    page_query, limit = keyset_query(query, sort, keys)
+    return split_page(page_query.all(), limit, sort)
+
+
+def split_page(rows: list, limit: int, sort: str) -> tuple[list, str | None]:
+    """Objects of a page fetched with ``keyset_query`` and the cursor of the next page."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort, list(rows[-1][1:]))
+    return [row[0] for row in rows], next_cursor
+
+
+def page_headers(next_cursor: str | None, path: str | None = None, args=None) -> dict:
+    if next_cursor is None:
+        return {}
+    args = (request.args if args is None else args).to_dict()
+    args["after"] = next_cursor
+    return {
+        "X-Next-Cursor": next_cursor,
+        "Link": f'<{request.path if path is None else path}?{urlencode(args)}>; rel="next"',
+    }
@@ -0,0 +1,221 @@
+import logging
+import threading
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Границы гистограммы времени ответа, секунды
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Как спросить план запроса у каждой СУБД
+EXPLAIN_PREFIX = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "postgresql": "EXPLAIN ",
+}
+
+
+class RequestProfile:
+    """What the database and the JSON encoder did during one request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.statements = 0
+        self.db_time = 0.0
+        self.rows = 0
+        self.serialization_time = 0.0
+        self.slow_queries = 0
+        self.by_statement = Counter()  # SQL -> сколько раз выполнен за запрос
+
+
+class CountingCursor:
+    """DBAPI cursor wrapper that adds the rows it returns to ``profile.rows``."""
+
+    def __init__(self, cursor, profile: RequestProfile):
+        self._cursor = cursor
+        self._profile = profile
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._profile.rows += 1
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._cursor.fetchmany(*args)
+        self._profile.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._profile.rows += len(rows)
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class RouteMetrics:
+    """Running totals of one route, exported by ``SQLProfiler.metrics``."""
+
+    def __init__(self):
+        self.requests = 0
+        self.duration = 0.0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.statements = 0
+        self.db_time = 0.0
+        self.rows = 0
+        self.serialization_time = 0.0
+        self.slow_queries = 0
+        self.n_plus_one = 0
+
+
+class SQLProfiler:
+    """Opt-in per-request SQL profiling for a Flask-SQLAlchemy app.
+
+    Counts statements, time spent in the database, rows fetched and JSON
+    encoding time of every request through the engines' cursor events and
+    the app's JSON provider. Each response gets a ``Server-Timing`` header;
+    totals per route are kept for ``metrics()`` in the Prometheus text format.
+
+    A statement run more than ``n_plus_one`` times in one request is logged
+    as a likely N+1; a statement slower than ``slow_query_ms`` is logged with
+    its query plan. Work outside requests is not profiled.
+    """
+
+    def __init__(self, app, db, n_plus_one: int = 10, slow_query_ms: float = 100):
+        self.n_plus_one = n_plus_one
+        self.slow_query = slow_query_ms / 1000
+        self.routes: dict[tuple, RouteMetrics] = {}
+        self._lock = threading.Lock()
+        for engine in db.engines.values():
+            event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        dumpb = app.json.dumpb
+
+        def timed_dumpb(obj, **kwargs):
+            start = time.perf_counter()
+            try:
+                return dumpb(obj, **kwargs)
+            finally:
+                profile = current_profile()
+                if profile is not None:
+                    profile.serialization_time += time.perf_counter() - start
+        app.json.dumpb = timed_dumpb
+
+    def _before_request(self):
+        g._profile = RequestProfile()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if current_profile() is not None:
+            conn.info.setdefault("profile_start", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        profile = current_profile()
+        if profile is None or not conn.info.get("profile_start"):
+            return
+        elapsed = time.perf_counter() - conn.info["profile_start"].pop()
+        profile.statements += 1
+        profile.db_time += elapsed
+        profile.by_statement[statement] += 1
+        if context is not None and cursor.description is not None:
+            context.cursor = CountingCursor(cursor, profile)  # строки читаются уже после этого события
+        if elapsed >= self.slow_query:
+            profile.slow_queries += 1
+            logger.warning(
+                "Slow query (%.1f ms) in %s %s: %s\nparameters: %r\nplan:\n%s",
+                elapsed * 1000, request.method, request.path, statement, parameters,
+                self._explain(conn, cursor, statement, parameters, executemany),
+            )
+
+    @staticmethod
+    def _explain(conn, cursor, statement, parameters, executemany) -> str:
+        prefix = EXPLAIN_PREFIX.get(conn.dialect.name)
+        if prefix is None or executemany:
+            return "(not available)"
+        # свой курсор того же DBAPI-соединения: без событий SQLAlchemy и в той же транзакции
+        explain = cursor.connection.cursor()
+        try:
+            explain.execute(prefix + statement, parameters)
+            return "\n".join(str(row[-1]) for row in explain.fetchall())  # у SQLite текст плана в последней колонке
+        except Exception as error:
+            return f"(failed: {error})"
+        finally:
+            explain.close()
+
+    def _after_request(self, response):
+        profile = g.pop("_profile", None)
+        if profile is None:
+            return response
+        duration = time.perf_counter() - profile.start
+        route = (request.method, request.url_rule.rule if request.url_rule else "<unmatched>")
+        repeated = {sql: count for sql, count in profile.by_statement.items() if count > self.n_plus_one}
+        for sql, count in repeated.items():
+            logger.warning("Possible N+1 in %s %s: %d x %s", request.method, request.path, count, sql)
+        with self._lock:
+            metrics = self.routes.setdefault(route, RouteMetrics())
+            metrics.requests += 1
+            metrics.duration += duration
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    metrics.buckets[index] += 1
+            metrics.statements += profile.statements
+            metrics.db_time += profile.db_time
+            metrics.rows += profile.rows
+            metrics.serialization_time += profile.serialization_time
+            metrics.slow_queries += profile.slow_queries
+            metrics.n_plus_one += len(repeated)
+        # строки NDJSON-ответа читаются после after_request и в заголовок не попадают
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={profile.db_time * 1000:.2f};desc="{profile.statements} queries, {profile.rows} rows"',
+        )
+        response.headers.add("Server-Timing", f"serialize;dur={profile.serialization_time * 1000:.2f}")
+        response.headers.add("Server-Timing", f"total;dur={duration * 1000:.2f}")
+        return response
+
+    def metrics(self) -> str:
+        """Per-route totals in the Prometheus text exposition format."""
+        with self._lock:
+            routes = [(method, rule, vars(metrics).copy()) for (method, rule), metrics in sorted(self.routes.items())]
+        lines = []
+        counters = [
+            ("http_request_duration_seconds", None, "histogram", "Request duration."),
+            ("sql_statements_total", "statements", "counter", "SQL statements executed."),
+            ("sql_duration_seconds_total", "db_time", "counter", "Time spent executing SQL."),
+            ("sql_rows_fetched_total", "rows", "counter", "Rows fetched from the database."),
+            ("serialization_seconds_total", "serialization_time", "counter", "Time spent encoding JSON."),
+            ("sql_slow_queries_total", "slow_queries", "counter", "Statements slower than the slow query threshold."),
+            ("sql_n_plus_one_total", "n_plus_one", "counter", "Statements repeated too often within one request."),
+        ]
+        for name, field, kind, help_text in counters:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for method, rule, metrics in routes:
+                labels = f'method="{method}",route="{escape_label(rule)}"'
+                if field is not None:
+                    lines.append(f"{name}{{{labels}}} {metrics[field]}")
+                    continue
+                for bound, count in zip(DURATION_BUCKETS, metrics["buckets"]):
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {metrics["requests"]}')
+                lines.append(f"{name}_sum{{{labels}}} {metrics['duration']}")
+                lines.append(f"{name}_count{{{labels}}} {metrics['requests']}")
+        return "\n".join(lines) + "\n"
+
+
+def current_profile() -> RequestProfile | None:
+    return g.get("_profile") if has_request_context() else None
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
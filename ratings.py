@@ -0,0 +1,136 @@
+import logging
+import threading
+
+from sqlalchemy import case
+
+
+logger = logging.getLogger(__name__)
+
+
+RATING_MIN = 1
+RATING_MAX = 5
+
+# Изменение рейтинга храним как функцию x -> clamp(x + delta, low, high).
+# Композиция двух таких функций - снова такая же функция, поэтому любую
+# последовательность голосов за цитату можно свернуть в одну тройку
+# (delta, low, high) и применить одним UPDATE, не теряя ограничения 1..5,
+# которое обработчики применяют к каждому голосу отдельно.
+IDENTITY = (0, RATING_MIN, RATING_MAX)
+
+
+def clamp(value, low, high):
+    return min(max(value, low), high)
+
+
+def compose(first: tuple, second: tuple) -> tuple:
+    """Step equal to applying ``first`` and then ``second``."""
+    delta, low, high = first
+    second_delta, second_low, second_high = second
+    return (
+        delta + second_delta,
+        clamp(low + second_delta, second_low, second_high),
+        clamp(high + second_delta, second_low, second_high),
+    )
+
+
+def vote_step(delta: int) -> tuple:
+    """Step for ``delta`` single votes, each one clamped to RATING_MIN..RATING_MAX."""
+    unit = (1 if delta > 0 else -1, RATING_MIN, RATING_MAX)
+    step = IDENTITY
+    # после RATING_MAX - RATING_MIN + 1 голосов рейтинг уже упирается в границу
+    for _ in range(min(abs(delta), RATING_MAX - RATING_MIN + 1)):
+        step = compose(step, unit)
+    return step
+
+
+def apply_step(rating: int, step: tuple) -> int:
+    delta, low, high = step
+    return clamp(rating + delta, low, high)
+
+
+def step_expression(column, step: tuple):
+    """SQL expression computing ``apply_step(column, step)`` inside the database."""
+    delta, low, high = step
+    shifted = column + delta
+    return case((shifted < low, low), (shifted > high, high), else_=shifted)
+
+
+class VoteBuffer:
+    """In-process buffer that coalesces rating votes into batched UPDATEs.
+
+    Votes are folded per quote id into one step (see ``compose``) and handed
+    to ``flush`` - a callable taking ``{quote_id: step}`` - every
+    ``interval_ms`` milliseconds or as soon as ``max_votes`` votes are waiting.
+    The background thread starts with the first vote; ``close`` stops it and
+    writes whatever is still buffered.
+    """
+
+    def __init__(self, flush, interval_ms: int = 50, max_votes: int = 500):
+        self._flush = flush
+        self.interval = interval_ms / 1000
+        self.max_votes = max_votes
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._steps: dict[int, tuple] = {}
+        self._pending = 0
+        self._thread = None
+        self._closed = False
+        self.buffered_votes = 0
+        self.flushed_votes = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    def add(self, quote_id: int, delta: int):
+        with self._lock:
+            self._steps[quote_id] = compose(self._steps.get(quote_id, IDENTITY), vote_step(delta))
+            self._pending += 1
+            self.buffered_votes += 1
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="vote-buffer", daemon=True)
+                self._thread.start()
+            if self._pending >= self.max_votes:
+                self._wakeup.set()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                steps, pending = self._steps, self._pending
+                self._steps, self._pending = {}, 0
+            if not steps:
+                return
+            try:
+                self._flush(steps)
+            except Exception:
+                logger.exception("Failed to flush %s buffered votes", pending)
+                self.failed_flushes += 1
+                # возвращаем голоса в буфер перед теми, что пришли за время записи
+                with self._lock:
+                    for quote_id, step in steps.items():
+                        self._steps[quote_id] = compose(step, self._steps.get(quote_id, IDENTITY))
+                    self._pending += pending
+                return
+            self.flushed_votes += pending
+            self.flushes += 1
+
+    def close(self):
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "buffered_votes": self.buffered_votes,
+            "flushed_votes": self.flushed_votes,
+            "pending_votes": self._pending,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+        }
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
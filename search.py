@@ -0,0 +1,56 @@
+import re
+
+from sqlalchemy import Float, cast, column, func, literal_column, table
+
+
+class FullTextIndex:
+    """Full-text index of ``columns`` from the full_text_search migration.
+
+    On SQLite it is an FTS5 virtual table ``name`` whose rowid is the row id;
+    on PostgreSQL it is a GIN index on ``document()``, which must stay the same
+    expression as in the migration, otherwise the planner does not use it.
+    """
+
+    def __init__(self, name: str, *columns: str):
+        self.table = table(name, column("rowid"), column("rank"))
+        self.columns = columns
+
+    def document(self, model):
+        columns = [getattr(model, name) for name in self.columns]
+        if len(columns) > 1:
+            columns = [func.coalesce(value, "") for value in columns]
+            text = columns[0]
+            for value in columns[1:]:
+                text = text.op("||")(" ").op("||")(value)
+        else:
+            text = columns[0]
+        return func.to_tsvector(literal_column("'simple'"), text)
+
+
+quote_fts = FullTextIndex("quote_fts", "text")
+author_fts = FullTextIndex("author_fts", "name", "surname")
+
+
+def fts_query(q: str | None, dialect: str = "sqlite") -> str | None:
+    """Turn user input into a safe FTS5 (or tsquery) query: every word must match as a prefix."""
+    words = re.findall(r"\w+", q or "")
+    if not words:
+        return None
+    if dialect == "postgresql":
+        return " & ".join(f"{word}:*" for word in words)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search(query, fts, model, q: str, dialect: str = "sqlite") -> tuple:
+    """Restrict an ORM ``query`` on ``model`` to rows whose full-text index matches ``q``.
+
+    Returns the query and the relevance rank to sort by, ascending (best first).
+    """
+    if dialect == "postgresql":
+        document = fts.document(model)
+        ts_query = func.to_tsquery(literal_column("'simple'"), q)
+        # double precision, чтобы значение из курсора сравнивалось с рангом без потерь
+        return query.filter(document.op("@@")(ts_query)), (-cast(func.ts_rank(document, ts_query), Float)).label("rank")
+    fts_table = fts.table
+    query = query.join(fts_table, fts_table.c.rowid == model.id).filter(literal_column(fts_table.name).op("MATCH")(q))
+    return query, fts_table.c.rank
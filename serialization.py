@@ -0,0 +1,102 @@
+import dataclasses
+import datetime
+import decimal
+import json
+import uuid
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.orm import Bundle
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен, без него работает запасной вариант на stdlib json
+    orjson = None
+
+
+def _default(obj):
+    """Types stdlib json does not know, encoded the same way orjson encodes them."""
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that encodes with orjson when it is installed.
+
+    Datetimes are written as ISO 8601 by both orjson and the stdlib fallback,
+    so the output does not depend on which one is used. JSON_AS_ASCII from the
+    app config decides ``ensure_ascii`` (Flask 2.3 no longer reads it itself);
+    orjson always writes UTF-8, so ASCII-only output goes through the fallback.
+    """
+
+    sort_keys = False  # ключи идут в порядке to_dict, сортировка только тратит время
+
+    @property
+    def ensure_ascii(self) -> bool:
+        # читаем при каждом вызове: провайдер создается раньше, чем заполняется config
+        return self._app.config.get("JSON_AS_ASCII", True)
+
+    def _orjson_options(self, indent=None) -> int | None:
+        if orjson is None or self.ensure_ascii:
+            return None
+        option = orjson.OPT_NON_STR_KEYS  # {id: rating} с ключами int, как у json.dumps
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs) -> str:
+        return self.dumpb(obj, **kwargs).decode()
+
+    def dumpb(self, obj, **kwargs) -> bytes:
+        """Serialize ``obj`` to UTF-8 bytes, skipping the str round trip of ``dumps``."""
+        option = self._orjson_options(kwargs.get("indent"))
+        if option is not None and kwargs.keys() <= {"indent", "separators"}:
+            return orjson.dumps(obj, default=_default, option=option)
+        kwargs.setdefault("default", _default)
+        kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+        kwargs.setdefault("sort_keys", self.sort_keys)
+        kwargs.setdefault("separators", (",", ": ") if kwargs.get("indent") else (",", ":"))
+        return json.dumps(obj, **kwargs).encode()
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = 2 if (self.compact is None and self._app.debug) or self.compact is False else None
+        return self._app.response_class(self.dumpb(obj, indent=indent) + b"\n", mimetype=self.mimetype)
+
+
+class Projection(Bundle):
+    """Bundle of columns that is loaded straight into a dict.
+
+    ``db.session.query(Projection("quote", QuoteModel.id, ...))`` returns rows
+    whose first element is ``{"id": ..., ...}`` built from the result tuple,
+    without ORM objects, identity map or ``to_dict``. Nested projections give
+    nested dicts keyed by their name.
+    """
+
+    def create_row_processor(self, query, procs, labels):
+        # ключи берем у самой проекции: select() переименовывает одноименные
+        # колонки разных таблиц в labels (id, id_1), а Query - нет
+        keys = list(self.c.keys())
+
+        def proc(row):
+            return dict(zip(keys, [process(row) for process in procs]))
+        return proc
+
+
+def iter_projected(rows):
+    """Dicts of a query whose only column is a Projection (for ``ndjson_response``)."""
+    for row in rows:
+        yield row[0]
@@ -0,0 +1,60 @@
+import sqlite3
+
+
+class Queries:
+    """Named, parameterised SQL statements run on the current connection.
+
+    Every statement has one fixed text and gets its values only through
+    ``:name`` parameters, so user input never becomes SQL and sqlite3's
+    per-connection statement cache (see ``cached_statements`` of the pool)
+    parses each statement once per connection instead of once per call.
+    ``get_connection`` returns the connection to run on (e.g. ``get_db``).
+    """
+
+    def __init__(self, get_connection, queries: dict[str, str]):
+        self._get_connection = get_connection
+        self.queries = queries
+
+    def _sql(self, name: str) -> str:
+        try:
+            return self.queries[name]
+        except KeyError:
+            raise KeyError(f"Unknown query '{name}'") from None
+
+    def fetch_one(self, name: str, **params) -> tuple | None:
+        cursor = self._get_connection().execute(self._sql(name), params)
+        try:
+            return cursor.fetchone()
+        finally:
+            cursor.close()
+
+    def fetch_all(self, name: str, **params) -> list[tuple]:
+        cursor = self._get_connection().execute(self._sql(name), params)
+        try:
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def execute(self, name: str, **params) -> sqlite3.Cursor:
+        """Run a write statement and commit; the cursor gives ``rowcount``/``lastrowid``."""
+        connection = self._get_connection()
+        with connection:  # commit, а при исключении rollback
+            return connection.execute(self._sql(name), params)
+
+    def execute_many(self, name: str, rows: list[dict]) -> int:
+        """Run one statement for every row of parameters in a single transaction; returns the rowcount."""
+        connection = self._get_connection()
+        with connection:
+            return connection.executemany(self._sql(name), rows).rowcount
+
+    def insert_many(self, name: str, rows: list[dict]) -> list[int]:
+        """Run an INSERT for every row in a single transaction; returns the ids of the new rows in order.
+
+        Each row goes through ``RETURNING id`` (SQLite 3.35+), so the ids do
+        not depend on how SQLite assigns rowids; executemany would discard
+        the returned rows.
+        """
+        sql = self._sql(name) + " RETURNING id"
+        connection = self._get_connection()
+        with connection:
+            return [connection.execute(sql, row).fetchone()[0] for row in rows]
@@ -0,0 +1,154 @@
+import sqlite3
+import threading
+import time
+
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql import Select
+
+
+READ_BIND = "read"
+
+# Профили PRAGMA, которые ставятся каждому новому соединению.
+# "production": WAL - читатели не мешают писателю; synchronous=NORMAL в WAL не
+# портит БД при сбое, теряются только последние транзакции при падении ОС;
+# busy_timeout - писатель ждет блокировку, а не падает с "database is locked".
+SQLITE_PROFILES = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -32000,  # KiB
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+}
+
+
+def is_sqlite_file(url) -> bool:
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def read_only_bind(url, pool_size: int) -> dict | None:
+    """Bind options for a read-only engine on the same SQLite file, or None if ``url`` is not one."""
+    if not is_sqlite_file(url):
+        return None
+    url = make_url(url)
+    path = url.database[5:] if url.query.get("uri") else url.database
+    return {
+        "url": url.set(database=f"file:{path}", query={"mode": "ro", "uri": "true"}),
+        "pool_size": pool_size,
+    }
+
+
+# Асинхронные драйверы для create_async_engine (appasync.py)
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+}
+
+
+def async_url(url):
+    """``url`` with the asyncio driver of its backend, e.g. sqlite:// -> sqlite+aiosqlite://."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def replica_bind(url, pool_size: int) -> dict:
+    """Bind options for the read replica at ``url``; a SQLite file is opened read-only."""
+    return read_only_bind(url, pool_size) or {"url": url, "pool_size": pool_size}
+
+
+def replicate(primary: str, replica: str, interval: float, stop: threading.Event | None = None):
+    """Copy the SQLite file ``primary`` into ``replica`` every ``interval`` seconds until ``stop`` is set.
+
+    Stands in for server replication when the primary and the replica are two
+    local files: the replica lags behind the primary by up to ``interval``.
+    """
+    stop = stop or threading.Event()
+    source = sqlite3.connect(primary)
+    target = sqlite3.connect(replica)
+    try:
+        while True:
+            source.backup(target)  # согласованный снимок; ждет, пока читатели реплики отпустят блокировку
+            if stop.wait(interval):
+                return
+    finally:
+        target.close()
+        source.close()
+
+
+def set_pragmas(engine, pragmas: dict, read_only: bool = False):
+    """Run ``PRAGMA name=value`` for ``pragmas`` on every new connection of ``engine``."""
+    if read_only:
+        # journal_mode хранится в файле БД, read-only соединение его не меняет
+        pragmas = {name: value for name, value in pragmas.items() if name != "journal_mode"}
+        pragmas["query_only"] = "ON"
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def configure_engines(db, profile: str):
+    """Apply the SQLITE_PROFILES[``profile``] pragmas to every SQLite engine of ``db``."""
+    pragmas = SQLITE_PROFILES[profile]
+    for key, engine in db.engines.items():
+        if engine.dialect.name == "sqlite":
+            set_pragmas(engine, pragmas, read_only=key == READ_BIND)
+
+
+class RoutingSession(Session):
+    """Session that sends the SELECTs of GET/HEAD requests to the ``read`` bind.
+
+    Everything else - flushes, INSERT/UPDATE/DELETE, reads that follow a write
+    in the same transaction and all work outside a request - uses the primary
+    engine. Without a ``read`` bind it behaves like the Flask-SQLAlchemy session.
+
+    When the ``read`` bind is a replica (``SQLALCHEMY_REPLICA_URI``) that lags
+    behind, ``REPLICA_LAG_TOLERANCE`` from the app config is how many seconds
+    after a commit with writes in this process reads still go to the primary,
+    so a client sees its own changes right away.
+    """
+
+    last_write = 0.0  # time.monotonic() последнего коммита с записью, общий для всех сессий процесса
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and READ_BIND in self._db.engines:
+            if self._flushing or not isinstance(clause, Select):
+                self.info["wrote"] = True  # до конца транзакции читаем с основной БД, там наши изменения
+            elif self._is_read() and not self.info.get("wrote") and not self._replica_behind():
+                return self._db.engines[READ_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _replica_behind(self) -> bool:
+        config = current_app.config
+        if not config.get("SQLALCHEMY_REPLICA_URI"):
+            return False  # read-only пул того же файла не отстает
+        lag_tolerance = config.get("REPLICA_LAG_TOLERANCE", 0.0)
+        return lag_tolerance > 0 and time.monotonic() - RoutingSession.last_write < lag_tolerance
+
+    def _is_read(self) -> bool:
+        return has_request_context() and request.method in ("GET", "HEAD")
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def remember_write(session):
+    if session.info.get("wrote"):
+        RoutingSession.last_write = time.monotonic()
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def reset_wrote(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("wrote", None)
@@ -0,0 +1,147 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+
+
+# WAL: читатели не блокируют писателя и друг друга; при WAL synchronous=NORMAL
+# не теряет целостность, только последние транзакции при падении ОС.
+# cache_size < 0 - размер в KiB, mmap_size - в байтах.
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,
+    "mmap_size": 128 * 1024 * 1024,
+    "busy_timeout": 5000,
+}
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool's wait time."""
+
+
+class ConnectionPool:
+    """Thread-safe pool of long-lived sqlite3 connections.
+
+    Connections are opened lazily up to ``size``; when all of them are busy,
+    ``acquire`` waits up to ``timeout`` seconds and then raises PoolTimeout.
+    Every connection gets ``pragmas`` once, when it is opened, and keeps its
+    page cache and its cache of prepared statements (``cached_statements``,
+    keyed by SQL text) for its whole life. Free connections are reused
+    last-in first-out, so the warmest one is handed out first.
+    """
+
+    def __init__(self, database, size: int = 5, timeout: float = 5.0, pragmas: dict | None = None,
+                 cached_statements: int = 256, **connect_args):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+        self.cached_statements = cached_statements
+        self.connect_args = connect_args
+        self._idle: list[sqlite3.Connection] = []
+        self._available = threading.Condition()
+        self._waiters = deque()  # очередь ждущих: соединения раздаются строго по порядку
+        self._opened = 0
+        self.acquired = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+
+    def connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.database,
+            check_same_thread=False,  # соединение переходит между потоками, но в каждый момент у одного
+            cached_statements=self.cached_statements,
+            **self.connect_args,
+        )
+        for name, value in self.pragmas.items():
+            connection.execute(f"PRAGMA {name}={value}")
+        return connection
+
+    def acquire(self) -> sqlite3.Connection:
+        with self._available:
+            self.acquired += 1
+            # пока кто-то ждет, новые запросы встают за ним, а не перехватывают освободившееся соединение
+            if self._idle and not self._waiters:
+                return self._idle.pop()
+            if self._opened < self.size:
+                self._opened += 1
+            else:
+                connection = self._wait()
+                if connection is not None:
+                    return connection
+        try:
+            return self.connect()
+        except Exception:
+            with self._available:
+                self._opened -= 1
+                self._available.notify_all()
+            raise
+
+    def _wait(self) -> sqlite3.Connection | None:
+        """Wait for a free connection; None means a slot was freed and the caller may open a new one."""
+        self.waits += 1
+        ticket = object()
+        self._waiters.append(ticket)
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        try:
+            while True:
+                if self._waiters[0] is ticket:
+                    if self._idle:
+                        return self._idle.pop()
+                    if self._opened < self.size:  # сломанное соединение выбросили - можно открыть новое
+                        self._opened += 1
+                        return None
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f"No free connection to {self.database} within {self.timeout}s")
+                self._available.wait(remaining)
+        finally:
+            self._waiters.remove(ticket)
+            self._available.notify_all()  # следующий в очереди мог стать первым
+            self.wait_time += time.perf_counter() - start
+
+    def release(self, connection: sqlite3.Connection):
+        """Return ``connection`` to the pool, rolling back whatever it left uncommitted."""
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except sqlite3.Error:
+            # сломанное соединение не возвращаем, вместо него потом откроется новое
+            self.discard(connection)
+            return
+        with self._available:
+            self._idle.append(connection)
+            self._available.notify_all()
+
+    def discard(self, connection: sqlite3.Connection):
+        with self._available:
+            self._opened -= 1
+            self._available.notify_all()
+        try:
+            connection.close()
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        """Close the free connections (call when no request is running)."""
+        with self._available:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self.discard(connection)
+
+    def stats(self) -> dict:
+        idle = len(self._idle)
+        return {
+            "size": self.size,
+            "opened": self._opened,
+            "idle": idle,
+            "in_use": self._opened - idle,
+            "acquired": self.acquired,
+            "waits": self.waits,
+            "timeouts": self.timeouts,
+            "wait_time_ms": round(self.wait_time * 1000, 3),
+        }
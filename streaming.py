@@ -0,0 +1,55 @@
+from flask import abort, current_app, request, stream_with_context
+
+
+NDJSON = "application/x-ndjson"
+
+
+def wants_ndjson() -> bool:
+    """True if the client asked for NDJSON via ``?format=ndjson`` or the Accept header."""
+    if request.args.get("format") == "ndjson":
+        return True
+    return request.accept_mimetypes.best_match(["application/json", NDJSON]) == NDJSON
+
+
+def ndjson_response(query, serialize):
+    """Stream ``query`` as one JSON document per line.
+
+    Rows are fetched from a server-side cursor in chunks of EXPORT_YIELD_PER,
+    and each line is sent as soon as it is serialized, so memory does not
+    depend on the size of the table. ``serialize`` maps an iterable of rows
+    to an iterable of dicts.
+    """
+    rows = query.yield_per(current_app.config["EXPORT_YIELD_PER"])
+
+    def generate():
+        dumps = current_app.json.dumps
+        for item in serialize(rows):
+            yield dumps(item) + "\n"
+
+    return current_app.response_class(stream_with_context(generate()), mimetype=NDJSON)
+
+
+def iter_request_rows():
+    """Yield ``(index, row, error)`` for every row of a JSON array or NDJSON request body.
+
+    NDJSON bodies are read line by line from the request stream; a line that
+    is not valid JSON is reported through ``error`` instead of failing the
+    whole request.
+    """
+    if request.mimetype == NDJSON:
+        index = 0
+        for line in request.stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield index, current_app.json.loads(line), None
+            except ValueError as error:
+                yield index, None, f"Invalid JSON: {error}"
+            index += 1
+        return
+    rows = request.get_json(silent=True)
+    if not isinstance(rows, list):
+        abort(400, "Expected a JSON array or an application/x-ndjson body")
+    for index, row in enumerate(rows):
+        yield index, row, None
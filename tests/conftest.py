@@ -0,0 +1,77 @@
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+
+import app as quotes_app
+
+
+MIGRATIONS = str(Path(quotes_app.__file__).parent / "migrations")
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Build an isolated app on a fresh SQLite file migrated to head; ``config`` overrides the defaults."""
+    from flask_migrate import Migrate, upgrade
+
+    def make(**config):
+        flask_app = quotes_app.create_app({
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}",
+            "CACHE_TYPE": None,  # каждый запрос идет в БД
+            **config,
+        })
+        Migrate(flask_app, quotes_app.db)
+        with flask_app.app_context():
+            upgrade(directory=MIGRATIONS)
+        return flask_app
+    return make
+
+
+def seed(flask_app, authors: int, quotes_per_author: int):
+    """``authors`` authors with ``quotes_per_author`` quotes each; author ids are 1..authors."""
+    with flask_app.app_context():
+        connection = quotes_app.db.engine.raw_connection()
+        try:
+            connection.executemany(
+                "INSERT INTO author_model (id, name, surname, is_deleted) VALUES (?, ?, ?, 0)",
+                ((i, f"Name{i}", f"Surname{i}") for i in range(1, authors + 1)),
+            )
+            connection.executemany(
+                "INSERT INTO quote_model (author_id, text, rating) VALUES (?, ?, 1)",
+                ((i, f"quote {j}") for i in range(1, authors + 1) for j in range(quotes_per_author)),
+            )
+            connection.commit()
+        finally:
+            connection.close()
+
+
+def read_pages(client, url: str) -> list[int]:
+    """Ids of every page of ``url``, following X-Next-Cursor."""
+    ids, after = [], None
+    while True:
+        response = client.get(url if after is None else f"{url}&after={after}")
+        assert response.status_code == 200
+        ids.extend(item["id"] for item in response.json)
+        after = response.headers.get("X-Next-Cursor")
+        if after is None:
+            return ids
+
+
+@contextmanager
+def count_statements(flask_app):
+    """Count the SQL statements every engine of ``flask_app`` runs inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with flask_app.app_context():
+        engines = list(quotes_app.db.engines.values())
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
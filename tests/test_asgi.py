@@ -0,0 +1,147 @@
+import asyncio
+import importlib
+import json
+import re
+import sqlite3
+import sys
+
+import pytest
+
+import app as quotes_app
+
+from conftest import seed
+
+
+# счетчики WSGI-процесса: в appasync.py их нет (см. комментарий в начале модуля)
+WSGI_ONLY = {
+    ("GET", "/cache/stats"),
+    ("GET", "/commit/stats"),
+    ("GET", "/metrics"),
+    ("GET", "/quotes/ratings/buffer"),
+}
+
+
+@pytest.fixture
+def asgi(make_app, tmp_path, monkeypatch):
+    """appasync imported on a copy of the seeded test database; yields (wsgi_app, appasync, call)."""
+    wsgi_app = make_app()
+    seed(wsgi_app, authors=5, quotes_per_author=3)
+    source, copy = sqlite3.connect(tmp_path / "test.db"), sqlite3.connect(tmp_path / "asgi.db")
+    source.backup(copy)
+    source.close()
+    copy.close()
+    # appasync берет настройки у app.app при импорте
+    monkeypatch.setattr(quotes_app, "app", quotes_app.create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'asgi.db'}",
+    }), raising=False)
+    sys.modules.pop("appasync", None)
+    appasync = importlib.import_module("appasync")
+    loop = asyncio.new_event_loop()
+
+    def call(method, url, body=None, headers=None):
+        path, _, query = url.partition("?")
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+            "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+            "root_path": "", "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80),
+            "headers": [(b"content-type", b"application/json"),
+                        *((key.lower().encode(), value.encode()) for key, value in (headers or {}).items())],
+        }
+        requests = [{"type": "http.request", "body": b"" if body is None else json.dumps(body).encode()}]
+        messages = []
+        sent = asyncio.Event()
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await sent.wait()  # StreamingResponse слушает отключение клиента, пока пишет ответ
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            messages.append(message)
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                sent.set()
+
+        loop.run_until_complete(appasync.app(scope, receive, send))
+        start = messages[0]
+        return start["status"], dict((k.decode(), v.decode()) for k, v in start["headers"]), \
+            b"".join(message.get("body", b"") for message in messages[1:])
+
+    yield wsgi_app, appasync, call
+    loop.run_until_complete(appasync.engine.dispose())
+    loop.close()
+    sys.modules.pop("appasync", None)
+
+
+def route_key(path: str) -> str:
+    # <int:author_id> (Flask) и {author_id:int} (Starlette) -> {author_id}
+    return re.sub(r"<(?:\w+:)?(\w+)>|\{(\w+)(?::\w+)?\}", lambda m: "{" + (m[1] or m[2]) + "}", path)
+
+
+def test_asgi_serves_every_wsgi_route(asgi):
+    wsgi_app, appasync, _ = asgi
+    wsgi_routes = {
+        (method, route_key(rule.rule))
+        for rule in wsgi_app.url_map.iter_rules() if rule.endpoint != "static"
+        for method in rule.methods - {"HEAD", "OPTIONS"}
+    }
+    asgi_routes = {
+        (method, route_key(route.path)) for route in appasync.routes for method in route.methods - {"HEAD"}
+    }
+    assert wsgi_routes - asgi_routes == WSGI_ONLY
+    assert asgi_routes - wsgi_routes == set()
+
+
+REQUESTS = [
+    ("GET", "/authors?limit=2", None),
+    ("GET", "/authors/1", None),
+    ("GET", "/authors/99", None),
+    ("GET", "/authors/search?q=name", None),
+    ("GET", "/authors/filters?name=Name1", None),
+    ("GET", "/authors/sortedby/surname?order=desc&limit=2", None),
+    ("GET", "/authors/sortedby/bogus", None),
+    ("GET", "/authors/quotes/stats?limit=2", None),
+    ("GET", "/authors/1/quotes?fields=id,text&include=author", None),
+    ("GET", "/authors/1/quotes/stats", None),
+    ("GET", "/quotes?sort=rating&limit=4", None),
+    ("GET", "/quotes?format=ndjson&fields=id,author_id", None),
+    ("GET", "/quotes/1", None),
+    ("GET", "/quotes/top?limit=3", None),
+    ("GET", "/quotes/count", None),
+    ("GET", "/quotes/search?q=quote&limit=2", None),
+    ("GET", "/quotes/filters?surname=Surname2&sort=id", None),
+    ("GET", "/quotes/filters?bogus=1", None),
+    ("PUT", "/authors/2", {"surname": "Other"}),
+    ("DELETE", "/authors/3", None),
+    ("PUT", "/authors/recover/3", None),
+    ("DELETE", "/authors?ids=3,4", None),
+    ("PUT", "/authors/recover", {"ids": [3]}),
+    ("PUT", "/authors/recover/all", None),
+    ("DELETE", "/authors/2/delete", None),
+    ("DELETE", "/authors/delete", {"name": "Name5"}),
+    ("POST", "/quotes/ratings", [{"id": 1, "delta": 10}, {"id": 1, "delta": -2}, {"id": 99, "delta": 1}]),
+    ("GET", "/quotes/3/increase_rating", None),
+    ("PUT", "/quotes/1", {"text": "edited"}),
+    ("DELETE", "/quotes/2", None),
+    ("POST", "/quotes/bulk", [{"name": "Name1", "surname": "Surname1", "text": "new"}, {"name": "Name1", "text": "x"}]),
+    ("POST", "/authors", {"name": "New", "surname": ""}),
+    ("GET", "/authors?limit=100", None),
+    ("GET", "/quotes?fields=id,text,author_id,rating&limit=100", None),
+    ("GET", "/quotes/count", None),
+]
+
+
+def test_asgi_answers_like_wsgi(asgi):
+    wsgi_app, _, call = asgi
+    client = wsgi_app.test_client()
+    for method, url, body in REQUESTS:
+        expected = client.open(url, method=method, json=body)
+        status, headers, data = call(method, url, body)
+        assert status == expected.status_code, url
+        assert headers.get("x-next-cursor") == expected.headers.get("X-Next-Cursor"), url
+        if status == 400:
+            continue  # тексты ошибок одни и те же, но Flask оборачивает abort(400, ...) в HTML
+        if expected.is_json:
+            assert json.loads(data) == expected.json, url
+        else:
+            assert data == expected.data, url
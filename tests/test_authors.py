@@ -0,0 +1,45 @@
+import pytest
+
+from conftest import read_pages, seed
+
+
+@pytest.mark.parametrize("ids", ["12", 12, {"1": 2}])
+def test_bulk_delete_rejects_ids_that_are_not_a_list(make_app, ids):
+    flask_app = make_app()
+    seed(flask_app, authors=2, quotes_per_author=0)
+    client = flask_app.test_client()
+    response = client.delete("/authors", json={"ids": ids})
+    assert response.status_code == 400
+    assert [author["id"] for author in client.get("/authors").json] == [1, 2]
+
+
+def test_bulk_delete_takes_ids_from_body_or_query(make_app):
+    flask_app = make_app()
+    seed(flask_app, authors=3, quotes_per_author=0)
+    client = flask_app.test_client()
+    assert [author["id"] for author in client.delete("/authors", json={"ids": [1]}).json] == [1]
+    assert [author["id"] for author in client.delete("/authors?ids=2,3").json] == [2, 3]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("", [2, 1, 3, 6]),
+    ("?then=-name", [2, 3, 1, 6]),
+    ("?order=desc&then=-name", [6, 3, 1, 2]),
+])
+def test_sorted_authors_pages_follow_the_sort_keys(make_app, query, expected):
+    flask_app = make_app()
+    seed(flask_app, authors=6, quotes_per_author=0)
+    client = flask_app.test_client()
+    for author_id, surname in [(1, "B"), (2, "A"), (3, "B"), (4, None), (5, "A"), (6, "C")]:
+        client.put(f"/authors/{author_id}", json={"surname": surname})
+    client.delete("/authors/5")
+    # без фамилии и удаленные в список не попадают
+    assert [author["id"] for author in client.get(f"/authors/sortedby/surname{query}").json] == expected
+    separator = "&" if query else "?"
+    assert read_pages(client, f"/authors/sortedby/surname{query}{separator}limit=1") == expected
+
+
+@pytest.mark.parametrize("url", ["/authors/sortedby/bogus", "/authors/sortedby/name?then=bogus"])
+def test_sorted_authors_reject_unknown_keys(make_app, url):
+    flask_app = make_app()
+    assert flask_app.test_client().get(url).status_code == 400
@@ -0,0 +1,57 @@
+import json
+import random
+import re
+from argparse import Namespace
+
+import pytest
+
+import app as quotes_app
+import bench
+
+
+def route_name(method: str, path: str) -> str:
+    # "GET /quotes?include=author" и "/authors/<int:author_id>" -> "GET /quotes", "/authors/<>"
+    return re.sub(r"<[^>]*>", "<>", f"{method} {path}".split("?")[0])
+
+
+def test_routes_benchmark_covers_every_app_route(make_app):
+    flask_app = make_app()
+    app_routes = {
+        route_name(method, rule.rule)
+        for rule in flask_app.url_map.iter_rules() if rule.endpoint != "static"
+        for method in rule.methods - {"HEAD", "OPTIONS"}
+    }
+    assert {route_name(*name.split(" ", 1)) for name, _, _ in bench.APP_ROUTES} == app_routes
+
+
+def test_every_benchmark_request_succeeds(make_app):
+    flask_app = make_app()
+    with flask_app.app_context():
+        bench.seed(quotes_app, authors=20, quotes=200)
+    client = flask_app.test_client()
+    ctx = bench.RouteContext(client, authors=20, quotes=200)
+    rnd = random.Random(1)
+    for name, _, make_request in bench.APP_ROUTES:
+        method, url, body = make_request(rnd, ctx)
+        response = client.open(url, method=method, json=body)
+        assert response.status_code < 500, name
+
+
+def routes_result(tmp_path, name: str, **route) -> str:
+    route = {"route": "GET /quotes", "requests": 1000, "p50_ms": 1.0, "p99_ms": 10.0, "statements_per_request": 2.0, **route}
+    path = tmp_path / f"{name}.json"
+    path.write_text(json.dumps({"commit": name, "apps": {"app": {"routes": [route]}}}))
+    return str(path)
+
+
+@pytest.mark.parametrize("change, regression", [
+    ({}, False),
+    ({"p99_ms": 11.0}, False),  # в пределах --tolerance
+    ({"p99_ms": 20.0}, True),
+    ({"p99_ms": 20.0, "requests": 10}, False),  # слишком мало запросов для p99
+    ({"statements_per_request": 3.0, "requests": 10}, True),
+])
+def test_compare_flags_slower_p99_and_more_sql(tmp_path, change, regression):
+    args = Namespace(baseline=routes_result(tmp_path, "old"), result=routes_result(tmp_path, "new", **change), tolerance=0.2)
+    result = bench.bench_compare(tmp_path / "bench.db", args)
+    assert result["regressions"] == (["app GET /quotes"] if regression else [])
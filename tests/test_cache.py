@@ -0,0 +1,56 @@
+import pytest
+
+from conftest import seed
+
+
+def test_write_in_another_process_invalidates_local_cache(make_app):
+    # два приложения на одном файле БД - как два воркера gunicorn, у каждого свой LRU
+    first, second = make_app(CACHE_TYPE="local"), make_app(CACHE_TYPE="local")
+    seed(first, authors=1, quotes_per_author=1)
+    reader = second.test_client()
+    assert reader.get("/quotes/1").json["text"] == "quote 0"
+    assert reader.get("/authors/1").json["name"] == "Name1"
+
+    first.test_client().put("/quotes/1", json={"text": "edited"})
+    first.test_client().put("/authors/1", json={"name": "Renamed"})
+    assert reader.get("/quotes/1").json["text"] == "edited"
+    assert reader.get("/authors/1").json["name"] == "Renamed"
+    assert reader.get("/authors/1/quotes").json[0]["text"] == "edited"
+
+
+def test_unchanged_tables_are_served_from_cache(make_app):
+    flask_app = make_app(CACHE_TYPE="local")
+    seed(flask_app, authors=1, quotes_per_author=1)
+    client = flask_app.test_client()
+    for _ in range(3):
+        client.get("/quotes/1")
+    stats = client.get("/cache/stats").json
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+
+
+@pytest.mark.parametrize("cache_type", ["local", "shared"])
+def test_every_write_path_invalidates_cached_reads(make_app, cache_type):
+    flask_app, uncached = make_app(CACHE_TYPE=cache_type), make_app()
+    seed(flask_app, authors=2, quotes_per_author=1)
+    client = flask_app.test_client()
+
+    def reads(client):
+        return [client.get(url).json for url in ("/quotes/1", "/quotes", "/authors/1/quotes", "/authors/1")]
+
+    writes = [
+        ("put", "/quotes/1", {"text": "edited"}),
+        ("get", "/quotes/1/increase_rating", None),
+        ("post", "/quotes/ratings", [{"id": 1, "delta": 2}]),
+        ("put", "/authors/1", {"name": "Renamed"}),
+        ("post", "/authors/1/quotes", {"text": "new", "rating": 3}),
+        ("post", "/quotes/bulk", [{"name": "Renamed", "surname": "Surname1", "text": "bulk"}]),
+        ("delete", "/quotes/2", None),
+    ]
+    for method, url, body in writes:
+        cached = reads(client)
+        assert getattr(client, method)(url, json=body).status_code < 300
+        fresh = reads(client)
+        assert fresh != cached, url
+        assert fresh == reads(uncached.test_client()), url
+    assert client.get("/cache/stats").json["hits"] > 0
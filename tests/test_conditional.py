@@ -0,0 +1,102 @@
+import sqlite3
+import threading
+
+from sqlalchemy import event
+
+import app as quotes_app
+
+from conftest import seed
+
+
+def test_matching_etag_gets_304_until_a_write(make_app):
+    flask_app = make_app()
+    seed(flask_app, authors=1, quotes_per_author=2)
+    client = flask_app.test_client()
+    response = client.get("/quotes")
+    etag = response.headers["ETag"]
+    assert "Accept" in response.headers["Vary"]
+
+    not_modified = client.get("/quotes", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == etag
+    assert not_modified.data == b""
+
+    client.put("/quotes/1", json={"text": "edited"})
+    changed = client.get("/quotes", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json[0]["text"] == "edited"
+
+
+def test_json_and_ndjson_do_not_share_an_etag(make_app):
+    flask_app = make_app()
+    seed(flask_app, authors=1, quotes_per_author=2)
+    client = flask_app.test_client()
+    etag = client.get("/quotes").headers["ETag"]
+    ndjson = client.get("/quotes", headers={"Accept": "application/x-ndjson", "If-None-Match": etag})
+    assert ndjson.status_code == 200
+    assert "Accept" in ndjson.headers["Vary"]
+    assert "ETag" not in ndjson.headers  # строки потока читаются после заголовков, версию не проверить
+    assert len(ndjson.data.splitlines()) == 2
+
+
+def test_apps_sharing_a_database_never_send_two_bodies_under_one_etag(make_app):
+    first, second = make_app(CACHE_TYPE="local"), make_app(CACHE_TYPE="local")
+    seed(first, authors=1, quotes_per_author=1)
+    bodies = {}
+    stop = threading.Event()
+
+    def write():
+        client = first.test_client()
+        for i in range(50):
+            client.put("/quotes/1", json={"text": f"edit {i}"})
+        stop.set()
+
+    def read(flask_app):
+        client = flask_app.test_client()
+        while not stop.is_set():
+            for url in ("/quotes/1", "/quotes", "/authors/1/quotes"):
+                response = client.get(url)
+                if "ETag" in response.headers:
+                    bodies.setdefault((url, response.headers["ETag"]), set()).add(response.data)
+
+    threads = [threading.Thread(target=write), threading.Thread(target=read, args=(first,)),
+               threading.Thread(target=read, args=(second,))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert bodies
+    assert all(len(seen) == 1 for seen in bodies.values())
+
+
+def test_body_changed_while_it_was_built_is_sent_without_etag(make_app, tmp_path):
+    flask_app = make_app()
+    seed(flask_app, authors=1, quotes_per_author=1)
+    written = []
+
+    def write_during_read(conn, cursor, statement, *args):
+        # другой процесс меняет цитату между чтением версий и чтением самой цитаты
+        if "FROM quote_model" in statement and not written:
+            written.append(statement)
+            writer = sqlite3.connect(tmp_path / "test.db")
+            writer.execute("UPDATE quote_model SET text = 'edited' WHERE id = 1")
+            writer.commit()
+            writer.close()
+
+    with flask_app.app_context():
+        engines = list(quotes_app.db.engines.values())
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", write_during_read)
+    client = flask_app.test_client()
+    try:
+        response = client.get("/quotes/1")
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", write_during_read)
+    assert written
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    fresh = client.get("/quotes/1")
+    assert fresh.json["text"] == "edited"
+    assert "ETag" in fresh.headers
@@ -0,0 +1,58 @@
+import threading
+
+import app as quotes_app
+
+from conftest import seed
+
+
+def post_concurrently(flask_app, requests: list[tuple]) -> list:
+    """Send ``requests`` (url, json) at once, one thread each; returns the responses in order."""
+    barrier = threading.Barrier(len(requests))
+    responses = [None] * len(requests)
+
+    def post(index, url, body):
+        client = flask_app.test_client()
+        barrier.wait()
+        responses[index] = client.post(url, json=body)
+
+    threads = [threading.Thread(target=post, args=(index, *request)) for index, request in enumerate(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return responses
+
+
+def test_concurrent_creates_share_commits_and_get_their_own_rows(make_app):
+    flask_app = make_app(GROUP_COMMIT_ENABLED=True, GROUP_COMMIT_WINDOW_MS=50)
+    seed(flask_app, authors=1, quotes_per_author=0)
+    requests = [("/authors", {"name": f"New{i}", "surname": ""}) for i in range(10)]
+    requests += [("/authors/1/quotes", {"text": f"quote {i}", "rating": 9}) for i in range(10)]
+    responses = post_concurrently(flask_app, requests)
+    assert [response.status_code for response in responses] == [201] * 20
+
+    client = flask_app.test_client()
+    for (url, body), response in zip(requests, responses):
+        if url == "/authors":
+            assert response.json == {"id": response.json["id"], "name": body["name"], "surname": None, "is_deleted": False}
+            assert client.get(f"/authors/{response.json['id']}").json == response.json
+        else:
+            assert response.json["text"] == body["text"] and response.json["rating"] == 5
+            assert client.get(f"/quotes/{response.json['id']}").json == response.json
+    stats = client.get("/commit/stats").json
+    assert stats["committed"] == 20 and stats["groups"] < 20
+
+
+def test_broken_item_fails_alone(make_app):
+    flask_app = make_app(GROUP_COMMIT_ENABLED=True, GROUP_COMMIT_WINDOW_MS=50)
+    seed(flask_app, authors=1, quotes_per_author=0)
+    # name уникален: Name1 уже есть
+    requests = [("/authors", {"name": name, "surname": ""}) for name in ("A", "Name1", "B", "C")]
+    statuses = [response.status_code for response in post_concurrently(flask_app, requests)]
+    assert statuses[0] == statuses[2] == statuses[3] == 201
+    assert statuses[1] >= 500
+    with flask_app.app_context():
+        names = quotes_app.db.session.scalars(quotes_app.select(quotes_app.AuthorModel.name)).all()
+    assert sorted(names) == ["A", "B", "C", "Name1"]
+    assert flask_app.test_client().get("/commit/stats").json["failed"] == 1
+    assert flask_app.test_client().post("/authors/99/quotes", json={"text": "x", "rating": 1}).status_code == 404
@@ -0,0 +1,49 @@
+import logging
+import re
+
+from conftest import count_statements, seed
+
+
+def test_server_timing_and_metrics_count_the_request_sql(make_app):
+    flask_app = make_app(PROFILE_ENABLED=True)
+    seed(flask_app, authors=2, quotes_per_author=3)
+    client = flask_app.test_client()
+    with count_statements(flask_app) as statements:
+        response = client.get("/quotes?limit=4")
+    timings = response.headers.getlist("Server-Timing")
+    assert [timing.split(";")[0] for timing in timings] == ["db", "serialize", "total"]
+    queries, rows = map(int, re.search(r'desc="(\d+) queries, (\d+) rows"', timings[0]).groups())
+    assert queries == len(statements)
+    assert rows >= 5  # страница из 4 цитат и строка следующей
+
+    client.get("/quotes?limit=4")
+    metrics = client.get("/metrics")
+    assert metrics.content_type.startswith("text/plain; version=0.0.4")
+    labels = '{method="GET",route="/quotes"}'
+    assert f"sql_statements_total{labels} {2 * queries}" in metrics.text
+    assert f"http_request_duration_seconds_count{labels} 2" in metrics.text
+    assert f'http_request_duration_seconds_bucket{{method="GET",route="/quotes",le="+Inf"}} 2' in metrics.text
+
+
+def test_slow_and_repeated_statements_are_logged(make_app, caplog):
+    flask_app = make_app(PROFILE_ENABLED=True, PROFILE_SLOW_QUERY_MS=0, PROFILE_N_PLUS_ONE=0)
+    seed(flask_app, authors=1, quotes_per_author=1)
+    client = flask_app.test_client()
+    # fileConfig из migrations/env.py сбрасывает обработчики корневого логгера, в том числе caplog
+    logger = logging.getLogger("profiling")
+    logger.addHandler(caplog.handler)
+    try:
+        client.get("/quotes/1")
+    finally:
+        logger.removeHandler(caplog.handler)
+    slow = [record.getMessage() for record in caplog.records if record.getMessage().startswith("Slow query")]
+    assert slow and all("plan:\n" in message and "(not available)" not in message for message in slow)
+    assert any(record.getMessage().startswith("Possible N+1 in GET /quotes/1") for record in caplog.records)
+    assert 'sql_n_plus_one_total{method="GET",route="/quotes/<int:quote_id>"} 0' not in client.get("/metrics").text
+
+
+def test_profiling_is_off_by_default(make_app):
+    flask_app = make_app()
+    client = flask_app.test_client()
+    assert "Server-Timing" not in client.get("/quotes").headers
+    assert client.get("/metrics").status_code == 404
@@ -0,0 +1,270 @@
+import json
+import sqlite3
+
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+import app as quotes_app
+from serialization import FastJSONProvider
+
+from conftest import count_statements, read_pages, seed
+
+
+@pytest.mark.parametrize("url", ["/quotes?limit=1000", "/authors/1/quotes"])
+def test_quote_lists_run_constant_number_of_statements(make_app, tmp_path, url):
+    # N и 10*N цитат: число запросов к БД не зависит от числа строк в ответе (нет N+1)
+    counts, sizes = [], []
+    for quotes_per_author in (5, 50):
+        flask_app = make_app(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / f'{quotes_per_author}.db'}")
+        seed(flask_app, authors=10, quotes_per_author=quotes_per_author)
+        client = flask_app.test_client()
+        with count_statements(flask_app) as statements:
+            response = client.get(url)
+        assert response.status_code == 200
+        counts.append(len(statements))
+        sizes.append(len(response.json))
+    assert sizes[1] == 10 * sizes[0]
+    assert counts[0] == counts[1]
+
+
+def test_bulk_import_reports_each_broken_row_once(make_app):
+    flask_app = make_app()
+    seed(flask_app, authors=1, quotes_per_author=0)  # Name1 Surname1
+    failed = []
+
+    def fail_first_quote_insert(conn, cursor, statement, parameters, context, executemany):
+        # первый INSERT цитат падает: чанк откатывается и повторяется по одной строке
+        if statement.startswith("INSERT INTO quote_model") and not failed:
+            failed.append(statement)
+            raise IntegrityError(statement, parameters, sqlite3.IntegrityError("simulated failure"))
+
+    rows = [
+        {"name": "Name1", "surname": "Other", "text": "name taken with another surname"},
+        {"name": "New", "text": "ok"},
+    ]
+    with flask_app.app_context():
+        engine = quotes_app.db.engine
+    event.listen(engine, "before_cursor_execute", fail_first_quote_insert)
+    try:
+        response = flask_app.test_client().post("/quotes/bulk", json=rows)
+    finally:
+        event.remove(engine, "before_cursor_execute", fail_first_quote_insert)
+    assert failed
+    assert response.status_code == 201
+    assert [error["index"] for error in response.json["errors"]] == [0]
+    assert response.json["inserted"] == 1
+
+
+def test_json_provider_is_set_only_on_the_quotes_app(make_app):
+    flask_app = make_app()
+    assert isinstance(flask_app.json, FastJSONProvider)
+    # другие приложения процесса (appsql.py) сохраняют свой провайдер и его настройки
+    assert type(Flask("other").json) is DefaultJSONProvider
+    assert "Пушкин" in flask_app.json.dumps({"name": "Пушкин"})
+
+
+@pytest.mark.parametrize("deleted, expected", [((2, 3), 200), ((1, 2, 3), 404)])
+def test_random_quote_survives_deletes_after_reading_the_id_range(make_app, tmp_path, monkeypatch, deleted, expected):
+    flask_app = make_app(RANDOM_QUOTE_ATTEMPTS=1)
+    seed(flask_app, authors=1, quotes_per_author=3)
+    monkeypatch.setattr(quotes_app.random, "randint", lambda low, high: high)
+
+    def delete_after_range(conn, cursor, statement, *args):
+        # цитаты удаляются сразу после чтения min(id)/max(id)
+        if "max(quote_model.id)" in statement:
+            writer = sqlite3.connect(tmp_path / "test.db")
+            writer.executemany("DELETE FROM quote_model WHERE id = ?", [(quote_id,) for quote_id in deleted])
+            writer.commit()
+            writer.close()
+
+    with flask_app.app_context():
+        engines = list(quotes_app.db.engines.values())
+    for engine in engines:
+        event.listen(engine, "after_cursor_execute", delete_after_range)
+    try:
+        response = flask_app.test_client().get("/quotes/random")
+    finally:
+        for engine in engines:
+            event.remove(engine, "after_cursor_execute", delete_after_range)
+    assert response.status_code == expected
+    if expected == 200:
+        assert response.json["id"] == 1  # после удаленного max(id) поиск начинается сначала
+
+
+@pytest.mark.parametrize("url", ["/quotes?sort=id", "/quotes?sort=rating", "/quotes?sort=created", "/authors?"])
+def test_cursor_pages_return_every_row_once_in_order(make_app, url):
+    flask_app = make_app()
+    seed(flask_app, authors=10, quotes_per_author=2)
+    with flask_app.app_context():
+        # повторяющиеся рейтинги, а created у всех одинаковый: порядок внутри них держит id
+        quotes_app.db.session.execute(quotes_app.update(quotes_app.QuoteModel).values(rating=quotes_app.QuoteModel.id % 3 + 1))
+        quotes_app.db.session.commit()
+    client = flask_app.test_client()
+    paged = read_pages(client, f"{url}&limit=3")
+    assert paged == [item["id"] for item in client.get(f"{url}&limit=1000").json]
+    assert len(set(paged)) == len(paged) == (20 if url.startswith("/quotes") else 10)
+
+
+def test_cursor_of_another_sort_is_rejected(make_app):
+    flask_app = make_app()
+    seed(flask_app, authors=1, quotes_per_author=3)
+    client = flask_app.test_client()
+    cursor = client.get("/quotes?sort=id&limit=1").headers["X-Next-Cursor"]
+    assert client.get(f"/quotes?sort=rating&after={cursor}").status_code == 400
+    assert client.get("/quotes?after=broken").status_code == 400
+
+
+@pytest.mark.parametrize("url, headers", [
+    ("/quotes?format=ndjson", {}),
+    ("/quotes?fields=id,author_id", {"Accept": "application/x-ndjson"}),
+    ("/authors?format=ndjson", {}),
+    ("/authors/2/quotes?format=ndjson", {}),
+])
+def test_ndjson_export_is_one_json_document_per_line(make_app, url, headers):
+    flask_app = make_app(EXPORT_YIELD_PER=2)  # несколько порций server-side курсора
+    seed(flask_app, authors=3, quotes_per_author=3)
+    client = flask_app.test_client()
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert response.data.endswith(b"\n")
+    lines = [json.loads(line) for line in response.data.decode().split("\n")[:-1]]
+    expected = client.get(url.replace("format=ndjson", "limit=1000")).json
+    assert lines == expected
+
+
+def test_ndjson_export_refuses_side_loaded_authors(make_app):
+    flask_app = make_app()
+    seed(flask_app, authors=1, quotes_per_author=1)
+    assert flask_app.test_client().get("/quotes?format=ndjson&include=author").status_code == 400
+
+
+def search_ids(client, url: str) -> list[int]:
+    response = client.get(url)
+    assert response.status_code == 200
+    return [item["id"] for item in response.json]
+
+
+def test_search_index_follows_edits_and_deletes(make_app):
+    flask_app = make_app()
+    seed(flask_app, authors=2, quotes_per_author=2)
+    client = flask_app.test_client()
+    assert search_ids(client, "/quotes/search?q=quote") == [1, 2, 3, 4]
+
+    client.put("/quotes/1", json={"text": "Premature optimization"})
+    assert search_ids(client, "/quotes/search?q=optim") == [1]
+    assert search_ids(client, "/quotes/search?q=quote") == [2, 3, 4]
+    client.delete("/quotes/1")
+    assert search_ids(client, "/quotes/search?q=optim") == []
+
+    client.put("/authors/1", json={"surname": "Knuth"})
+    assert search_ids(client, "/authors/search?q=knu") == [1]
+    assert search_ids(client, "/authors/search?q=surname1") == []
+    client.delete("/authors/2/delete")  # вместе с цитатами
+    assert search_ids(client, "/authors/search?q=name") == [1]
+    assert search_ids(client, "/quotes/search?q=quote") == [2]
+    assert client.get("/quotes/search?q=%20").status_code == 400
+
+
+@pytest.mark.parametrize("query", ["bogus=1", "rating=high", "rating_min=", "text=%20", "sort=bogus"])
+def test_quote_filters_reject_unknown_or_broken_filters(make_app, query):
+    flask_app = make_app()
+    seed(flask_app, authors=1, quotes_per_author=1)
+    assert flask_app.test_client().get(f"/quotes/filters?{query}").status_code == 400
+
+
+def test_quote_filters_combine_with_and_into_one_statement_shape(make_app):
+    flask_app = make_app()
+    seed(flask_app, authors=3, quotes_per_author=2)
+    with flask_app.app_context():
+        quotes_app.db.session.execute(quotes_app.update(quotes_app.QuoteModel).values(rating=quotes_app.QuoteModel.id % 5 + 1))
+        quotes_app.db.session.commit()
+    client = flask_app.test_client()
+    statements = []
+    for query in ("surname=Surname2&rating_min=4", "rating_min=4&surname=Surname2"):
+        with count_statements(flask_app) as executed:
+            response = client.get(f"/quotes/filters?{query}")
+        statements.append([statement for statement in executed if "FROM quote_model" in statement])
+        # цитаты 3 и 4 автора 2 с рейтингами 4 и 5
+        assert [(quote["id"], quote["rating"]) for quote in response.json] == [(3, 4), (4, 5)]
+    assert statements[0] == statements[1]
+    assert client.get("/quotes/filters?surname=Surname2&rating=1").status_code == 404
+
+
+def test_maintained_aggregates_match_the_quote_table(make_app):
+    flask_app = make_app()
+    seed(flask_app, authors=3, quotes_per_author=2)
+    client = flask_app.test_client()
+    client.post("/authors/1/quotes", json={"text": "new", "rating": 5})
+    client.post("/quotes/bulk", json=[{"name": "Name2", "surname": "Surname2", "text": "bulk", "rating": 4}])
+    client.post("/quotes/ratings", json=[{"id": 1, "delta": 2}, {"id": 3, "delta": 1}])
+    client.put("/quotes/2", json={"text": "edited"})
+    client.delete("/quotes/4")
+    client.delete("/authors/3/delete")
+    with flask_app.app_context():
+        rows = quotes_app.db.session.execute(quotes_app.select(
+            quotes_app.QuoteModel.author_id, quotes_app.func.count(), quotes_app.func.avg(quotes_app.QuoteModel.rating)
+        ).group_by(quotes_app.QuoteModel.author_id)).all()
+    expected = [{"author_id": author_id, "count": count, "avg_rating": round(avg, 2)} for author_id, count, avg in rows]
+    assert client.get("/quotes/count").json == {"count": sum(row[1] for row in rows)}
+    assert client.get("/authors/quotes/stats").json == expected
+    assert [client.get(f"/authors/{row[0]}/quotes/stats").json for row in rows] == expected
+    assert client.get("/authors/3/quotes/stats").status_code == 404
+
+
+def test_top_quotes_follow_votes_and_deletes(make_app):
+    flask_app = make_app(LEADERBOARD_SIZE=5)
+    seed(flask_app, authors=3, quotes_per_author=3)
+    client = flask_app.test_client()
+
+    def top(query=""):
+        return [quote["id"] for quote in client.get(f"/quotes/top?limit=5{query}").json]
+
+    def sql_top(author_id=None):
+        with flask_app.app_context():
+            query = quotes_app.QuoteModel.query.order_by(
+                quotes_app.QuoteModel.rating.desc(), quotes_app.QuoteModel.created.desc(), quotes_app.QuoteModel.id.desc()
+            )
+            if author_id is not None:
+                query = query.filter_by(author_id=author_id)
+            return [quote.id for quote in query.limit(5)]
+
+    assert top() == sql_top()  # рейтинги равны: новые, затем больший id
+    client.post("/quotes/ratings", json=[{"id": 2, "delta": 3}, {"id": 5, "delta": 1}, {"id": 8, "delta": 2}])
+    client.get("/quotes/7/increase_rating")
+    assert top()[:4] == [2, 8, 7, 5]
+    client.delete("/quotes/2")
+    client.delete("/authors/3/delete")  # цитаты 7, 8, 9
+    client.post("/authors/1/quotes", json={"text": "new", "rating": 5})
+    assert top() == sql_top()
+    assert top("&author_id=2") == sql_top(2)
+    assert client.get("/quotes/top?limit=6").status_code == 400
+
+
+@pytest.mark.parametrize("url", ["/quotes", "/authors/1/quotes", "/quotes/filters?rating=1", "/quotes/search?q=quote"])
+def test_sparse_fields_select_only_the_asked_columns(make_app, url):
+    flask_app = make_app()
+    seed(flask_app, authors=2, quotes_per_author=2)
+    client = flask_app.test_client()
+    separator = "&" if "?" in url else "?"
+    with count_statements(flask_app) as statements:
+        response = client.get(f"{url}{separator}fields=id,rating")
+    assert response.status_code == 200
+    assert response.json and all(quote.keys() == {"id", "rating"} for quote in response.json)
+    assert not any("author_model" in statement for statement in statements)
+    assert client.get(f"{url}{separator}fields=id,bogus").status_code == 400
+
+
+def test_included_authors_are_sent_once(make_app):
+    flask_app = make_app()
+    seed(flask_app, authors=2, quotes_per_author=3)
+    body = flask_app.test_client().get("/quotes?include=author&fields=id,author").json
+    assert [quote["author_id"] for quote in body["quotes"]] == [1, 1, 1, 2, 2, 2]
+    assert all("author" not in quote for quote in body["quotes"])
+    assert body["authors"] == {
+        "1": {"id": 1, "name": "Name1", "surname": "Surname1", "is_deleted": False},
+        "2": {"id": 2, "name": "Name2", "surname": "Surname2", "is_deleted": False},
+    }
@@ -0,0 +1,86 @@
+import random
+import threading
+
+import app as quotes_app
+from ratings import IDENTITY, RATING_MAX, RATING_MIN, apply_step, compose, vote_step
+
+from conftest import count_statements, seed
+
+
+def rating(flask_app, quote_id: int) -> int:
+    with flask_app.app_context():
+        return quotes_app.db.session.get(quotes_app.QuoteModel, quote_id).rating
+
+
+def test_concurrent_votes_are_not_lost(make_app):
+    flask_app = make_app()
+    seed(flask_app, authors=1, quotes_per_author=1)
+    with flask_app.app_context():
+        quotes_app.db.session.execute(quotes_app.update(quotes_app.QuoteModel).values(rating=3))
+        quotes_app.db.session.commit()
+    # поровну голосов за и против: рейтинг держится между границами 1..5,
+    # а голос, упершийся в границу, отвечает текстом и рейтинг не меняет
+    threads = 100
+    barrier = threading.Barrier(threads)
+    statuses, applied = [], []
+
+    def vote(direction):
+        client = flask_app.test_client()
+        barrier.wait()
+        response = client.get(f"/quotes/1/{direction}_rating")
+        statuses.append(response.status_code)
+        if response.is_json:
+            applied.append(+1 if direction == "increase" else -1)
+
+    workers = [threading.Thread(target=vote, args=("increase" if i % 2 else "decrease",)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert statuses == [200] * threads
+    assert applied
+    assert rating(flask_app, 1) == 3 + sum(applied)
+
+
+def test_batch_votes_are_clamped_one_by_one(make_app):
+    flask_app = make_app()
+    seed(flask_app, authors=1, quotes_per_author=1)
+    # +10 упирается в 5, затем -2: 3, а не 1 + 10 - 2
+    response = flask_app.test_client().post(
+        "/quotes/ratings", json=[{"id": 1, "delta": 10}, {"id": 1, "delta": -2}, {"id": 99, "delta": 1}],
+    )
+    assert response.status_code == 200
+    assert response.json == {"ratings": {"1": 3}, "not_found": [99]}
+    assert rating(flask_app, 1) == 3
+
+
+def test_composed_steps_match_votes_applied_one_by_one():
+    rng = random.Random(1)
+    for _ in range(200):
+        rating = rng.randint(RATING_MIN, RATING_MAX)
+        deltas = [rng.randint(-7, 7) for _ in range(rng.randint(1, 6))]
+        expected, step = rating, IDENTITY
+        for delta in deltas:
+            for _ in range(abs(delta)):
+                expected = min(max(expected + (1 if delta > 0 else -1), RATING_MIN), RATING_MAX)
+            step = compose(step, vote_step(delta))
+        assert apply_step(rating, step) == expected, (rating, deltas)
+
+
+def test_buffered_votes_are_written_in_one_update(make_app):
+    # интервал больше времени теста: запись только в close()
+    flask_app = make_app(RATING_BUFFER_ENABLED=True, RATING_BUFFER_INTERVAL_MS=60_000)
+    seed(flask_app, authors=1, quotes_per_author=2)
+    client = flask_app.test_client()
+    for url in ["/quotes/1/increase_rating"] * 6 + ["/quotes/1/decrease_rating"] * 2 + ["/quotes/2/increase_rating"]:
+        assert client.get(url).status_code == 202
+    assert client.get("/quotes/99/increase_rating").status_code == 404
+    assert rating(flask_app, 1) == 1
+    with count_statements(flask_app) as statements:
+        flask_app.extensions["quotes"]["vote_buffer"].close()
+    assert len([statement for statement in statements if statement.startswith("UPDATE")]) == 1
+    # 1 + 6 упирается в 5, затем -2
+    assert (rating(flask_app, 1), rating(flask_app, 2)) == (3, 2)
+    assert client.get("/quotes/ratings/buffer").json == {
+        "enabled": True, "buffered_votes": 9, "flushed_votes": 9, "pending_votes": 0, "flushes": 1, "failed_flushes": 0,
+    }
@@ -0,0 +1,99 @@
+import threading
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+import app as quotes_app
+from sqlite_engine import READ_BIND, RoutingSession, replicate
+
+from conftest import seed
+
+
+@contextmanager
+def statements_by_bind(flask_app):
+    """SQL statements run inside the block, per bind key (None - the primary engine)."""
+    with flask_app.app_context():
+        engines = dict(quotes_app.db.engines)
+    statements = {key: [] for key in engines}
+    listeners = {}
+    for key, engine in engines.items():
+        listeners[key] = lambda conn, cursor, statement, *args, key=key: statements[key].append(statement)
+        event.listen(engine, "before_cursor_execute", listeners[key])
+    try:
+        yield statements
+    finally:
+        for key, engine in engines.items():
+            event.remove(engine, "before_cursor_execute", listeners[key])
+
+
+def pragma(connection, name: str):
+    return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_production_profile_and_read_only_pool(make_app):
+    flask_app = make_app()
+    with flask_app.app_context():
+        with quotes_app.db.engine.connect() as connection:
+            assert pragma(connection, "journal_mode") == "wal"
+            assert pragma(connection, "synchronous") == 1  # NORMAL
+            assert pragma(connection, "busy_timeout") == 5000
+        with quotes_app.db.engines[READ_BIND].connect() as connection:
+            assert pragma(connection, "query_only") == 1
+            with pytest.raises(OperationalError):
+                connection.execute(text("DELETE FROM quote_model"))
+
+
+def test_default_profile_keeps_sqlite_defaults(make_app, tmp_path):
+    flask_app = make_app(SQLITE_PROFILE="default", SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'default.db'}")
+    with flask_app.app_context(), quotes_app.db.engine.connect() as connection:
+        assert pragma(connection, "journal_mode") == "delete"
+        assert pragma(connection, "synchronous") == 2  # FULL
+
+
+def test_get_requests_read_from_the_read_only_pool(make_app):
+    flask_app = make_app()
+    seed(flask_app, authors=1, quotes_per_author=1)
+    client = flask_app.test_client()
+    with statements_by_bind(flask_app) as statements:
+        assert client.get("/quotes/1").status_code == 200
+    assert statements[READ_BIND] and not statements[None]
+
+    # запрос с записью читает результат с основной БД, в той же транзакции
+    with statements_by_bind(flask_app) as statements:
+        assert client.put("/quotes/1", json={"text": "edited"}).json["text"] == "edited"
+    assert statements[None] and not statements[READ_BIND]
+
+
+def sync_replica(tmp_path):
+    stop = threading.Event()
+    stop.set()  # один снимок и выход
+    replicate(str(tmp_path / "test.db"), str(tmp_path / "replica.db"), 0, stop)
+
+
+@pytest.mark.parametrize("lag_tolerance", [0, 60])
+def test_replica_serves_gets_and_lag_tolerance_covers_own_writes(make_app, tmp_path, monkeypatch, lag_tolerance):
+    monkeypatch.setattr(RoutingSession, "last_write", 0.0)
+    primary = make_app()
+    seed(primary, authors=1, quotes_per_author=1)
+    sync_replica(tmp_path)
+    flask_app = make_app(
+        SQLALCHEMY_REPLICA_URI=f"sqlite:///{tmp_path / 'replica.db'}", REPLICA_LAG_TOLERANCE=lag_tolerance,
+    )
+    client = flask_app.test_client()
+    with statements_by_bind(flask_app) as statements:
+        assert client.get("/quotes/1").json["text"] == "quote 0"
+    assert statements[READ_BIND] and not statements[None]
+
+    client.put("/quotes/1", json={"text": "edited"})
+    # реплика еще не догнала: без допуска читаем ее старые данные, с допуском - основную БД
+    expected = "edited" if lag_tolerance else "quote 0"
+    with statements_by_bind(flask_app) as statements:
+        assert client.get("/quotes/1").json["text"] == expected
+    assert bool(statements[None]) == bool(lag_tolerance)
+
+    monkeypatch.setattr(RoutingSession, "last_write", RoutingSession.last_write - 120)  # допуск истек
+    assert client.get("/quotes/1").json["text"] == "quote 0"
+    sync_replica(tmp_path)
+    assert client.get("/quotes/1").json["text"] == "edited"
@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+from sql_queries import Queries
+from sqlite_pool import ConnectionPool, PoolTimeout
+
+
+def make_queries(tmp_path, queries: dict):
+    pool = ConnectionPool(tmp_path / "pool.db", size=1)
+    connection = pool.acquire()
+    connection.executescript(
+        "CREATE TABLE authors (id INTEGER PRIMARY KEY, name TEXT);"
+        "CREATE TABLE quotes (id INTEGER PRIMARY KEY, author INTEGER REFERENCES authors (id), text TEXT);"
+    )
+    return connection, Queries(lambda: connection, queries)
+
+
+def test_insert_many_returns_the_ids_sqlite_assigned(tmp_path):
+    connection, queries = make_queries(tmp_path, {"insert": "INSERT INTO quotes (id, text) VALUES (:id, :text)"})
+    # явные id не идут подряд: вычислить их из last_insert_rowid() нельзя
+    rows = [{"id": 10, "text": "a"}, {"id": 5, "text": "b"}, {"id": None, "text": "c"}]
+    ids = queries.insert_many("insert", rows)
+    assert ids == [10, 5, 11]
+    assert connection.execute("SELECT id, text FROM quotes ORDER BY id").fetchall() == [(5, "b"), (10, "a"), (11, "c")]
+
+
+def test_pool_leaves_foreign_keys_off(tmp_path):
+    # как и до пула: у соединений умолчание SQLite foreign_keys=OFF, DELETE строки со ссылками на нее проходит
+    connection, queries = make_queries(tmp_path, {
+        "create_author": "INSERT INTO authors (name) VALUES (:author_name)",
+        "create_quote": "INSERT INTO quotes (author, text) VALUES (:author, :text)",
+        "delete_author": "DELETE FROM authors WHERE id = :id",
+    })
+    assert connection.execute("PRAGMA foreign_keys").fetchone() == (0,)
+    author_id = queries.execute("create_author", author_name="Name").lastrowid
+    queries.execute("create_quote", author=author_id, text="quote")
+    assert queries.execute("delete_author", id=author_id).rowcount == 1
+
+
+def test_released_connection_is_reused_with_its_pragmas(tmp_path):
+    pool = ConnectionPool(tmp_path / "pool.db", size=2)
+    first = pool.acquire()
+    assert first.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    assert first.execute("PRAGMA busy_timeout").fetchone() == (5000,)
+    first.execute("CREATE TABLE t (x INTEGER)")
+    first.execute("INSERT INTO t VALUES (1)")  # не закоммичено: release откатывает
+    pool.release(first)
+    assert pool.acquire() is first
+    assert first.execute("SELECT count(*) FROM t").fetchone() == (0,)
+    assert pool.stats()["opened"] == 1
+
+
+def test_full_pool_waits_for_a_release_then_times_out(tmp_path):
+    pool = ConnectionPool(tmp_path / "pool.db", size=1, timeout=5)
+    connection = pool.acquire()
+    handed = []
+    waiter = threading.Thread(target=lambda: handed.append(pool.acquire()))
+    waiter.start()
+    while pool.stats()["waits"] == 0:
+        time.sleep(0.001)
+    pool.release(connection)
+    waiter.join()
+    assert handed == [connection]
+
+    pool.timeout = 0.05
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.stats() | {"wait_time_ms": 0} == {
+        "size": 1, "opened": 1, "idle": 0, "in_use": 1, "acquired": 3, "waits": 2, "timeouts": 1, "wait_time_ms": 0,
+    }
@@ -0,0 +1,36 @@
+import gc
+import json
+import os
+import subprocess
+import sys
+import weakref
+
+import app as quotes_app
+from bench import BASE_DIR, STARTUP_SCRIPT
+
+
+BUDGET_MS = 1000  # как --budget-ms по умолчанию в bench.py startup
+
+
+def test_worker_starts_within_budget_without_alembic_or_connections(tmp_path):
+    env = {**os.environ, "FLASK_SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'startup.db'}"}
+    runs = [
+        json.loads(subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT], cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        ).stdout)
+        for _ in range(3)
+    ]
+    total = sorted(run["import_ms"] + run["create_app_ms"] for run in runs)
+    assert total[len(total) // 2] < BUDGET_MS
+    assert not any(run["alembic_loaded"] for run in runs)
+    assert all(run["connections"] == 0 for run in runs)
+
+
+def test_apps_are_not_kept_alive_by_process_hooks(tmp_path):
+    config = {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}", "RATING_BUFFER_ENABLED": True}
+    flask_app = quotes_app.create_app(config)
+    assert flask_app in quotes_app.apps
+    app_ref = weakref.ref(flask_app)
+    del flask_app
+    gc.collect()
+    assert app_ref() is None